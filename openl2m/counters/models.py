@@ -11,7 +11,13 @@
 # more details.  You should have received a copy of the GNU General Public
 # License along with OpenL2M. If not, see <http://www.gnu.org/licenses/>.
 #
-from django.db import models
+import atexit
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection as db_connection, models
+from django.db.models import F
 from django.contrib.auth.signals import user_logged_in, user_login_failed
 
 # this app creates a simple Counter class, used to track some activity counters
@@ -56,17 +62,63 @@ class Counter(models.Model):
         return self.display_name()
 
 
+# counter increments waiting to be written, if settings.COUNTER_FLUSH_INTERVAL is set:
+_pending = {}
+_pending_lock = threading.Lock()
+_flush_thread = None
+
+
 def counter_increment(name, addition=1):
     # function to increment the value of a named counter
     dprint(f"counter_increment({name})")
+    global _flush_thread
+    if settings.COUNTER_FLUSH_INTERVAL:
+        # add to the in-process total, written to the database later:
+        with _pending_lock:
+            _pending[name] = _pending.get(name, 0) + addition
+            if _flush_thread is None:
+                _flush_thread = threading.Thread(target=_flush_periodically, name="counter-flush", daemon=True)
+                _flush_thread.start()
+        return
+    _counter_update(name, addition)
+
+
+def _counter_update(name, addition) -> bool:
+    # atomic update in the database, ie. "UPDATE ... SET value = value + addition"
     try:
-        c = Counter.objects.get(name=name)
-        c.value += addition
-        c.save()
-
+        if not Counter.objects.filter(name=name).update(value=F('value') + addition):
+            dprint("Error finding counter!")
     except Exception:
-        # ignore
-        dprint("Error finding counter!")
+        dprint("Error updating counter!")
+        return False
+    return True
+
+
+def counter_flush():
+    # write the pending counter increments to the database
+    with _pending_lock:
+        pending = dict(_pending)
+        _pending.clear()
+    for name, addition in pending.items():
+        if not _counter_update(name, addition):
+            # try again at the next flush:
+            with _pending_lock:
+                _pending[name] = _pending.get(name, 0) + addition
+
+
+def _flush_periodically():
+    # background thread that writes the pending counter increments every COUNTER_FLUSH_INTERVAL seconds
+    while True:
+        time.sleep(settings.COUNTER_FLUSH_INTERVAL)
+        try:
+            counter_flush()
+        finally:
+            # this thread has its own database connection, do not keep it open:
+            db_connection.close()
+
+
+# do not lose pending counts when the worker process exits:
+atexit.register(counter_flush)
 
 
 def increment_login_counter(sender, user, request, **kwargs):
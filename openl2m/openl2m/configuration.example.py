@@ -497,6 +497,49 @@ SNMP_RETRIES = 3
 # see the references in the documentation for more information.
 SNMP_MAX_REPETITIONS = 25
 
+# Device read sharing.
+# When several users open the same device at the same time, only the first request reads the device.
+# The other requests wait for that read, and reuse the result. This requires a cache that is shared
+# between all gunicorn workers. The default is the database cache, its table is created by upgrade.sh.
+# You can use e.g. Redis instead. Do NOT use the local-memory cache, it only works inside one worker process:
+# CACHES = {
+#     'default': {
+#         'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+#         'LOCATION': 'redis://127.0.0.1:6379',
+#     }
+# }
+# set to False to disable sharing of device reads:
+# SHARED_READ_ENABLED = True
+# the number of seconds the device data read by another request can be reused:
+# SHARED_READ_MAX_AGE = 15
+# the max number of seconds to wait for a device read by another request, before reading ourselves:
+# SHARED_READ_WAIT = 60
+# if the shared device data is older than SHARED_READ_MAX_AGE, but not older than this number of seconds,
+# the device is shown immediately with this older data, and the data is refreshed in the background.
+# The next view of the device will show the refreshed data. The age of the data is shown on the page.
+# This helps a lot for slow devices, e.g. at remote sites. This is disabled by default (0), e.g. set to 120:
+# SHARED_READ_MAX_STALE = 0
+
+# Hardware details (eg. stacking and serial numbers), device health and VRFs are read on demand,
+# ie. when the device Information tab is opened, or the API needs them. Set this to True to read them
+# every time the device is read, as in older versions of OpenL2M:
+# DEVICE_INFO_EAGER = False
+# the number of seconds each of these is cached, before it is read again:
+# DEVICE_INFO_CACHE_TIMES = {
+#     "hardware": 3600,
+#     "health": 60,
+#     "vrfs": 600,
+# }
+
+# Device health settings, aka. "circuit breaker" for unreachable devices. This also requires a shared cache, see above.
+# After this many consecutive failed connections, requests to the device fail fast, without trying to connect.
+# Set to 0 to disable.
+# DEVICE_FAILURE_THRESHOLD = 3
+# the number of seconds to fail fast, after which a single request will check if the device is reachable again:
+# DEVICE_FAILURE_RETRY = 60
+# the max number of simultaneous sessions reading a device, across all workers. Set to 0 for no limit.
+# DEVICE_MAX_SESSIONS = 4
+
 # Syslog settings
 # if SYSLOG_HOST is defined (default=False), log entries will also be sent here, to the 'user' facility:
 # SYSLOG_HOST = 'localhost'
@@ -506,6 +549,18 @@ SNMP_MAX_REPETITIONS = 25
 # If not, a textual version of log event will be sent.
 # SYSLOG_JSON = True
 
+# Activity log entries for views, warnings and errors are kept in memory, and written to the database in bulk
+# when LOG_BUFFER_SIZE entries are waiting, every LOG_BUFFER_INTERVAL seconds, and at the end of each request.
+# Changes, commands and logins are always written immediately. Set to False to write all entries immediately:
+# LOG_BUFFER_ENABLED = True
+# LOG_BUFFER_SIZE = 100
+# LOG_BUFFER_INTERVAL = 5
+
+# The activity counters (views, changes, commands, etc.) are updated in the database immediately.
+# On busy servers, you can set this to the number of seconds to add up counter increments in each
+# worker process, before writing them. Pending increments are written when a worker exits.
+# COUNTER_FLUSH_INTERVAL = 0
+
 # Email settings, used to send results of commands and other emails.
 # the default uses the local plain old smtp server on port 25
 # see the installation docs or Django docs for other options.
@@ -539,9 +594,47 @@ SSH_CONNECT_TIMEOUT = 5
 # SSH command read timeout, default = 15 (Netmiko library default = 10)
 SSH_COMMAND_TIMEOUT = 15
 
+# SSH command sessions are kept open, and reused for the next command to the same device.
+# This is the max number of sessions per device in each worker process. 0 disables session reuse:
+# SSH_SESSION_POOL_SIZE = 1
+# seconds after which an unused SSH command session is closed:
+# SSH_SESSION_IDLE_TIMEOUT = 120
+# if True, the output of commands is sent to the browser while the command runs, e.g. for long 'show tech' output.
+# Command templates that match or filter the output always wait for the full output.
+# This needs a cache shared by all gunicorn workers, e.g. the default database cache (see CACHES above).
+# SSH_STREAM_COMMAND_OUTPUT = False
+
 # connect timeout for Junos devices via the Netconf interface
 JUNOS_PYEZ_CONN_TIMEOUT = 10
 
+# Aruba AOS-CX REST sessions are kept logged in, and reused by later requests.
+# This is the max number of sessions per device in each worker process, idle or in use. So the device can see
+# up to (gunicorn workers x this number) sessions. AOS-CX devices have a limit on concurrent REST sessions,
+# so keep that below the device limit. 0 disables session reuse:
+# AOSCX_SESSION_POOL_SIZE = 2
+# seconds after which an unused AOS-CX REST session is logged out:
+# AOSCX_SESSION_IDLE_TIMEOUT = 300
+
+# Junos PyEZ Netconf sessions are kept open, and reused by later requests.
+# This is the max number of sessions per device in each worker process. 0 disables session reuse:
+# JUNOS_PYEZ_SESSION_POOL_SIZE = 2
+# seconds after which an unused Junos PyEZ Netconf session is closed:
+# JUNOS_PYEZ_SESSION_IDLE_TIMEOUT = 300
+# seconds the Junos device facts (hostname, model, version, etc.) are cached:
+# JUNOS_PYEZ_FACTS_CACHE_TIME = 3600
+# bulk edits on Junos devices are applied in a single commit. If set, this uses "commit confirmed"
+# with a rollback after this many minutes, and confirms the commit when the device is still reachable:
+# JUNOS_PYEZ_COMMIT_CONFIRMED = 0
+
+# Napalm getters are spread over this many connections to the device, and run concurrently. 1 = one at a time.
+# The additional connections count against DEVICE_MAX_SESSIONS. E.g. set to 2 to read faster:
+# NAPALM_GETTER_SESSIONS = 1
+# seconds the Napalm device facts (hostname, model, version, etc.) are cached:
+# NAPALM_FACTS_CACHE_TIME = 3600
+# if True, Napalm devices can be changed, if there are change templates for the device type,
+# see switches/connect/napalm/templates/. Bulk edits are applied in a single commit:
+# NAPALM_CHANGES_ENABLED = False
+
 # perform hostname lookup from IP addresses found in ARP info, Admin pages, etc.
 # Note this could have impact on page rendering, depending on how fast your
 # dns resolution is and how may retries the underlying host OS is configured for.
@@ -591,6 +684,14 @@ ALLOW_ARP_LLDP_DOWNLOAD = True
 TOP_ACTIVITY = 10
 # number of days for the "Top N" activity:
 TOP_ACTIVITY_DAYS = 7
+# number of seconds the "Top N" activity is cached:
+# TOP_ACTIVITY_CACHE_TIME = 300
+
+# number of seconds the groups and devices a user has access to are cached.
+# This is cleared whenever devices, groups or group members are changed. 0 disables caching.
+# Do NOT enable this with the local-memory cache. Other gunicorn workers would not see access changes!
+# The default is 300 with a shared cache (see CACHES above), and 0 otherwise.
+# PERMISSIONS_CACHE_TIME = 300
 
 #
 # Neighbor device settings, used for LLDP Neighbor tab, and Mermaid graphical view
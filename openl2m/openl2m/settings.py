@@ -163,6 +163,55 @@ SNMP_TIMEOUT = getattr(configuration, 'SNMP_TIMEOUT', 4)  # seconds before retry
 SNMP_RETRIES = getattr(configuration, 'SNMP_RETRIES', 3)  # retries before fail
 SNMP_MAX_REPETITIONS = getattr(configuration, 'SNMP_MAX_REPETITIONS', 10)  # SNMP get_bulk max_repetitions
 
+# Cache used to share device data, permissions, etc. between requests, and gunicorn workers.
+# The default is the database cache, its table is created by "manage.py createcachetable" (see upgrade.sh).
+# Note a local-memory cache is only shared inside a single worker process!
+CACHES = getattr(
+    configuration,
+    "CACHES",
+    {
+        "default": {
+            "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+            "LOCATION": "openl2m_cache",
+        }
+    },
+)
+# True if the cache is shared between gunicorn workers. Features that need this are disabled by default if not.
+CACHE_IS_SHARED = CACHES["default"]["BACKEND"] not in (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+# Concurrent reads of the same device are coalesced: the first request reads the device,
+# other requests wait for it, and reuse the result (if it is no older than SHARED_READ_MAX_AGE seconds).
+SHARED_READ_ENABLED = getattr(configuration, "SHARED_READ_ENABLED", True)
+SHARED_READ_MAX_AGE = getattr(configuration, "SHARED_READ_MAX_AGE", 15)  # in seconds
+SHARED_READ_WAIT = getattr(configuration, "SHARED_READ_WAIT", 60)  # max seconds to wait for another read
+# shared device data older than SHARED_READ_MAX_AGE, but not older than SHARED_READ_MAX_STALE seconds,
+# is shown immediately, and refreshed in the background. Set to 0 to disable (the default).
+SHARED_READ_MAX_STALE = getattr(configuration, "SHARED_READ_MAX_STALE", 0)  # in seconds
+
+# hardware details, device health and vrfs are read when the Info tab or API needs them,
+# unless DEVICE_INFO_EAGER is True. Each is cached for the number of seconds given here:
+DEVICE_INFO_EAGER = getattr(configuration, "DEVICE_INFO_EAGER", False)
+DEVICE_INFO_CACHE_TIMES = getattr(
+    configuration,
+    "DEVICE_INFO_CACHE_TIMES",
+    {
+        "hardware": 3600,
+        "health": 60,
+        "vrfs": 600,
+    },
+)
+
+# Device health, aka. "circuit breaker". After this many consecutive failed connections (0 = disabled),
+# requests to the device fail fast for DEVICE_FAILURE_RETRY seconds, after which a single request will try again.
+DEVICE_FAILURE_THRESHOLD = getattr(configuration, "DEVICE_FAILURE_THRESHOLD", 3)
+DEVICE_FAILURE_RETRY = getattr(configuration, "DEVICE_FAILURE_RETRY", 60)  # in seconds
+# the max number of simultaneous sessions reading a device, across all workers (0 = no limit).
+# This count is kept in the database, so it is atomic and shared by all workers, whatever cache is used.
+DEVICE_MAX_SESSIONS = getattr(configuration, "DEVICE_MAX_SESSIONS", 4)
+
 # Syslog related fields:
 SYSLOG_HOST = getattr(configuration, "SYSLOG_HOST", False)
 SYSLOG_PORT = getattr(configuration, "SYSLOG_PORT", 514)
@@ -174,6 +223,17 @@ if SYSLOG_HOST:
     except Exception:
         raise ImproperlyConfigured("SYSLOG_HOST is not a valid host name")
 
+# Activity log entries for views, warnings and errors are buffered, and written in bulk
+# when LOG_BUFFER_SIZE entries are waiting, every LOG_BUFFER_INTERVAL seconds, and at the end of each request.
+# Changes, commands and logins are always written immediately.
+LOG_BUFFER_ENABLED = getattr(configuration, "LOG_BUFFER_ENABLED", True)
+LOG_BUFFER_SIZE = getattr(configuration, "LOG_BUFFER_SIZE", 100)
+LOG_BUFFER_INTERVAL = getattr(configuration, "LOG_BUFFER_INTERVAL", 5)  # in seconds
+
+# activity counters are updated in the database immediately, unless this is set. If set, counter increments
+# are added up in each worker process, and written every COUNTER_FLUSH_INTERVAL seconds, and at exit.
+COUNTER_FLUSH_INTERVAL = getattr(configuration, "COUNTER_FLUSH_INTERVAL", 0)  # in seconds
+
 # Sessions
 SESSION_EXPIRE_AT_BROWSER_CLOSE = True
 if LOGIN_TIMEOUT is not None:
@@ -446,9 +506,47 @@ SSH_CONNECT_TIMEOUT = getattr(configuration, 'SSH_CONNECT_TIMEOUT', 5)
 # SSH command read timeout, default = 15 (Netmiko library default = 10)
 SSH_COMMAND_TIMEOUT = getattr(configuration, 'SSH_COMMAND_TIMEOUT', 15)
 
+# SSH command sessions are kept open, and reused for the next command to the same device.
+# This is the max number of sessions per device in each worker process. 0 disables session reuse:
+SSH_SESSION_POOL_SIZE = getattr(configuration, 'SSH_SESSION_POOL_SIZE', 1)
+# seconds after which an unused SSH command session is closed:
+SSH_SESSION_IDLE_TIMEOUT = getattr(configuration, 'SSH_SESSION_IDLE_TIMEOUT', 120)
+# if True, the output of commands is sent to the browser while the command runs, e.g. for long 'show tech' output.
+SSH_STREAM_COMMAND_OUTPUT = getattr(configuration, 'SSH_STREAM_COMMAND_OUTPUT', False)
+if SSH_STREAM_COMMAND_OUTPUT and not CACHE_IS_SHARED:
+    # the browser gets the output in a separate request, which can go to another worker process:
+    logging.getLogger(__name__).warning("SSH_STREAM_COMMAND_OUTPUT is disabled, it needs a shared cache (see CACHES)!")
+    SSH_STREAM_COMMAND_OUTPUT = False
+
 # connect timeout for Junos devices via the Netconf interface
 JUNOS_PYEZ_CONN_TIMEOUT = getattr(configuration, 'JUNOS_PYEZ_CONN_TIMEOUT', 10)
 
+# Aruba AOS-CX REST sessions are kept logged in, and reused by later requests.
+# This is the max number of sessions per device in each worker process, idle or in use. So the device can see
+# up to (gunicorn workers x this number) sessions. AOS-CX devices have a limit on concurrent REST sessions,
+# so keep that below the device limit. 0 disables session reuse:
+AOSCX_SESSION_POOL_SIZE = getattr(configuration, 'AOSCX_SESSION_POOL_SIZE', 2)
+# seconds after which an unused AOS-CX REST session is logged out:
+AOSCX_SESSION_IDLE_TIMEOUT = getattr(configuration, 'AOSCX_SESSION_IDLE_TIMEOUT', 300)
+
+# Junos PyEZ Netconf sessions are kept open, and reused by later requests.
+# This is the max number of sessions per device in each worker process. 0 disables session reuse:
+JUNOS_PYEZ_SESSION_POOL_SIZE = getattr(configuration, 'JUNOS_PYEZ_SESSION_POOL_SIZE', 2)
+# seconds after which an unused Junos PyEZ Netconf session is closed:
+JUNOS_PYEZ_SESSION_IDLE_TIMEOUT = getattr(configuration, 'JUNOS_PYEZ_SESSION_IDLE_TIMEOUT', 300)
+# seconds the Junos device facts (hostname, model, version, etc.) are cached:
+JUNOS_PYEZ_FACTS_CACHE_TIME = getattr(configuration, 'JUNOS_PYEZ_FACTS_CACHE_TIME', 3600)
+JUNOS_PYEZ_COMMIT_CONFIRMED = getattr(configuration, 'JUNOS_PYEZ_COMMIT_CONFIRMED', 0)
+
+# Napalm getters are spread over this many connections to the device, and run concurrently. 1 = one at a time.
+# The additional connections count against DEVICE_MAX_SESSIONS:
+NAPALM_GETTER_SESSIONS = getattr(configuration, 'NAPALM_GETTER_SESSIONS', 1)
+# seconds the Napalm device facts (hostname, model, version, etc.) are cached:
+NAPALM_FACTS_CACHE_TIME = getattr(configuration, 'NAPALM_FACTS_CACHE_TIME', 3600)
+# if True, Napalm devices can be changed, if there are change templates for the device type,
+# see switches/connect/napalm/templates/. Bulk edits are applied in a single commit:
+NAPALM_CHANGES_ENABLED = getattr(configuration, 'NAPALM_CHANGES_ENABLED', False)
+
 # REST API Settings
 API_ENABLED = getattr(configuration, 'API_ENABLED', True)
 ALLOW_TOKEN_RETRIEVAL = getattr(configuration, 'ALLOW_TOKEN_RETRIEVAL', False)
@@ -465,6 +563,13 @@ ALLOW_ARP_LLDP_DOWNLOAD = getattr(configuration, 'ALLOW_ARP_LLDP_DOWNLOAD', True
 TOP_ACTIVITY = getattr(configuration, 'TOP_ACTIVITY', 10)
 # number of days for the "Top N" activity:
 TOP_ACTIVITY_DAYS = getattr(configuration, 'TOP_ACTIVITY_DAYS', 7)
+# number of seconds the "Top N" activity is cached:
+TOP_ACTIVITY_CACHE_TIME = getattr(configuration, 'TOP_ACTIVITY_CACHE_TIME', 300)
+
+# number of seconds the groups and devices a user has access to are cached.
+# This is cleared whenever devices, groups or group members are changed. 0 disables caching.
+# Only enabled by default with a shared cache, otherwise other workers would not see the changes:
+PERMISSIONS_CACHE_TIME = getattr(configuration, 'PERMISSIONS_CACHE_TIME', 300 if CACHE_IS_SHARED else 0)
 
 #
 # Neighbor device settings, used for LLDP Neighbor tab, and Mermaid graphical view
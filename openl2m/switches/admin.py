@@ -55,9 +55,18 @@ class SwitchInline(admin.TabularInline):
 class SwitchAdmin(admin.ModelAdmin):
     save_on_top = True
     save_as = True
-    list_display = ['name', 'access_count', 'last_accessed', 'change_count', 'last_changed', 'get_switchgroups']
+    list_display = [
+        'name',
+        'access_count',
+        'last_accessed',
+        'change_count',
+        'last_changed',
+        'get_switchgroups',
+        'get_device_health',
+    ]
     readonly_fields = (
         'hostname',
+        'get_device_health',
         'created',
         #        'modified',
         'last_accessed',
@@ -109,7 +118,7 @@ class SwitchAdmin(admin.ModelAdmin):
             },
         ),
         ('Other Options', {'fields': ('nms_id',)}),
-        ('Read-Only Fields', {'fields': ('hostname',)}),
+        ('Read-Only Fields', {'fields': ('hostname', 'get_device_health')}),
         (
             'Stats',
             {
@@ -376,7 +385,7 @@ class CommandAdmin(admin.ModelAdmin):
     save_on_top = True
     save_as = True
     search_fields = ['name']
-    list_display = ['name', 'os', 'command_list_count']
+    list_display = ['name', 'os', 'cache_time', 'command_list_count']
 
     # return the number of commandlist() objects that reference a given command (obj)
     # this can be in 4 difference ManyToManyField relationships:
@@ -128,6 +128,8 @@ def switch_info(request, group_id, switch_id, details):
     )
     if response_error:
         return response_error
+    # the switch data includes the VRFs, which are read on demand:
+    connection.get_device_info(["vrfs"])
     data = {
         "switch": connection.as_dict(),
         "vlans": connection.vlans_as_dict(),
@@ -11,8 +11,49 @@
 # more details.  You should have received a copy of the GNU General Public
 # License along with OpenL2M. If not, see <http://www.gnu.org/licenses/>.
 #
+import logging
+
 from django.apps import AppConfig
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db.models.signals import m2m_changed, post_delete, post_save
 
 
 class SwitchesConfig(AppConfig):
     name = 'switches'
+
+    def ready(self):
+        # write the buffered activity logs at the end of each request:
+        from switches.logbuffer import flush_logs_at_request_end
+
+        request_finished.connect(flush_logs_at_request_end, dispatch_uid="openl2m_flush_logs")
+
+        # write the coalesced Switch() counter updates at the end of each request:
+        from switches.switchcounters import flush_switch_updates_at_request_end
+
+        request_finished.connect(flush_switch_updates_at_request_end, dispatch_uid="openl2m_flush_switch_updates")
+
+        # close any pooled device sessions the request did not return:
+        from switches.connect.sessionpool import close_abandoned_sessions
+
+        request_finished.connect(close_abandoned_sessions, dispatch_uid="openl2m_close_abandoned_sessions")
+
+        # clear the cached user permissions when devices, groups, or group members change:
+        from switches.models import Switch, SwitchGroup, SwitchGroupMembership
+        from switches.permissions import clear_permissions_cache
+
+        for model in (Switch, SwitchGroup, SwitchGroupMembership):
+            post_save.connect(clear_permissions_cache, sender=model, dispatch_uid=f"openl2m_permissions_save_{model}")
+            post_delete.connect(clear_permissions_cache, sender=model, dispatch_uid=f"openl2m_permissions_del_{model}")
+        for through in (SwitchGroup.users.through, SwitchGroup.switches.through):
+            m2m_changed.connect(
+                clear_permissions_cache, sender=through, dispatch_uid=f"openl2m_permissions_m2m_{through}"
+            )
+
+        # the device read sharing and device health tracking need a cache shared by all worker processes:
+        if not settings.CACHE_IS_SHARED and (settings.SHARED_READ_ENABLED or settings.DEVICE_FAILURE_THRESHOLD):
+            logging.getLogger(__name__).warning(
+                f"The cache backend '{settings.CACHES['default']['BACKEND']}' is not shared between worker processes! "
+                "Device read sharing and device health tracking only work inside each process. "
+                "Please configure a shared cache, e.g. the database cache (see CACHES in configuration.example.py)."
+            )
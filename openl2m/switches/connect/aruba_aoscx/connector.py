@@ -13,6 +13,7 @@
 #
 import datetime
 import traceback
+from urllib.parse import quote_plus, unquote_plus
 
 
 #
@@ -39,12 +40,14 @@ from pyaoscx.vrf import Vrf as AosCxVrf
 # used to disable unknown SSL cert warnings:
 import urllib3
 
+from django.conf import settings
 
 from switches.utils import dprint, dvar
 from switches.constants import LOG_TYPE_ERROR, LOG_AOSCX_ERROR_GENERIC
 from switches.connect.classes import Interface, PoePort, NeighborDevice, Transceiver
 from switches.connect.connector import Connector
-from switches.connect.aruba_aoscx.utils import aoscx_parse_duplex
+from switches.connect.sessionpool import SessionPool
+from switches.connect.aruba_aoscx.utils import aoscx_parse_duplex, aoscx_reference_name
 from switches.connect.constants import (
     POE_PORT_ADMIN_DISABLED,
     POE_PORT_ADMIN_ENABLED,
@@ -464,13 +467,74 @@ class AosCxConnector(Connector):
     def get_my_client_data(self) -> bool:
         '''
         read mac addressess, and lldp neigbor info.
-        Not yet fully supported in AOS-CX API.
+        We first try to read these in bulk, for all vlans and interfaces at once.
+        If that fails, we fall back to reading them per vlan or interface.
         return True on success, False on error and set self.error variables
         '''
 
         if not self._open_device():
             dprint("_open_device() failed!")
             return False
+
+        if not self._get_macs_bulk():
+            self._get_macs_per_vlan()
+
+        if not self._get_lldp_bulk():
+            self._get_lldp_per_interface()
+
+        # done...
+        self._close_device()
+        return True
+
+    def _get_macs_bulk(self) -> bool:
+        '''
+        Read the mac address table of all vlans in a single REST call, using a wildcard for the vlan,
+        and only requesting the attributes we need.
+
+        Returns:
+            (bool): True if the table was read, False if not.
+        '''
+        dprint("Getting MAC table for ALL vlans:")
+        path = f"system/vlans/{quote_plus('*')}/macs"
+        try:
+            response = self.aoscx_session.request(
+                "GET", path, params={"depth": 2, "attributes": "mac_addr,port"}
+            )
+            if response.status_code != 200:
+                dprint(f"  bulk MAC read returned {response.status_code}: {response.text}")
+                return False
+            # this is indexed by vlan id, and then by "<from>,<mac>":
+            vlans = response.json()
+            # parse everything first, so we do not add any entries if the per-vlan read has to be used:
+            entries = []
+            if not isinstance(vlans, dict):
+                dprint(f"  unexpected bulk MAC data: {type(vlans)}")
+                return False
+            for vlan_id, macs in vlans.items():
+                if not isinstance(macs, dict):
+                    dprint(f"  unexpected bulk MAC data for vlan {vlan_id}: {type(macs)}")
+                    return False
+                for mac in macs.values():
+                    try:
+                        if_name = aoscx_reference_name(mac['port'])
+                        if if_name:
+                            entries.append((if_name, mac['mac_addr'], int(vlan_id)))
+                    except Exception as err:
+                        dprint(f"ERROR parsing MAC entry {mac}: {err}")
+                    # just try the next one...
+        except Exception as err:
+            dprint(f"  ERROR in bulk MAC read: {err}")
+            return False
+
+        for if_name, eth_address, vlan_id in entries:
+            self.add_learned_ethernet_address(if_name=if_name, eth_address=eth_address, vlan_id=vlan_id)
+        return True
+
+    def _get_macs_per_vlan(self):
+        '''
+        Read the mac address table one vlan at a time, and then each mac address.
+        This is the slow fallback for _get_macs_bulk().
+        '''
         # get mac address table, this is based on vlans:
         dprint("Getting MAC table per VLAN:")
         for vlan_id in self.vlans:
@@ -509,6 +573,57 @@ class AosCxConnector(Connector):
                         dprint(f"ERROR in mac.get(): {err}")
                     # just try the next one...
 
+    def _get_lldp_bulk(self) -> bool:
+        '''
+        Read the lldp neighbors of all interfaces in a single REST call, using a wildcard for the interface,
+        and only requesting the attributes we need.
+
+        Returns:
+            (bool): True if the neighbors were read, False if not.
+        '''
+        dprint("Getting LLDP data for ALL interfaces:")
+        path = f"system/interfaces/{quote_plus('*')}/lldp_neighbors"
+        try:
+            response = self.aoscx_session.request(
+                "GET", path, params={"depth": 2, "attributes": "chassis_id,port_id,neighbor_info"}
+            )
+            if response.status_code != 200:
+                dprint(f"  bulk LLDP read returned {response.status_code}: {response.text}")
+                return False
+            # this is indexed by interface name, and then by "<chassis_id>,<port_id>":
+            interfaces = response.json()
+            # parse everything first, so we do not add any neighbors if the per-interface read has to be used:
+            entries = []
+            if not isinstance(interfaces, dict):
+                dprint(f"  unexpected bulk LLDP data: {type(interfaces)}")
+                return False
+            for if_name, neighbors in interfaces.items():
+                if not isinstance(neighbors, dict):
+                    dprint(f"  unexpected bulk LLDP data for interface {if_name}: {type(neighbors)}")
+                    return False
+                for nb in neighbors.values():
+                    try:
+                        entries.append((unquote_plus(if_name), nb['chassis_id'], nb['port_id'], nb['neighbor_info']))
+                    except Exception as err:
+                        dprint(f"ERROR parsing LLDP entry {nb}: {err}")
+                    # just try the next one...
+        except Exception as err:
+            dprint(f"  ERROR in bulk LLDP read: {err}")
+            return False
+
+        for if_name, chassis_id, port_id, info in entries:
+            try:
+                self._add_lldp_neighbor(if_name=if_name, chassis_id=chassis_id, port_id=port_id, info=info)
+            except Exception as err:
+                dprint(f"ERROR adding LLDP neighbor {chassis_id} on {if_name}: {err}")
+            # just try the next one...
+        return True
+
+    def _get_lldp_per_interface(self):
+        '''
+        Read the lldp neighbors one interface at a time, and then each neighbor.
+        This is the slow fallback for _get_lldp_bulk().
+        '''
         dprint("Getting LLDP data per INTERFACE:")
         for if_name in self.interfaces:
             dprint(f"  Interface {if_name}:")
@@ -521,38 +636,9 @@ class AosCxConnector(Connector):
                         nb.get()
                         # for attrib, value in nb.__dict__.items():
                         #    dprint(f"  {attrib} -> {value}")
-                        # get an OpenL2M NeighborDevice()
-                        neighbor = NeighborDevice(nb.chassis_id)
-                        neighbor.set_sys_name(nb.neighbor_info['chassis_name'])
-                        neighbor.set_sys_description(nb.neighbor_info['chassis_description'])
-                        # remote device port info:
-                        neighbor.port_name = nb.port_id
-                        neighbor.set_port_description(nb.neighbor_info['port_description'])
-                        # remote chassis info:
-                        neighbor.set_chassis_string(nb.chassis_id)
-                        if nb.neighbor_info['chassis_id_subtype'] == 'link_local_addr':
-                            neighbor.set_chassis_type(LLDP_CHASSIC_TYPE_ETH_ADDR)
-                        # parse capabilities:
-                        capabilities = nb.neighbor_info['chassis_capability_enabled'].lower()
-                        dprint(f"  Capabilities: {capabilities}")
-                        if 'bridge' in capabilities:
-                            neighbor.set_capability(LLDP_CAPABILITIES_BRIDGE)
-                        if 'router' in capabilities:
-                            neighbor.set_capability(LLDP_CAPABILITIES_ROUTER)
-                        # Following NOT tested; we are assuming the following two are correct:
-                        if 'wlan' in capabilities:
-                            neighbor.set_capability(LLDP_CAPABILITIES_WLAN)
-                        if 'phone' in capabilities:
-                            neighbor.set_capability(LLDP_CAPABILITIES_PHONE)
-                        # remote device management address, this is a list(), take first entry
-                        if len(nb.neighbor_info['mgmt_ip_list']) > 0:
-                            # hardcoding to IPv4 for now...
-                            neighbor.set_management_address(
-                                address=nb.neighbor_info['mgmt_ip_list'], type=IANA_TYPE_IPV4
-                            )
-                        # add to device interface:
-                        self.add_neighbor_object(if_name, neighbor)
-
+                        self._add_lldp_neighbor(
+                            if_name=if_name, chassis_id=nb.chassis_id, port_id=nb.port_id, info=nb.neighbor_info
+                        )
                     except Exception as err:
                         dprint(f"ERROR in neighbor.get(): {err}")
                     # just try the next one...
@@ -564,9 +650,45 @@ class AosCxConnector(Connector):
                 self.add_log(type=LOG_TYPE_ERROR, action=LOG_AOSCX_ERROR_GENERIC, description=details)
                 continue
 
-        # done...
-        self._close_device()
-        return True
+    def _add_lldp_neighbor(self, if_name: str, chassis_id: str, port_id: str, info: dict):
+        '''
+        Add an lldp neighbor, as read from the device, to an interface.
+
+        Args:
+            if_name (str): the interface name.
+            chassis_id (str): the neighbor chassis id.
+            port_id (str): the neighbor port id.
+            info (dict): the 'neighbor_info' attribute of the AOS-CX LLDP neighbor.
+        '''
+        # get an OpenL2M NeighborDevice()
+        neighbor = NeighborDevice(chassis_id)
+        neighbor.set_sys_name(info['chassis_name'])
+        neighbor.set_sys_description(info['chassis_description'])
+        # remote device port info:
+        neighbor.port_name = port_id
+        neighbor.set_port_description(info['port_description'])
+        # remote chassis info:
+        neighbor.set_chassis_string(chassis_id)
+        if info['chassis_id_subtype'] == 'link_local_addr':
+            neighbor.set_chassis_type(LLDP_CHASSIC_TYPE_ETH_ADDR)
+        # parse capabilities:
+        capabilities = info['chassis_capability_enabled'].lower()
+        dprint(f"  Capabilities: {capabilities}")
+        if 'bridge' in capabilities:
+            neighbor.set_capability(LLDP_CAPABILITIES_BRIDGE)
+        if 'router' in capabilities:
+            neighbor.set_capability(LLDP_CAPABILITIES_ROUTER)
+        # Following NOT tested; we are assuming the following two are correct:
+        if 'wlan' in capabilities:
+            neighbor.set_capability(LLDP_CAPABILITIES_WLAN)
+        if 'phone' in capabilities:
+            neighbor.set_capability(LLDP_CAPABILITIES_PHONE)
+        # remote device management address, this is a list(), take first entry
+        if len(info['mgmt_ip_list']) > 0:
+            # hardcoding to IPv4 for now...
+            neighbor.set_management_address(address=info['mgmt_ip_list'], type=IANA_TYPE_IPV4)
+        # add to device interface:
+        self.add_neighbor_object(if_name, neighbor)
 
     def set_interface_admin_status(self, interface: Interface, new_state: bool) -> bool:
         """
@@ -901,7 +1023,8 @@ class AosCxConnector(Connector):
 
     def _open_device(self) -> bool:
         '''
-        get a pyaoscx "driver" and open a "connection" to the device
+        get a pyaoscx "driver" and open a "connection" to the device.
+        If enabled, this reuses a logged-in session from the worker session pool.
         return True on success, False on failure, and will set self.error
         '''
         dprint("AOS-CX _open_device()")
@@ -926,19 +1049,12 @@ class AosCxConnector(Connector):
             # urllib3.disable_warnings()
 
         try:
-            dprint(f"  Creating AosCxSession(ip_address={self.switch.primary_ip4}, api={API_VERSION})")
-            self.aoscx_session = AosCxSession(ip_address=self.switch.primary_ip4, api=API_VERSION)
-            dprint(
-                f"Opening as '{self.switch.netmiko_profile.username}', password='{self.switch.netmiko_profile.password}'"
-            )
-            self.aoscx_session.open(
-                username=self.switch.netmiko_profile.username, password=self.switch.netmiko_profile.password
-            )
-            dprint("  session OK!")
-            # dprint(f"  SESSION.cookies():\n{self.aoscx_session.cookies()}")
-            # dprint(f"  SESSION.s:\n{self.aoscx_session.s}")
-            # dprint(f"  SESSION.s(pformat):\n{pprint.pformat(self.aoscx_session.s)}")
-
+            if settings.AOSCX_SESSION_POOL_SIZE:
+                self.aoscx_session = aoscx_session_pool.get(
+                    device=self.switch.id, credentials=self._pool_credentials(), open_session=self._new_session
+                )
+            else:
+                self.aoscx_session = self._new_session()
             return True
         except Exception as err:
             self.error.status = True
@@ -947,9 +1063,33 @@ class AosCxConnector(Connector):
             dprint(f"  _open_device: AosCxSession.open() failed: {format(err)}")
             return False
 
+    def _new_session(self) -> AosCxSession:
+        '''
+        Create and log in to a new AOS-CX REST session.
+
+        Returns:
+            (AosCxPooledSession): the logged in session. Any login error is raised.
+        '''
+        dprint(f"  Creating AosCxSession(ip_address={self.switch.primary_ip4}, api={API_VERSION})")
+        session = AosCxPooledSession(ip_address=self.switch.primary_ip4, api=API_VERSION)
+        dprint(f"Opening as '{self.switch.netmiko_profile.username}'")
+        session.open(username=self.switch.netmiko_profile.username, password=self.switch.netmiko_profile.password)
+        dprint("  session OK!")
+        # dprint(f"  SESSION.cookies():\n{session.cookies()}")
+        # dprint(f"  SESSION.s:\n{session.s}")
+        return session
+
+    def _pool_credentials(self) -> tuple:
+        '''
+        The credentials part of the session pool key. If the profile changes, we need a new session.
+        '''
+        profile = self.switch.netmiko_profile
+        return (profile.id, profile.username, profile.password, self.switch.primary_ip4)
+
     def _close_device(self) -> bool:
         '''
-        make sure we properly close the AOS-CX REST Session
+        make sure we properly close the AOS-CX REST Session.
+        If pooled, the logged-in session is returned to the pool instead.
         '''
         dprint("AOS-CX _close_device()")
         if self.aoscx_session:
@@ -960,10 +1100,46 @@ class AosCxConnector(Connector):
                 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
                 # or all warnings:
                 # urllib3.disable_warnings()
-            self.aoscx_session.close()
-            del self.aoscx_session
+            if settings.AOSCX_SESSION_POOL_SIZE:
+                aoscx_session_pool.release(
+                    device=self.switch.id, credentials=self._pool_credentials(), session=self.aoscx_session
+                )
+                dprint("  session returned to pool!")
+            else:
+                self.aoscx_session.close()
+                dprint(("  session close OK!"))
             self.aoscx_session = False
-            dprint(("  session close OK!"))
         else:
             dprint("  NOT Needed (no session!)")
         return True
+
+
+class AosCxPooledSession(AosCxSession):
+    """
+    An AOS-CX REST session that logs in again if the device expired the session,
+    e.g. when it was idle in the session pool for longer than the device session timeout.
+    """
+
+    def request(self, *args, **kwargs):
+        response = super().request(*args, **kwargs)
+        if response.status_code == 401:
+            dprint("AosCxPooledSession: got 401, logging in again")
+            self.open(username=self.username(), password=self.password())
+            response = super().request(*args, **kwargs)
+        return response
+
+
+def _logout_session(session: AosCxSession):
+    '''
+    Log out of a session that is removed from the pool.
+    '''
+    session.close()
+
+
+# the logged-in REST sessions of this worker process:
+aoscx_session_pool = SessionPool(
+    name="AOS-CX",
+    max_sessions=settings.AOSCX_SESSION_POOL_SIZE,
+    idle_timeout=settings.AOSCX_SESSION_IDLE_TIMEOUT,
+    close_session=_logout_session,
+)
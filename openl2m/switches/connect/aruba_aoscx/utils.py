@@ -12,6 +12,8 @@
 # License along with OpenL2M. If not, see <http://www.gnu.org/licenses/>.
 #
 
+from urllib.parse import unquote_plus
+
 from switches.connect.constants import IF_DUPLEX_UNKNOWN, IF_DUPLEX_HALF, IF_DUPLEX_FULL
 
 
@@ -37,3 +39,23 @@ def aoscx_parse_duplex(duplex: str) -> int:
         return IF_DUPLEX_HALF
 
     return IF_DUPLEX_UNKNOWN
+
+
+def aoscx_reference_name(reference) -> str:
+    '''
+    Get the name of the object in an AOS-CX REST reference attribute, e.g. the 'port' of a mac address.
+    This is either a dict {"<name>": "<uri>"}, or the uri string itself.
+
+    Args:
+        reference (dict or str): the reference attribute.
+
+    Returns:
+        (str): the (unquoted) name of the referenced object, or "" if not found.
+    '''
+    if isinstance(reference, dict):
+        if not reference:
+            return ""
+        return unquote_plus(next(iter(reference)))
+    if isinstance(reference, str):
+        return unquote_plus(reference.rstrip("/").split("/")[-1])
+    return ""
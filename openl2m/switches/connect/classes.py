@@ -13,7 +13,7 @@
 #
 import array
 import netaddr
-from typing import Dict, List
+from typing import Dict, List, Set
 
 from django.conf import settings
 from django.utils.encoding import iri_to_uri
@@ -191,6 +191,56 @@ class Vlan:
         return self.display_name()
 
 
+# lookup table to reverse all bits in a byte, i.e. bit 8 goes to 1, 7 to 2, etc.
+BITS_REVERSED = bytes(int(f"{octet:08b}"[::-1], 2) for octet in range(256))
+# lookup table with the positions of the bits set in a byte, in system order,
+# ie. bit 1 is first bit in stream, i.e. HIGH order bit! This is position 0.
+BITS_SET = tuple(tuple(bit for bit in range(8) if octet & (128 >> bit)) for octet in range(256))
+
+
+def bitmap_to_bytes(bitmap: str | bytes) -> bytes:
+    """
+    Convert a bitmap as returned by the snmp library (a string, where each character is a byte)
+    to a bytes() object.
+
+    Args:
+        bitmap (str or bytes): the bitmap (OCTETSTRING) to convert.
+
+    Returns:
+        (bytes): the bitmap as bytes.
+    """
+    if isinstance(bitmap, (bytes, bytearray)):
+        return bytes(bitmap)
+    try:
+        return bitmap.encode("latin-1")
+    except UnicodeEncodeError:
+        # only the low 8 bits of each character are part of the bitmap:
+        return bytes(ord(char) & 0xFF for char in bitmap)
+
+
+def bitmap_to_positions(bitmap: str | bytes, first: int = 1) -> List[int]:
+    """
+    Decode a bitmap into the list of positions of the bits that are set, in one pass.
+    The most significant bit of the first byte is regarded as position 'first'.
+    This is used to decode the Q-Bridge PortList bitmaps (where 'first' is port id 1),
+    and the vlan bitmaps in various vendor mibs (where 'first' is typically vlan 0).
+
+    Args:
+        bitmap (str or bytes): the bitmap (OCTETSTRING) to decode.
+        first (int): the value of the first bit position.
+
+    Returns:
+        (list): the positions of all bits set, in increasing order.
+    """
+    positions = []
+    for offset, octet in enumerate(bitmap_to_bytes(bitmap)):
+        # most bytes are 0 in a typical bitmap, skip them fast:
+        if octet:
+            base = (offset * 8) + first
+            positions.extend(base + bit for bit in BITS_SET[octet])
+    return positions
+
+
 class PortList:
     """
     Object to handle the Q-BRIDGE PortList bitmap that exists per vlan.
@@ -211,16 +261,14 @@ class PortList:
         """
         Initialize the bytes from this unicode bitmap string
         """
-        for byte in bitmap_string:
-            self.portlist.append(ord(byte))
+        self.portlist.frombytes(bitmap_to_bytes(bitmap_string))
 
     def from_byte_count(self, bytecount: int) -> None:
         """
         Initialize by setting a number of bytes to 0
         """
         dprint(f"PortList bytecount size={bytecount}")
-        for i in range(int(bytecount)):
-            self.portlist.append(0)
+        self.portlist.frombytes(bytes(int(bytecount)))
 
     def tobytes(self) -> bytes:
         """
@@ -251,29 +299,15 @@ class PortList:
     def reverse_bits_in_bytes(self) -> None:
         """
         Reverse all bits in each byte. I.e. bit 8 goes to 1, 7 to 2, etc.
-        There is probably a much more efficient way to do this!
         """
-        offset = 0
-        for octet in self.portlist:
-            new_octet = 0
-            if octet & 128:
-                new_octet += 1
-            if octet & 64:
-                new_octet += 2
-            if octet & 32:
-                new_octet += 4
-            if octet & 16:
-                new_octet += 8
-            if octet & 8:
-                new_octet += 16
-            if octet & 4:
-                new_octet += 32
-            if octet & 2:
-                new_octet += 64
-            if octet & 1:
-                new_octet += 128
-            self.portlist[offset] = new_octet
-            offset += 1
+        self.portlist = array.array('B', self.portlist.tobytes().translate(BITS_REVERSED))
+
+    def port_ids(self) -> List[int]:
+        """
+        Return the list of port id's that have their bit set in this PortList.
+        Port id 1 is the most significant bit of the first byte.
+        """
+        return bitmap_to_positions(self.portlist.tobytes())
 
     def __len__(self) -> int:
         return len(self.portlist) * 8
@@ -1008,9 +1042,9 @@ class Interface:
         self.untagged_vlan: int = (
             -1
         )  # the vlan id of the interface in untagged mode. This is invalid if tagged/trunked !
-        self.vlans: List[int] = (
-            []
-        )  # list (array) of vlanId's (as int) on this interface. If size > 0 this is a tagged port!
+        self.vlans: Set[int] = (
+            set()
+        )  # set of vlanId's (as int) on this interface. If size > 0 this is a tagged port!
         self.vlan_count: int = 0
         self.is_tagged: bool = False  # if 802.1q tagging or trunking is enabled
         # some vendors (e.g. Comware, Cisco-SB) have a interface vlan mode:
@@ -1087,7 +1121,7 @@ class Interface:
         Return True on success, False on failure and sets error variable.
         '''
         self.is_tagged = True
-        self.vlans.append(int(vlan_id))
+        self.vlans.add(int(vlan_id))
         # return True
 
     def remove_tagged_vlan(self, vlan_id: int) -> None:
@@ -1181,7 +1215,7 @@ class Interface:
         elif self.is_tagged:
             inf['mode'] = "Tagged"
             # need to handle tagged vlans
-            inf["tagged_vlans"] = ", ".join(map(str, self.vlans))
+            inf["tagged_vlans"] = ", ".join(map(str, sorted(self.vlans)))
         else:
             inf["mode"] = "Access"
         if self.untagged_vlan > 0:
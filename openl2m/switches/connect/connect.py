@@ -33,6 +33,7 @@ from switches.constants import (
 )
 
 from switches.connect.connector import Connector
+from switches.connect.health import device_connect_failed, device_connect_succeeded
 
 # here are the device specific classes.
 # this should be made dynamic at some point!
@@ -83,7 +84,17 @@ def get_connection_object(request: HttpRequest, group: SwitchGroup, switch: Swit
         # go probe to find vendor type
         dprint("SNMP: Probing device...")
         conn = SnmpProbeConnector(request, group, switch)
-        snmp_oid = conn.get_system_oid()
+        if conn.can_connect():
+            try:
+                snmp_oid = conn.get_system_oid()
+            except Exception as err:
+                device_connect_failed(switch.id, str(err))
+                raise err
+            device_connect_succeeded(switch.id)
+        else:
+            # the device is known to be unreachable, do not probe. get_basic_info() will fail fast.
+            dprint(f"SNMP: NOT probing, {conn.connect_denied_reason}")
+            snmp_oid = False
         if snmp_oid:
             # we have the ObjectID, what kind of vendor is it:
             dprint(f"   Checking device type for {snmp_oid}")
@@ -125,6 +136,10 @@ def get_connection_object(request: HttpRequest, group: SwitchGroup, switch: Swit
         else:
             connection = SnmpConnector(request, group, switch)
 
+        # we already checked the device health while probing:
+        connection.connect_allowed = conn.connect_allowed
+        connection.connect_denied_reason = conn.connect_denied_reason
+
     # This is the "custom" Aruba AOS CX connector, using the device REST API.
     elif switch.connector_type == CONNECTOR_TYPE_AOSCX:
         connection = AosCxConnector(request, group, switch)
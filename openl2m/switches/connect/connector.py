@@ -13,22 +13,34 @@
 #
 from collections import OrderedDict
 import datetime
+import hashlib
 import jsonpickle
 import lib.manuf.manuf as manuf
 import natsort
 import netmiko
 import re
+import threading
 import time
 import traceback
 from typing import Any, Dict, List
 
 from django.conf import settings
+from django.core.cache import cache
+from django.db import connection as db_connection
 from django.http.request import HttpRequest
 
 from switches.models import Switch, SwitchGroup, Command, Log
 from switches.connect.constants import LLDP_CHASSIC_TYPE_ETH_ADDR
 from switches.constants import LOG_TYPE_WARNING, LOG_CONNECTION_ERROR, LOG_TYPE_ERROR, CMD_TYPE_INTERFACE
-from switches.utils import dprint, get_remote_ip, get_ip_dns_name
+from switches.utils import dprint, get_remote_ip, get_ip_dns_name, get_switch_cache_key, time_duration
+from switches.connect.health import (
+    device_can_connect,
+    device_connect_succeeded,
+    device_connect_failed,
+    device_session_start,
+    device_session_end,
+)
+from switches.connect.sessionpool import SessionPool, SessionPoolFull, close_abandoned_sessions
 from switches.connect.classes import (
     Error,
     PoePort,
@@ -58,6 +70,26 @@ from switches.connect.constants import (
 
 from rest_framework.reverse import reverse as rest_reverse
 
+# seconds between checks for the result of a device read by another request:
+SHARED_READ_POLL_INTERVAL = 0.25
+
+# seconds between reads of the SSH channel when streaming command output, see netmiko_stream_command():
+SSH_STREAM_READ_INTERVAL = 0.1
+# for devices that use netmiko_ignore_prompt, the command is done when no output is received for this many seconds:
+SSH_STREAM_IDLE_TIME = 2
+
+# groups of device data that are read on demand, ie. when the Info tab or API field needs them,
+# unless settings.DEVICE_INFO_EAGER is set. See get_device_info().
+# For each group: the driver function to call, the timing name,
+# and the Interface() and Vlan() attributes it sets (other Connector() attributes are detected).
+DEVICE_INFO_GROUPS = {
+    "hardware": ("get_my_hardware_details", "HW Info Read", [], []),
+    "health": ("check_my_device_health", "Device Health", [], []),
+    "vrfs": ("get_my_vrfs", "VRF Info Read", ["vrf_name"], ["vrf"]),
+}
+# Connector() attributes that are never part of the device info groups:
+DEVICE_INFO_IGNORE = ["interfaces", "vlans", "more_info", "warnings", "timing", "device_info_read"]
+
 '''
 Base Connector() class for OpenL2M.
 This implements the interface that is expected by the higher level code
@@ -103,6 +135,20 @@ class Connector:
             "error",
             "eth_addr_count",
             "neighbor_count",
+            "connect_allowed",
+            "connect_denied_reason",
+            "netmiko_connection",
+        ]
+        # attributes that are specific to this request or user, and are not shared with concurrent requests:
+        self._do_not_share = [
+            "_do_not_share",
+            "allowed_vlans",
+            "read_only",
+            "last_accessed",
+            "cache_loaded",
+            "connect_allowed",
+            "connect_denied_reason",
+            "basic_info_stale",
         ]
 
         self.hostname = ""  # system hostname, typically set in sub-class
@@ -121,8 +167,13 @@ class Connector:
         )  # the IPv4 addresses as keys, with stored value if_index; needed to map netmask to interface
         # some flags:
         self.cache_loaded = False  # if True, system data was loaded from cache
+        # device health ("circuit breaker") check, see can_connect():
+        self.connect_allowed = None  # None if not checked yet, True or False after checking.
+        self.connect_denied_reason = ""  # if not allowed, the reason why.
         # some timestamps:
         self.basic_info_read_timestamp = 0  # when the last 'basic' read occured
+        self.basic_info_stale = False  # if True, the data shown came from an older shared read, see get_basic_info()
+        self.device_info_read: Dict[str, float] = {}  # when each of the DEVICE_INFO_GROUPS was read
 
         # data we calculate or collect without caching:
         self.allowed_vlans: Dict[int, Vlan] = (
@@ -168,6 +219,7 @@ class Connector:
         self.netmiko_ignore_prompt = False
         # variable to deal with the SSH connection:
         self.netmiko_connection = False  # return from Netmiko.ConnectHandler()
+        self.netmiko_device_type_used = ""  # the device_type of the above connection
         # self.netmiko_timeout = settings.SSH_TIMEOUT  # should be SSH timeout/retry values
         # self.netmiko_retries = settings.SSH_RETRIES
         self.netmiko_output = ""  # any output from a netmiko/ssh command executed.
@@ -339,75 +391,522 @@ class Connector:
             if self.switch.netmiko_profile:
                 self.add_more_info('System', 'Credentials Profile', self.switch.netmiko_profile.name)
 
-            # call the implementation-specific function:
-            if hasattr(self, 'get_my_basic_info'):
-                # set this to the time the switch data was actually read,
-                self.basic_info_read_timestamp = time.time()
-                success = self.get_my_basic_info()
-                # update the time it took to read the basic info when it was first read:
-                read_duration = time.time() - self.basic_info_read_timestamp
-                if not success:
-                    self.add_warning(f"WARNING: cannot get basic info - {self.error.description}")
-                    if self.error.details:
-                        self.add_warning(f"Connection Error: {self.error.details}")
-                else:
-                    self.add_timing('Basic Info Read', 1, read_duration)
-                    # All OK, now set the permissions to the interfaces:
-                    self._set_interfaces_permissions()
+            # read the device, or reuse the data read by a concurrent request:
+            if self._read_device_data_shared():
+                # All OK, now set the permissions to the interfaces:
+                self._set_interfaces_permissions()
 
-            else:
-                self.add_warning("WARNING: device driver does not support 'get_my_basic_info()' !")
+            self._add_access_info()
 
-            # see if we can get hardware details from the driver:
-            if hasattr(self, 'get_my_hardware_details'):
-                start_time = time.time()
-                self.get_my_hardware_details()
-                self.add_timing('HW Info Read', 1, time.time() - start_time)
-            # this is optional, so we do not warn if not found!
+            # and save the switch cache:
+            # self.save_cache()
+        else:
+            dprint("  ==> Already loaded from cache!")
+            if self.basic_info_stale:
+                # we showed older data, see if the background refresh has finished:
+                self._load_refreshed_device_data()
+        return True
 
-            # see if we can get device health details from the driver:
-            if hasattr(self, 'check_my_device_health'):
-                start_time = time.time()
-                self.check_my_device_health()
-                self.add_timing('Device Health', 1, time.time() - start_time)
-            # this is optional, so we do not warn if not found!
+    def _add_access_info(self):
+        '''
+        Add the info about access, change and command times to the 'System' more_info.
 
-            # see if the driver has VRF support:
-            if hasattr(self, 'get_my_vrfs'):
-                start_time = time.time()
-                self.get_my_vrfs()
-                self.add_timing('VRF Info Read', 1, time.time() - start_time)
-            # this is optional, so we do not warn if not found!
+        Args:
+            none
 
-            # info about access times, etc.
-            default_time = datetime.datetime(2000, 1, 1, 0, 0, 0, 0, datetime.timezone.utc)
+        Returns:
+            none
+        '''
+        # info about access times, etc.
+        default_time = datetime.datetime(2000, 1, 1, 0, 0, 0, 0, datetime.timezone.utc)
 
-            # by the time we get here, the access timestamp for this switch instance has already
-            # been written. This previous data was stored in the Connection() object during init:
-            if self.last_accessed == default_time:
-                self.add_more_info("System", "Last Accessed", "never")
-            else:
-                self.add_more_info("System", "Last Accessed", self.last_accessed)
-                self.add_more_info("System", "Access Count", self.switch.access_count)
+        # by the time we get here, the access timestamp for this switch instance has already
+        # been written. This previous data was stored in the Connection() object during init:
+        if self.last_accessed == default_time:
+            self.add_more_info("System", "Last Accessed", "never")
+        else:
+            self.add_more_info("System", "Last Accessed", self.last_accessed)
+            self.add_more_info("System", "Access Count", self.switch.access_count)
 
-            if self.switch.last_changed == default_time:
-                self.add_more_info("System", "Last Changed", "never")
-            else:
-                self.add_more_info("System", "Last Changed", self.switch.last_changed)
-                self.add_more_info("System", "Change Count", self.switch.change_count)
+        if self.switch.last_changed == default_time:
+            self.add_more_info("System", "Last Changed", "never")
+        else:
+            self.add_more_info("System", "Last Changed", self.switch.last_changed)
+            self.add_more_info("System", "Change Count", self.switch.change_count)
+
+        if self.switch.last_command_time == default_time:
+            self.add_more_info("System", "Last Command", "never")
+        else:
+            self.add_more_info("System", "Last Command", self.switch.last_command_time)
+            self.add_more_info("System", "Command Count", self.switch.command_count)
+
+    def _read_device_data(self) -> bool:
+        '''
+        Read the data from the device, by calling the device implementation specific functions.
+        This reads the basic info, and if implemented, the hardware details, device health and vrfs.
 
-            if self.switch.last_command_time == default_time:
-                self.add_more_info("System", "Last Command", "never")
+        Args:
+            none
+
+        Returns:
+            True if the basic info was read, False on error and set self.error variables
+        '''
+        # fail fast if the device is known to be unreachable, or too busy:
+        if not self.can_connect():
+            self.error.status = True
+            self.error.description = self.connect_denied_reason
+            self.add_warning(warning=f"WARNING: {self.connect_denied_reason}", add_log=False)
+            return False
+        if not device_session_start(self.switch.id):
+            self.error.status = True
+            self.error.description = "Too many users are accessing this device. Please try again in a moment."
+            self.add_warning(warning=f"WARNING: {self.error.description}", add_log=False)
+            return False
+
+        try:
+            success = self._read_device_data_from_driver()
+        finally:
+            device_session_end(self.switch.id)
+
+        # update the device health:
+        if success:
+            device_connect_succeeded(self.switch.id)
+        else:
+            device_connect_failed(self.switch.id, self.error.description)
+        return success
+
+    def _read_device_data_from_driver(self) -> bool:
+        '''
+        Call the device implementation specific functions to read the data, see _read_device_data()
+
+        Args:
+            none
+
+        Returns:
+            True if the basic info was read, False on error and set self.error variables
+        '''
+        success = False
+        # call the implementation-specific function:
+        if hasattr(self, 'get_my_basic_info'):
+            # set this to the time the switch data was actually read,
+            self.basic_info_read_timestamp = time.time()
+            success = self.get_my_basic_info()
+            # update the time it took to read the basic info when it was first read:
+            read_duration = time.time() - self.basic_info_read_timestamp
+            if not success:
+                self.add_warning(f"WARNING: cannot get basic info - {self.error.description}")
+                if self.error.details:
+                    self.add_warning(f"Connection Error: {self.error.details}")
             else:
-                self.add_more_info("System", "Last Command", self.switch.last_command_time)
-                self.add_more_info("System", "Command Count", self.switch.command_count)
+                self.add_timing('Basic Info Read', 1, read_duration)
 
-            # and save the switch cache:
-            # self.save_cache()
         else:
-            dprint("  ==> Already loaded from cache!")
+            self.add_warning("WARNING: device driver does not support 'get_my_basic_info()' !")
+
+        # read the hardware details, device health and vrfs now, if not read on demand:
+        if settings.DEVICE_INFO_EAGER:
+            for name in DEVICE_INFO_GROUPS.keys():
+                self._read_device_info_group(name)
+
+        return success
+
+    def can_connect(self) -> bool:
+        '''
+        Check the device health (aka. "circuit breaker") to see if we should try to connect to the device.
+        This is only checked once per request. If not allowed, self.connect_denied_reason is set.
+
+        Args:
+            none
+
+        Returns:
+            True if we can connect to the device, False if not.
+        '''
+        if self.connect_allowed is None:
+            self.connect_allowed, self.connect_denied_reason = device_can_connect(self.switch.id)
+        return self.connect_allowed
+
+    def _read_device_data_shared(self) -> bool:
+        '''
+        Read the device data, but coalesce concurrent reads of the same device (aka. "single-flight").
+        The first request reads the device, and stores the result in the shared cache.
+        Concurrent requests for the same device (in any worker process) wait for that read, and reuse the result.
+        If the other read does not finish in time, or fails, we read the device ourselves.
+
+        If the shared data is older than SHARED_READ_MAX_AGE, but not older than SHARED_READ_MAX_STALE,
+        we use it anyway and refresh it in the background (aka. "stale-while-revalidate").
+        The next view of the device will then show the refreshed data, see get_basic_info().
+
+        Note: the shared data is stored before the per-user interface permissions are applied!
+
+        Args:
+            none
+
+        Returns:
+            True if the basic info was read or loaded, False on error and set self.error variables
+        '''
+        if not settings.SHARED_READ_ENABLED or not self.switch.id:
+            return self._read_device_data()
+
+        snapshot = self._get_shared_device_data()
+        if snapshot:
+            age = time.time() - snapshot['saved_time']
+            if age <= settings.SHARED_READ_MAX_AGE:
+                self._load_shared_device_data(snapshot)
+                return True
+            if age <= settings.SHARED_READ_MAX_STALE:
+                dprint(f"  Shared read: using stale data ({int(age)} seconds old), refreshing in background!")
+                self._load_shared_device_data(snapshot)
+                self.basic_info_stale = True
+                self._start_background_refresh()
+                return True
+
+        lock_key = get_switch_cache_key(self.switch.id, "read-lock")
+        # cache.add() is atomic, and only succeeds if the key does not exist yet:
+        if cache.add(lock_key, get_remote_ip(self.request), timeout=settings.SHARED_READ_WAIT):
+            dprint("  Shared read: we are the first, reading device!")
+            try:
+                success = self._read_device_data()
+                if success:
+                    self._save_shared_device_data()
+            finally:
+                cache.delete(lock_key)
+            return success
+
+        # another request is reading this device, wait for that result:
+        dprint("  Shared read: device is being read by another request, waiting...")
+        start_time = time.time()
+        while time.time() - start_time < settings.SHARED_READ_WAIT:
+            time.sleep(SHARED_READ_POLL_INTERVAL)
+            snapshot = self._get_shared_device_data()
+            if snapshot and snapshot['saved_time'] >= start_time:
+                self._load_shared_device_data(snapshot)
+                self.add_timing('Shared Read Wait', 1, time.time() - start_time)
+                return True
+            if cache.get(lock_key) is None:
+                # the other read finished without result, ie. it failed. Stop waiting.
+                break
+        dprint("  Shared read: no result from other request, reading device!")
+        return self._read_device_data()
+
+    def _start_background_refresh(self):
+        '''
+        Start a background thread to read the device and refresh the shared data,
+        unless another request is already reading this device.
+
+        Args:
+            none
+
+        Returns:
+            none
+        '''
+        lock_key = get_switch_cache_key(self.switch.id, "read-lock")
+        if not cache.add(lock_key, get_remote_ip(self.request), timeout=settings.SHARED_READ_WAIT):
+            dprint("  Shared read: device is already being refreshed by another request.")
+            return
+        thread = threading.Thread(
+            target=self._background_refresh,
+            args=(lock_key,),
+            name=f"refresh-switch-{self.switch.id}",
+            daemon=True,
+        )
+        thread.start()
+
+    def _background_refresh(self, lock_key: str):
+        '''
+        Read the device in a new Connector() object, and store the result in the shared cache.
+        This runs in a background thread, see _start_background_refresh().
+
+        Args:
+            lock_key(str): the shared cache key of the read lock, released when done.
+
+        Returns:
+            none
+        '''
+        dprint(f"_background_refresh() started for switch {self.switch.id}")
+        try:
+            # the request (and its user session) is finished by now, so do not use it:
+            conn = self.__class__(None, self.group, self.switch)
+            if conn._read_device_data():
+                conn._save_shared_device_data()
+        except Exception as err:
+            dprint(f"  _background_refresh() failed: {repr(err)}")
+        finally:
+            cache.delete(lock_key)
+            # the request_finished signal does not run for this thread, so clean up any device sessions:
+            close_abandoned_sessions()
+            # this thread has its own database connection, close it:
+            db_connection.close()
+
+    def _load_refreshed_device_data(self):
+        '''
+        We are showing stale data from the session cache. If the shared data was refreshed
+        since then, load it, and re-apply the per-user interface permissions.
+
+        Args:
+            none
+
+        Returns:
+            none
+        '''
+        snapshot = self._get_shared_device_data()
+        if not snapshot or snapshot['read_time'] <= self.basic_info_read_timestamp:
+            dprint("  No refreshed device data yet.")
+            return
+        dprint("  Loading refreshed device data!")
+        self._load_shared_device_data(snapshot)
+        self.basic_info_stale = False
+        self._set_interfaces_permissions()
+        self._add_access_info()
+
+    def _get_shared_device_data(self) -> dict | None:
+        '''
+        Get the device data read by another request from the shared cache.
+
+        Args:
+            none
+
+        Returns:
+            (dict) with 'read_time', 'saved_time' and 'attributes', or None if not found.
+        '''
+        return cache.get(get_switch_cache_key(self.switch.id, "data"))
+
+    def _load_shared_device_data(self, snapshot: dict):
+        '''
+        Load the device data read by another request, see _get_shared_device_data().
+
+        Args:
+            snapshot(dict): the shared data, as stored by _save_shared_device_data()
+
+        Returns:
+            none
+        '''
+        dprint("_load_shared_device_data()")
+        start_time = time.time()
+        data = snapshot['attributes']
+        for attr_name, value in data.items():
+            # see save_cache() about jsonpickle.
+            self.__setattr__(attr_name, jsonpickle.decode(value, keys=True))
+        # the group may be different for this request:
+        self.add_more_info('System', 'Group', self.group.name)
+        self.add_timing("Shared Data Load", len(data), time.time() - start_time)
+
+    def _save_shared_device_data(self):
+        '''
+        Save the device data we just read in the shared cache, for use by concurrent requests.
+        This does not store per-request and per-user attributes, see self._do_not_share.
+        The data is kept for the longer of SHARED_READ_MAX_AGE and SHARED_READ_MAX_STALE.
+
+        Args:
+            none
+
+        Returns:
+            none
+        '''
+        dprint("_save_shared_device_data()")
+        # if the device was changed while we were reading it, the data may be outdated. See Switch.update_change()
+        if cache.get(get_switch_cache_key(self.switch.id, "changed"), 0) >= self.basic_info_read_timestamp:
+            dprint("  Device changed since the read started, not saving!")
+            return
+        data = {}
+        for attr_name, value in self.__dict__.items():
+            if attr_name not in self._do_not_cache and attr_name not in self._do_not_share:
+                data[attr_name] = jsonpickle.encode(value, keys=True)
+        snapshot = {
+            'read_time': self.basic_info_read_timestamp,  # when the device read started
+            'saved_time': time.time(),  # when it finished, used to check the age of the data
+            'attributes': data,
+        }
+        timeout = max(settings.SHARED_READ_MAX_AGE, settings.SHARED_READ_MAX_STALE)
+        cache.set(get_switch_cache_key(self.switch.id, "data"), snapshot, timeout=timeout)
+
+    def get_device_info(self, groups: List[str] | None = None) -> bool:
+        '''
+        Read the device data groups that are loaded on demand, ie. hardware details, device health and vrfs.
+        See DEVICE_INFO_GROUPS. Each group is cached separately, both in the user session and in the
+        shared cache, and is read again when older than the time set in settings.DEVICE_INFO_CACHE_TIMES.
+
+        Args:
+            groups (list): the names of the groups to read, or None for all groups.
+
+        Returns:
+            True if all requested groups are available, False if not.
+        '''
+        dprint(f"Connector.get_device_info() for {groups if groups else 'all groups'}")
+        success = True
+        for name in groups if groups else DEVICE_INFO_GROUPS.keys():
+            if self._device_info_group_needed(name):
+                success = self._get_device_info_group(name) and success
+        return success
+
+    def device_info_needed(self) -> bool:
+        '''
+        Check if any of the device info groups still need to be read, see get_device_info().
+        This is used by the templates to load the Info tab on demand.
+
+        Args:
+            none
+
+        Returns:
+            True if one or more groups need to be read, False if not.
+        '''
+        for name in DEVICE_INFO_GROUPS.keys():
+            if self._device_info_group_needed(name):
+                return True
+        return False
+
+    def _device_info_group_needed(self, name: str) -> bool:
+        '''
+        Check if a device info group is implemented by the driver, and not read, or read too long ago.
+
+        Args:
+            name (str): the name of the group, see DEVICE_INFO_GROUPS.
+
+        Returns:
+            True if the group needs to be read, False if not.
+        '''
+        (function, timing_name, if_attributes, vlan_attributes) = DEVICE_INFO_GROUPS[name]
+        if not hasattr(self, function):
+            return False
+        if name not in self.device_info_read:
+            return True
+        if settings.DEVICE_INFO_EAGER:
+            # this was read with the basic info.
+            return False
+        return time.time() - self.device_info_read[name] > settings.DEVICE_INFO_CACHE_TIMES.get(name, 0)
+
+    def _get_device_info_group(self, name: str) -> bool:
+        '''
+        Get a device info group from the shared cache, or read it from the device and add it to the shared cache.
+
+        Args:
+            name (str): the name of the group, see DEVICE_INFO_GROUPS.
+
+        Returns:
+            True if the group was loaded or read, False on error.
+        '''
+        cache_key = get_switch_cache_key(self.switch.id, f"info-{name}")
+        if settings.SHARED_READ_ENABLED and self.switch.id:
+            data = cache.get(cache_key)
+            if data:
+                dprint(f"  Device info '{name}' found in shared cache.")
+                start_time = time.time()
+                self._apply_device_info_group(name=name, info=jsonpickle.decode(data, keys=True))
+                self.add_timing(f"Shared {DEVICE_INFO_GROUPS[name][1]}", 1, time.time() - start_time)
+                return True
+
+        # fail fast if the device is known to be unreachable, or too busy:
+        if not self.can_connect():
+            self.add_warning(warning=f"WARNING: {self.connect_denied_reason}", add_log=False)
+            return False
+        if not device_session_start(self.switch.id):
+            self.add_warning(
+                warning="WARNING: Too many users are accessing this device. Please try again in a moment.",
+                add_log=False,
+            )
+            return False
+        try:
+            info = self._read_device_info_group(name)
+        finally:
+            device_session_end(self.switch.id)
+
+        if settings.SHARED_READ_ENABLED and self.switch.id:
+            cache.set(
+                cache_key,
+                jsonpickle.encode(info, keys=True),
+                timeout=settings.DEVICE_INFO_CACHE_TIMES.get(name, 0),
+            )
         return True
 
+    def _read_device_info_group(self, name: str) -> dict:
+        '''
+        Read a device info group from the device, by calling the driver function.
+        Keep track of the data this changes, so it can be shared with other requests.
+
+        Args:
+            name (str): the name of the group, see DEVICE_INFO_GROUPS.
+
+        Returns:
+            (dict) with the 'read_time', and the 'attributes', 'more_info', 'warnings', 'interfaces'
+            and 'vlans' data read.
+        '''
+        (function, timing_name, if_attributes, vlan_attributes) = DEVICE_INFO_GROUPS[name]
+        info = {
+            'read_time': time.time(),
+            'attributes': {},
+            'more_info': {},
+            'warnings': [],
+            'interfaces': {},
+            'vlans': {},
+        }
+        if not hasattr(self, function):
+            # this is optional, so we do not warn if not found!
+            return info
+
+        # remember the current state, so we can find what the driver changed:
+        attributes = {}
+        for attr_name, value in self.__dict__.items():
+            if (
+                attr_name not in self._do_not_cache
+                and attr_name not in self._do_not_share
+                and attr_name not in DEVICE_INFO_IGNORE
+            ):
+                attributes[attr_name] = jsonpickle.encode(value, keys=True)
+        more_info = {category: dict(items) for category, items in self.more_info.items()}
+        warning_count = len(self.warnings)
+
+        start_time = time.time()
+        getattr(self, function)()
+        self.add_timing(timing_name, 1, time.time() - start_time)
+        self.device_info_read[name] = info['read_time'] = time.time()
+
+        for attr_name, value in self.__dict__.items():
+            if attr_name in attributes and attributes[attr_name] != jsonpickle.encode(value, keys=True):
+                info['attributes'][attr_name] = value
+        for category, items in self.more_info.items():
+            for item_name, value in items.items():
+                if category not in more_info or more_info[category].get(item_name) != value:
+                    info['more_info'].setdefault(category, {})[item_name] = value
+        info['warnings'] = self.warnings[warning_count:]
+        if if_attributes:
+            for key, iface in self.interfaces.items():
+                info['interfaces'][key] = {attr_name: getattr(iface, attr_name) for attr_name in if_attributes}
+        if vlan_attributes:
+            for vlan_id, vlan in self.vlans.items():
+                info['vlans'][vlan_id] = {attr_name: getattr(vlan, attr_name) for attr_name in vlan_attributes}
+        return info
+
+    def _apply_device_info_group(self, name: str, info: dict):
+        '''
+        Apply the device info group data read by another request, see _read_device_info_group()
+
+        Args:
+            name (str): the name of the group, see DEVICE_INFO_GROUPS.
+            info (dict): the data read.
+
+        Returns:
+            none
+        '''
+        for attr_name, value in info['attributes'].items():
+            self.__setattr__(attr_name, value)
+        for category, items in info['more_info'].items():
+            for item_name, value in items.items():
+                self.add_more_info(category, item_name, value)
+        for warning in info['warnings']:
+            if warning not in self.warnings:
+                self.warnings.append(warning)
+        for key, values in info['interfaces'].items():
+            iface = self.get_interface_by_key(key)
+            if iface:
+                for attr_name, value in values.items():
+                    setattr(iface, attr_name, value)
+        # entries shared by older versions do not have the vlan data:
+        for vlan_id, values in info.get('vlans', {}).items():
+            vlan = self.get_vlan_by_id(vlan_id)
+            if vlan:
+                for attr_name, value in values.items():
+                    setattr(vlan, attr_name, value)
+        self.device_info_read[name] = info['read_time']
+
     '''
     This placeholder needs to be implemented by vendor or tech specific drivers.
     return True on success, False on error and set self.error variables
@@ -434,8 +933,21 @@ class Connector:
 
         # call the implementation-specific function:
         if hasattr(self, 'get_my_client_data'):
+            # fail fast if the device is known to be unreachable, or too busy:
+            if not self.can_connect():
+                self.add_warning(warning=f"WARNING: {self.connect_denied_reason}", add_log=False)
+                return False
+            if not device_session_start(self.switch.id):
+                self.add_warning(
+                    warning="WARNING: Too many users are accessing this device. Please try again in a moment.",
+                    add_log=False,
+                )
+                return False
             start_time = time.time()
-            self.get_my_client_data()  # to be implemented by device/vendor class!
+            try:
+                self.get_my_client_data()  # to be implemented by device/vendor class!
+            finally:
+                device_session_end(self.switch.id)
             # add to timing data, for admin use!
             self.add_timing('Client Info Read', 1, time.time() - start_time)
             # are we resolving IP addresses to hostnames?
@@ -561,6 +1073,33 @@ class Connector:
         # self.save_cache()
         return True
 
+    def bulk_edit_start(self) -> bool:
+        '''
+        Called before a bulk edit of interfaces. Drivers that can apply all changes at once
+        (e.g. in a single configuration commit) override this, and the set_interface_*() calls
+        that follow only prepare the changes, until bulk_edit_commit() is called.
+
+        Args:
+            none
+
+        Returns:
+            True if changes are now batched, False if each change is applied immediately (the default).
+        '''
+        return False
+
+    def bulk_edit_commit(self) -> bool:
+        '''
+        Apply all changes prepared since bulk_edit_start().
+
+        Args:
+            none
+
+        Returns:
+            True on success, False on error and set self.error variables.
+            On error, none of the changes were applied.
+        '''
+        return True
+
     def set_interface_poe_status(self, interface: Interface, new_state: int) -> bool:
         '''
         Set the interface Power-over-Ethernet status as given
@@ -677,7 +1216,7 @@ class Connector:
         Returns:
             True on success, False on error and set self.error variables
         '''
-        interface.vlans.append(int(new_vlan))
+        interface.vlans.add(int(new_vlan))
         # self.save_cache()
         return True
 
@@ -928,9 +1467,9 @@ class Connector:
         Returns:
             none
         '''
-        if vlan_id in self.vlans.keys() and self.vlans[vlan_id].type == VLAN_TYPE_NORMAL and vlan_id not in iface.vlans:
+        if vlan_id in self.vlans and self.vlans[vlan_id].type == VLAN_TYPE_NORMAL and vlan_id not in iface.vlans:
             dprint(f"   add_vlan_to_interface(): Adding Vlan {vlan_id} to {iface.name}!")
-            iface.vlans.append(vlan_id)
+            iface.vlans.add(vlan_id)
             iface.is_tagged = True
 
     def set_interfaces_natural_sort_order(self):
@@ -1061,6 +1600,9 @@ class Connector:
         """
         dprint("netmiko_connect()")
         self.error.clear()
+        if self.netmiko_connection:
+            dprint("  Already connected!")
+            return True
         if not self.switch.netmiko_profile:
             dprint("  ERROR: No netmiko profile")
             self.error.status = True
@@ -1097,7 +1639,20 @@ class Connector:
         }
 
         try:
-            handle = netmiko.ConnectHandler(**device)
+            if settings.SSH_SESSION_POOL_SIZE:
+                handle = netmiko_session_pool.get(
+                    device=self.switch.id,
+                    credentials=self._netmiko_pool_credentials(device_type=device_type),
+                    open_session=lambda: netmiko.ConnectHandler(**device),
+                )
+            else:
+                handle = netmiko.ConnectHandler(**device)
+        except SessionPoolFull as err:
+            dprint("netmiko_connect(): ERROR SessionPoolFull")
+            self.error.status = True
+            self.error.description = "All SSH sessions to this device are in use, please try again."
+            self.error.details = str(err)
+            return False
         except netmiko.NetMikoTimeoutException:
             dprint("netmiko_connect(): ERROR NetMikoTimeoutException")
             self.error.status = True
@@ -1124,8 +1679,53 @@ class Connector:
 
         dprint("  connection OK!")
         self.netmiko_connection = handle
+        self.netmiko_device_type_used = device_type
         return True
 
+    def _netmiko_pool_credentials(self, device_type: str) -> tuple:
+        """
+        The credentials part of the SSH session pool key. If the profile or driver settings change,
+        we need a new session. The paging command is part of this, as paging is only disabled once per session.
+        """
+        profile = self.switch.netmiko_profile
+        return (
+            profile.id,
+            profile.username,
+            profile.password,
+            profile.tcp_port,
+            device_type,
+            self.switch.primary_ip4,
+            self.netmiko_disable_paging_command,
+        )
+
+    def netmiko_disconnect(self, reuse: bool = True):
+        """
+        Done with the SSH connection. If pooled, the session is returned to the pool for the next command.
+
+        Args:
+            reuse (bool): if False, the session is closed instead of pooled, e.g. after a command error,
+                          when we do not know what output may still be waiting.
+
+        Returns:
+            none
+        """
+        dprint(f"netmiko_disconnect(reuse={reuse})")
+        if not self.netmiko_connection:
+            return
+        if settings.SSH_SESSION_POOL_SIZE:
+            netmiko_session_pool.release(
+                device=self.switch.id,
+                credentials=self._netmiko_pool_credentials(device_type=self.netmiko_device_type_used),
+                session=self.netmiko_connection,
+                reuse=reuse,
+            )
+        else:
+            try:
+                self.netmiko_connection.disconnect()
+            except Exception as err:
+                dprint(f"  Error disconnecting: {err}")
+        self.netmiko_connection = False
+
     def netmiko_disable_paging(self) -> bool:
         """
         Disable paging, ie the "hit a key" for more
@@ -1139,6 +1739,9 @@ class Connector:
         """
         dprint("netmiko_disable_paging()")
         self.error.clear()
+        if getattr(self.netmiko_connection, 'openl2m_paging_disabled', False):
+            dprint("  Already disabled on this (pooled) session!")
+            return True
         if not self.netmiko_disable_paging_command:
             dprint("  Disable command not set, using Netmiko default!")
             return True
@@ -1155,6 +1758,8 @@ class Connector:
                 self.error.status = True
                 self.error.description = f"Error disabling SSH paging! {err}"
                 return False
+            # remember on the session itself, so a pooled session is not sent this again:
+            self.netmiko_connection.openl2m_paging_disabled = True
         dprint("netmiko_disable_paging() OK!")
         return True
 
@@ -1209,17 +1814,93 @@ class Connector:
         dprint("  netmiko_execute_command() OK!")
         return True
 
-    def run_command(self, command_id: int, interface_name: str = '') -> dict:
+    def netmiko_stream_command(self, command: str):
+        """
+        Execute a single command on the device, and yield the output as it is received,
+        so it can be sent to the browser while the command is still running.
+        The full output is in self.netmiko_output when done, and self.error is set on errors.
+
+        Args:
+            command: the string the execute as a command on the device
+
+        Yields:
+            (str): the output, in chunks of complete lines, or an error message.
+        """
+        dprint(f"netmiko_stream_command() '{command}'")
+        self.error.clear()
+        self.netmiko_output = ''
+        if not self.netmiko_connect() or not self.netmiko_disable_paging():
+            yield f"Error: {self.error.description}\n"
+            return
+        connection = self.netmiko_connection
+        reuse = False
+        try:
+            # devices with prompt problems are done when the output stops, see netmiko_ignore_prompt:
+            prompt = '' if self.netmiko_ignore_prompt else connection.find_prompt().strip()
+            connection.write_channel(connection.normalize_cmd(command))
+            last_data = time.monotonic()
+            pending = ''  # the last incomplete line, this could be the prompt.
+            echo_removed = False
+            while True:
+                data = connection.read_channel()
+                now = time.monotonic()
+                if data:
+                    last_data = now
+                    pending += data.replace('\r', '')
+                    if not echo_removed and '\n' in pending:
+                        # the device echos the command on the first line:
+                        pending = pending.split('\n', 1)[1]
+                        echo_removed = True
+                    if echo_removed and '\n' in pending:
+                        lines, pending = pending.rsplit('\n', 1)
+                        chunk = lines + '\n'
+                        self.netmiko_output += chunk
+                        yield chunk
+                    if prompt and echo_removed and pending.strip() == prompt:
+                        break
+                elif self.netmiko_ignore_prompt and now - last_data > SSH_STREAM_IDLE_TIME:
+                    if pending.strip():
+                        self.netmiko_output += pending
+                        yield pending
+                    break
+                elif now - last_data > settings.SSH_COMMAND_TIMEOUT:
+                    dprint("  netmiko_stream_command() timed out!")
+                    self.error.status = True
+                    self.error.description = "Error: the command timed out!"
+                    yield f"\n{self.error.description}\n"
+                    return
+                else:
+                    time.sleep(SSH_STREAM_READ_INTERVAL)
+            reuse = True
+        except Exception as err:
+            dprint(f"  Netmiko.connection error: {str(type(err))} - {repr(err)}")
+            self.error.status = True
+            self.error.description = "Error sending command!"
+            self.error.details = f"Netmiko Error: {repr(err)} ({str(type(err))})"
+            yield f"\n{self.error.description}\n"
+        finally:
+            # this also runs when the browser goes away while streaming:
+            self.netmiko_disconnect(reuse=reuse)
+        dprint("  netmiko_stream_command() OK!")
+
+    def run_command(
+        self, command_id: int, interface_name: str = '', refresh: bool = False, stream: bool = False
+    ) -> dict:
         '''
         Execute a cli command. This is switch dependent,
         but by default handled via Netmiko library.
         On error, self.error() will also be set.
         Note: if you override and implement, you are responsible
         for checking rights by calling switch.is_valid_command_id() !
+        If the Command() has a cache_time, the output is cached per device, and returned from cache
+        while not expired, unless a refresh is requested.
 
         Args:
             command_id = the id (pk) of the Command() object we will execute,
             interface_name = the device interface name, as string.
+            refresh = if True, always execute the command, and not use cached output.
+            stream = if True, only validate the command, and return with cmd['stream'] set (unless cached).
+                     The caller then executes the command with netmiko_stream_command().
 
         Returns:
             a dictionary with result attributes.
@@ -1232,6 +1913,11 @@ class Connector:
             'output': '',  # output of chosen command
             'error_descr': '',  # if set, error that occured running command
             'error_details': '',  # and the details for above
+            'interface_name': interface_name,  # the interface for interface commands
+            'cache_time': 0,  # if set, the output is cached for this many seconds
+            'cached': False,  # True if the output came from the cache
+            'cache_age': '',  # and how old that output is
+            'stream': False,  # if True, the command still needs to run with netmiko_stream_command()
         }
         self.error.clear()
         # Now go exexute a specific Command object by ID
@@ -1277,17 +1963,34 @@ class Connector:
 
         cmd['state'] = 'run'
         cmd['id'] = command_id
+        cmd['cache_time'] = c.cache_time
+        if c.cache_time:
+            # the command string includes the interface name, if any:
+            cache_key = self.command_cache_key(command_id=command_id, command=cmd['command'])
+            cached = False if refresh else cache.get(cache_key)
+            if cached:
+                dprint("  returning cached output")
+                cmd['output'] = cached['output']
+                cmd['cached'] = True
+                cmd['cache_age'] = time_duration(time.time() - cached['time'])
+                return cmd
+        if stream:
+            cmd['stream'] = True
+            return cmd
         # now go do it:
         if self.netmiko_execute_command(cmd['command']):
             cmd['output'] = self.netmiko_output
+            self.netmiko_disconnect()
+            if c.cache_time:
+                cache.set(cache_key, {'output': cmd['output'], 'time': time.time()}, c.cache_time)
         else:
             # error occured, pass it on
             cmd['error_descr'] = self.error.description
             cmd['error_details'] = self.error.details
-        del self.netmiko_connection
+            self.netmiko_disconnect(reuse=False)
         return cmd
 
-    def run_command_string(self, command_string: str) -> dict:
+    def run_command_string(self, command_string: str, stream: bool = False) -> dict:
         '''
         Execute a cli command. This is switch dependent,
         but by default handled via Netmiko library.
@@ -1296,6 +1999,8 @@ class Connector:
 
         Args:
             command_string = the string we will execute
+            stream = if True, return with cmd['stream'] set, the caller executes the command
+                     with netmiko_stream_command().
 
         Returns:
              a dictionary with return result attributes.
@@ -1309,18 +2014,35 @@ class Connector:
             'output': '',  # output of chosen command
             'error_descr': '',  # if set, error that occured running command
             'error_details': '',  # and the details for above
+            'stream': stream,  # if True, the command still needs to run with netmiko_stream_command()
         }
         self.error.clear()
+        if stream:
+            return cmd
         # now go do it:
         if self.netmiko_execute_command(command_string):
             cmd['output'] = self.netmiko_output
+            self.netmiko_disconnect()
         else:
             # error occured, pass it on
             cmd['error_descr'] = self.error.description
             cmd['error_details'] = self.error.details
-        del self.netmiko_connection
+            self.netmiko_disconnect(reuse=False)
         return cmd
 
+    def command_cache_key(self, command_id: int, command: str) -> str:
+        '''
+        The shared cache key for the output of a cacheable Command() on this device.
+
+        Args:
+            command_id (int): the id (pk) of the Command()
+            command (str): the command string sent to the device, this includes the interface name, if any.
+
+        Returns:
+            (str): the cache key.
+        '''
+        return get_switch_cache_key(self.switch.id, f"cmd-{command_id}-{hashlib.md5(command.encode()).hexdigest()}")
+
     def set_do_not_cache_attribute(self, name: str):
         '''
         Add the name of one of our class object attributes
@@ -2111,3 +2833,45 @@ def clear_switch_cache(request: HttpRequest):
             del request.session['switch_id']
             request.session.modified = True
         # if not found, we had not selected a switch before. ie upon login!
+
+
+def clear_shared_switch_cache(switch_id: int):
+    '''
+    Clear the device data shared between requests for a switch,
+    e.g. after a change, or when the user requests a reload of the device.
+
+    Args:
+        switch_id (int): the pk of the Switch()
+
+    Returns:
+        none
+    '''
+    dprint(f"clear_shared_switch_cache() called for switch {switch_id}")
+    keys = [get_switch_cache_key(switch_id, "data")]
+    for name in DEVICE_INFO_GROUPS.keys():
+        keys.append(get_switch_cache_key(switch_id, f"info-{name}"))
+    cache.delete_many(keys)
+
+
+def _netmiko_session_is_alive(connection) -> bool:
+    '''
+    Check if a pooled SSH session is still connected.
+    '''
+    return connection.is_alive()
+
+
+def _close_netmiko_session(connection):
+    '''
+    Close an SSH session that is removed from the pool.
+    '''
+    connection.disconnect()
+
+
+# the open SSH command sessions of this worker process:
+netmiko_session_pool = SessionPool(
+    name="Netmiko SSH",
+    max_sessions=settings.SSH_SESSION_POOL_SIZE,
+    idle_timeout=settings.SSH_SESSION_IDLE_TIMEOUT,
+    close_session=_close_netmiko_session,
+    check_session=_netmiko_session_is_alive,
+)
@@ -0,0 +1,226 @@
+#
+# This file is part of Open Layer 2 Management (OpenL2M).
+#
+# OpenL2M is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License version 3 as published by
+# the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.  You should have received a copy of the GNU General Public
+# License along with OpenL2M. If not, see <http://www.gnu.org/licenses/>.
+#
+"""
+Device health tracking, shared by all worker processes via the Django cache.
+
+This implements a "circuit breaker" per device: after DEVICE_FAILURE_THRESHOLD consecutive
+failed connections, requests fail fast for DEVICE_FAILURE_RETRY seconds, without trying
+to connect to the device. After that, a single request is allowed to check if the device
+is reachable again ("half-open"), while all others continue to fail fast.
+
+It also limits the number of simultaneous sessions per device, see DEVICE_MAX_SESSIONS.
+The session count and the failure count need atomic counters shared by all worker processes,
+so they are kept in the database (SwitchSessions), not in the cache.
+"""
+import datetime
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.utils import timezone
+
+from switches.constants import (
+    DEVICE_HEALTH_OK,
+    DEVICE_HEALTH_FAILING,
+    DEVICE_HEALTH_PROBING,
+    DEVICE_HEALTH_CHOICES,
+)
+from switches.utils import dprint, get_choice_name, get_switch_cache_key, time_duration
+
+# how long we keep the health state of a device that has not been accessed, in seconds:
+DEVICE_HEALTH_TIMEOUT = 86400
+
+
+def get_device_health(switch_id: int) -> dict:
+    """
+    Get the health state of a device.
+
+    Params:
+        switch_id (int): the pk of the Switch()
+
+    Returns:
+        (dict): with 'state' (DEVICE_HEALTH_xxx), 'failures' (consecutive failure count),
+                'opened' (time() the circuit was opened), 'error' (last error description)
+    """
+    health = cache.get(get_switch_cache_key(switch_id, "health"))
+    if not health:
+        return {'state': DEVICE_HEALTH_OK, 'failures': 0, 'opened': 0, 'error': ''}
+    if health['state'] == DEVICE_HEALTH_FAILING and time.time() - health['opened'] > settings.DEVICE_FAILURE_RETRY:
+        health['state'] = DEVICE_HEALTH_PROBING
+    return health
+
+
+def get_device_health_states(switch_ids: list) -> dict:
+    """
+    Get the health state of a list of devices, in a single cache access.
+    Only devices that are not healthy are returned.
+
+    Params:
+        switch_ids (list): the pk's of the Switch() objects
+
+    Returns:
+        (dict): key is the switch id as string (see get_my_device_groups()), value the health description.
+    """
+    keys = {get_switch_cache_key(switch_id, "health"): str(switch_id) for switch_id in switch_ids}
+    states = {}
+    for key, health in cache.get_many(keys.keys()).items():
+        if health['state'] != DEVICE_HEALTH_OK:
+            states[keys[key]] = f"{get_choice_name(DEVICE_HEALTH_CHOICES, health['state'])}: {health['error']}"
+    return states
+
+
+def device_health_as_string(switch_id: int) -> str:
+    """
+    Describe the health state of a device, e.g. for the admin pages.
+
+    Params:
+        switch_id (int): the pk of the Switch()
+
+    Returns:
+        (str): the health state description.
+    """
+    health = get_device_health(switch_id)
+    name = get_choice_name(DEVICE_HEALTH_CHOICES, health['state'])
+    if health['state'] == DEVICE_HEALTH_OK:
+        if health['failures']:
+            return f"{name} ({health['failures']} failures)"
+        return name
+    return f"{name} for {time_duration(time.time() - health['opened'])} ({health['failures']} failures)"
+
+
+def device_can_connect(switch_id: int) -> tuple[bool, str]:
+    """
+    Check if we should try to connect to the device, based on its health state.
+    If the circuit is half-open, only the first caller is allowed to try.
+
+    Params:
+        switch_id (int): the pk of the Switch()
+
+    Returns:
+        (bool, str): True if we can connect, or False and the reason why not.
+    """
+    if not settings.DEVICE_FAILURE_THRESHOLD:
+        return True, ""
+    health = get_device_health(switch_id)
+    if health['state'] == DEVICE_HEALTH_OK:
+        return True, ""
+    if health['state'] == DEVICE_HEALTH_PROBING:
+        # cache.add() is atomic, so only one request gets to check the device:
+        if cache.add(get_switch_cache_key(switch_id, "health-probe"), True, timeout=settings.DEVICE_FAILURE_RETRY):
+            dprint(f"device_can_connect(): switch {switch_id} probing device!")
+            return True, ""
+        return False, "The device is unreachable, and is currently being checked. Please try again later."
+    retry = int(settings.DEVICE_FAILURE_RETRY - (time.time() - health['opened']))
+    return False, f"The device is unreachable ({health['error']}). We will try again in {max(retry, 1)} seconds."
+
+
+def device_connect_succeeded(switch_id: int):
+    """
+    Mark the device as healthy, ie close the circuit.
+
+    Params:
+        switch_id (int): the pk of the Switch()
+
+    Returns:
+        none
+    """
+    # calling cache.delete() on every successful read is cheaper than reading the state first.
+    cache.delete_many([get_switch_cache_key(switch_id, "health"), get_switch_cache_key(switch_id, "health-probe")])
+    if settings.DEVICE_FAILURE_THRESHOLD:
+        from switches.models import SwitchSessions  # here to avoid circular import
+
+        SwitchSessions.objects.filter(switch_id=switch_id, failures__gt=0).update(failures=0)
+
+
+def device_connect_failed(switch_id: int, error: str):
+    """
+    Count a failed connection to the device. If we reach the failure threshold,
+    open the circuit so requests fail fast.
+
+    Params:
+        switch_id (int): the pk of the Switch()
+        error (str): description of the failure.
+
+    Returns:
+        none
+    """
+    if not settings.DEVICE_FAILURE_THRESHOLD:
+        return
+    from switches.models import SwitchSessions  # here to avoid circular import
+
+    # the count is kept in the database, so failures in different worker processes are all counted:
+    SwitchSessions.objects.get_or_create(switch_id=switch_id)
+    sessions = SwitchSessions.objects.filter(switch_id=switch_id)
+    sessions.update(failures=F('failures') + 1)
+    health = get_device_health(switch_id)
+    health['failures'] = sessions.values_list('failures', flat=True).first() or 0
+    health['error'] = error
+    if health['failures'] >= settings.DEVICE_FAILURE_THRESHOLD:
+        # (re-)open the circuit, this also handles a failed probe:
+        dprint(f"device_connect_failed(): switch {switch_id} circuit is open!")
+        health['state'] = DEVICE_HEALTH_FAILING
+        health['opened'] = time.time()
+    cache.set(get_switch_cache_key(switch_id, "health"), health, timeout=DEVICE_HEALTH_TIMEOUT)
+    cache.delete(get_switch_cache_key(switch_id, "health-probe"))
+
+
+def device_session_start(switch_id: int) -> bool:
+    """
+    Register a new session to the device, if we are below the maximum number of simultaneous sessions.
+    The count is kept in the database, as cache.incr() is not atomic for the database and local-memory caches.
+
+    Params:
+        switch_id (int): the pk of the Switch()
+
+    Returns:
+        (bool): True if the session can start, False if too many sessions are active.
+                If True, device_session_end() needs to be called when done.
+    """
+    if not settings.DEVICE_MAX_SESSIONS:
+        return True
+    from switches.models import SwitchSessions  # here to avoid circular import
+
+    now = timezone.now()
+    sessions = SwitchSessions.objects.filter(switch_id=switch_id)
+    # a single UPDATE statement is atomic, so we never go over the limit:
+    if sessions.filter(count__lt=settings.DEVICE_MAX_SESSIONS).update(count=F('count') + 1, updated=now):
+        return True
+    # a count that has not changed for a while is from sessions not ended properly, e.g. a killed worker process:
+    stale = now - datetime.timedelta(seconds=settings.SHARED_READ_WAIT * 2)
+    if sessions.filter(updated__lt=stale).update(count=1, updated=now):
+        return True
+    # first session to this device:
+    _, created = SwitchSessions.objects.get_or_create(switch_id=switch_id, defaults={'count': 1, 'updated': now})
+    if created:
+        return True
+    dprint(f"device_session_start(): switch {switch_id} has too many sessions")
+    return False
+
+
+def device_session_end(switch_id: int):
+    """
+    Unregister a session to the device, see device_session_start()
+
+    Params:
+        switch_id (int): the pk of the Switch()
+
+    Returns:
+        none
+    """
+    if not settings.DEVICE_MAX_SESSIONS:
+        return
+    from switches.models import SwitchSessions  # here to avoid circular import
+
+    SwitchSessions.objects.filter(switch_id=switch_id, count__gt=0).update(count=F('count') - 1, updated=timezone.now())
@@ -19,14 +19,16 @@
 from jnpr.junos import Device
 from jnpr.junos.utils.config import Config
 from jnpr.junos.exception import RpcError, ConfigLoadError, CommitError, LockError, UnlockError
+from lxml import etree
 
 from netaddr import IPNetwork
 
 from django.conf import settings
+from django.core.cache import cache
 from django.http.request import HttpRequest
 
 from switches.models import Switch, SwitchGroup
-from switches.utils import dprint
+from switches.utils import dprint, get_switch_cache_key
 from switches.connect.constants import (
     IF_DUPLEX_FULL,
     IF_TYPE_ETHERNET,
@@ -43,6 +45,7 @@ from switches.connect.constants import (
 )
 from switches.connect.classes import Interface, NeighborDevice
 from switches.connect.connector import Connector
+from switches.connect.sessionpool import SessionPool
 from switches.connect.junos_pyez.utils import (
     junos_speed_to_mbps,
     junos_parse_power,
@@ -50,9 +53,40 @@ from switches.connect.junos_pyez.utils import (
     junos_remove_unit,
     junos_get_real_ifname,
     junos_parse_if_type,
+    junos_xml_fields,
 )
 from switches.connect.utils import standardize_ipv4_subnet
 
+# the device facts we use. These rarely change, so are cached for settings.JUNOS_PYEZ_FACTS_CACHE_TIME.
+# Note the 'RE0' fact has the uptime, so that is always read from the device.
+PYEZ_CACHED_FACTS = ['hostname', 'model', 'version', 'serialnumber', 'domain', 'personality', 'switch_style']
+
+# seconds between SSH keepalives on open Netconf sessions, so idle pooled sessions are not dropped:
+PYEZ_KEEPALIVE_INTERVAL = 60
+
+# RPC replies can be large, e.g. 30k+ mac addresses. We find the entries with precompiled XPath expressions,
+# and then read the fields we use from each entry in a single pass, see junos_xml_fields().
+XPATH_PHYSICAL_INTERFACES = etree.XPath('.//physical-interface')
+XPATH_MAC_ENTRIES = etree.XPath('.//l2ng-l2ald-mac-entry-vlan')
+XPATH_ARP_ENTRIES = etree.XPath('.//arp-table-entry')
+XPATH_ND_ENTRIES = etree.XPath('.//ipv6-nd-entry')
+INTERFACE_FIELDS = (
+    'name',
+    'link-level-type',
+    'if-type',
+    'description',
+    'admin-status',
+    'oper-status',
+    'mtu',
+    'speed',
+    'link-mode',
+    'local-link-duplexity',
+    'minimum-links-in-aggregate',
+)
+MAC_FIELDS = ('l2ng-l2-mac-address', 'l2ng-l2-vlan-id', 'l2ng-l2-mac-logical-interface')
+ARP_FIELDS = ('mac-address', 'ip-address', 'interface-name')
+ND_FIELDS = ('ipv6-nd-neighbor-l2-address', 'ipv6-nd-neighbor-address', 'ipv6-nd-interface-name')
+
 
 class PyEZConnector(Connector):
     '''
@@ -105,9 +139,15 @@ class PyEZConnector(Connector):
         self.device = False
         # and we dont want to cache this:
         self.set_do_not_cache_attribute('device')
-        if not self._open_device():
-            dprint("  _open_device() failed! Raising exception")
-            raise Exception("PyEZ connection failed! Please check the device configuration!")
+        # set to False if the session is in an unknown state, and should not be returned to the pool:
+        self.device_reusable = True
+        self.set_do_not_cache_attribute('device_reusable')
+        # the candidate configuration and commands during a bulk edit, see bulk_edit_start():
+        self.bulk_config = False
+        self.set_do_not_cache_attribute('bulk_config')
+        self.bulk_commands = []
+        self.set_do_not_cache_attribute('bulk_commands')
+        # Note: the device is opened when needed, and closed (ie. returned to the session pool) when done.
 
     def _parse_address_family(self, iface: Interface, xml_data) -> bool:
         """Parse the <address-family> output of an interface from the XML data in "intf"
@@ -195,27 +235,30 @@ class PyEZConnector(Connector):
             # self.error already set!
             return False
 
-        self.hostname = self.device.facts['hostname']
+        facts = self._get_facts()
+        self.hostname = facts['hostname']
         # if first time for this device (or changed), update hostname
-        if self.switch.hostname != self.device.facts['hostname']:
-            self.switch.hostname = self.device.facts['hostname']
-            self.switch.save()
+        if self.switch.hostname != facts['hostname']:
+            self.switch.hostname = facts['hostname']
+            self.switch.save(update_fields=['hostname', 'modified'])
 
         self.add_more_info('System', 'Hostname', self.hostname)
-        self.add_more_info('System', 'Model', self.device.facts['model'])
-        self.add_more_info('System', 'Version', self.device.facts['version'])
-        self.add_more_info('System', 'Serial #', self.device.facts['serialnumber'])
-        if self.device.facts['domain']:  # this is None when not set!
-            self.add_more_info('System', 'Domain Name', self.device.facts['domain'])
+        self.add_more_info('System', 'Model', facts['model'])
+        self.add_more_info('System', 'Version', facts['version'])
+        self.add_more_info('System', 'Serial #', facts['serialnumber'])
+        if facts['domain']:  # this is None when not set!
+            self.add_more_info('System', 'Domain Name', facts['domain'])
         else:
             self.add_more_info('System', 'Domain Name', '')
+        # the facts are kept with the (pooled) session, so re-read the uptime:
+        self.device.facts_refresh(keys='RE0')
         self.add_more_info('System', 'Uptime', self.device.facts['RE0']['up_time'])
-        self.add_more_info('System', 'Personality', self.device.facts['personality'])
-        if 'switch_style' in self.device.facts:
-            self.add_more_info('System', 'Switch Style', self.device.facts['switch_style'])
+        self.add_more_info('System', 'Personality', facts['personality'])
+        if facts.get('switch_style'):
+            self.add_more_info('System', 'Switch Style', facts['switch_style'])
             # see if this an ELS switch (ie unified Layer 2 commands)
             # see https://community.juniper.net/discussion/els-juniper
-            if self.device.facts['switch_style'] == 'VLAN_L2NG':
+            if facts['switch_style'] == 'VLAN_L2NG':
                 self.is_els = True
 
         # is the an ELS (Enhanced Layer2 Software) device?
@@ -231,9 +274,11 @@ class PyEZConnector(Connector):
         # This RPC is cli equivalent of "show interfaces extensive"
         #
         intf_data = self.device.rpc.get_interface_information(extensive=False)
-        interfaces = intf_data.findall('.//physical-interface')
+        interfaces = XPATH_PHYSICAL_INTERFACES(intf_data)
         for intf in interfaces:
-            name = intf.find('.//name').text
+            # missing fields raise KeyError below:
+            fields = junos_xml_fields(intf, INTERFACE_FIELDS)
+            name = fields['name']
             dprint(f"\n  Name: {name}")
             # create new OpenL2M Interface() object
             iface = Interface(name)
@@ -241,12 +286,12 @@ class PyEZConnector(Connector):
 
             # try several fields to figure out what kind of interface this is:
             try:
-                link_type = intf.find('.//link-level-type').text
+                link_type = fields['link-level-type']
                 dprint(f"  link-level-type = {link_type}")
                 iface.type = junos_parse_if_type(link_type)
             except Exception:
                 try:
-                    if_type = intf.find('.//if-type').text
+                    if_type = fields['if-type']
                     dprint(f"  if-type = {if_type}")
                     iface.type = junos_parse_if_type(if_type)
                 except Exception:
@@ -254,21 +299,21 @@ class PyEZConnector(Connector):
                     dprint("  unknown port type!")
 
             try:
-                description = intf.find('.//description').text
+                description = fields['description']
             except Exception:
                 description = ''
             iface.description = description
 
-            admin_status = intf.find('.//admin-status').text
+            admin_status = fields['admin-status']
             if admin_status == 'up':
                 iface.admin_status = True
 
-            oper_status = intf.find('.//oper-status').text
+            oper_status = fields['oper-status']
             if oper_status == 'up':
                 iface.oper_status = True
 
             try:
-                mtu = intf.find('.//mtu').text
+                mtu = fields['mtu']
             except Exception:
                 mtu = 0
             try:
@@ -277,7 +322,7 @@ class PyEZConnector(Connector):
                 iface.mtu = 0
 
             try:
-                speed = intf.find('.//speed').text
+                speed = fields['speed']
                 dprint(f"  speed = {speed}")
                 # this could be an auto-negotiating interface (regular GigE):
                 if speed.lower() != 'auto':
@@ -299,14 +344,14 @@ class PyEZConnector(Connector):
 
             # <link-mode>Full-duplex</link-mode>
             try:
-                duplex = intf.find('.//link-mode').text
+                duplex = fields['link-mode']
                 dprint(f"  Duplex = {duplex}")
                 iface.duplex = junos_parse_duplex(duplex)
             except Exception:
                 # link-mode not found, so look for auto-negotiation settings at
                 # <ethernet-autonegotiation><local-info><local-link-duplexity>
                 try:
-                    duplex = intf.find('.//local-link-duplexity').text
+                    duplex = fields['local-link-duplexity']
                     dprint(f"  local duplex = {duplex}")
                     # actual speed, convert to mbps:
                     iface.duplex = junos_parse_duplex(duplex)
@@ -345,10 +390,9 @@ class PyEZConnector(Connector):
                 # parse the address information
                 self._parse_address_family(iface=iface, xml_data=intf)
 
-            try:
-                intf.find('.//minimum-links-in-aggregate').text
+            if 'minimum-links-in-aggregate' in fields:
                 iface.type = IF_TYPE_LAGG
-            except Exception:
+            else:
                 dprint("  not an aggregate.")
             dprint(f"  Final type = {iface.type}")
             self.add_interface(iface)
@@ -528,11 +572,12 @@ class PyEZConnector(Connector):
             # This RPC is cli equivalent of "show ethernet-switching table extensive"
             #
             mac_data = self.device.rpc.get_ethernet_switching_table_information(extensive=True)
-            macs = mac_data.findall('.//l2ng-l2ald-mac-entry-vlan')
+            macs = XPATH_MAC_ENTRIES(mac_data)
             for mac in macs:
-                mac_address = mac.find('.//l2ng-l2-mac-address').text
-                vlan_id = int(mac.find('.//l2ng-l2-vlan-id').text)
-                if_name = mac.find('.//l2ng-l2-mac-logical-interface').text
+                fields = junos_xml_fields(mac, MAC_FIELDS)
+                mac_address = fields['l2ng-l2-mac-address']
+                vlan_id = int(fields['l2ng-l2-vlan-id'])
+                if_name = fields['l2ng-l2-mac-logical-interface']
                 phys_if_name = junos_remove_unit(if_name)
                 dprint(f"  Found: {mac_address}, on vlan {vlan_id}, interface {phys_if_name}")
                 self.add_learned_ethernet_address(if_name=phys_if_name, eth_address=mac_address, vlan_id=vlan_id)
@@ -546,11 +591,12 @@ class PyEZConnector(Connector):
             # This RPC is cli equivalent of "show arp no-resolve"
             #
             arp_data = self.device.rpc.get_arp_table_information(no_resolve=True)
-            arp_entries = arp_data.findall('.//arp-table-entry')
+            arp_entries = XPATH_ARP_ENTRIES(arp_data)
             for arp in arp_entries:
-                mac_address = arp.find('.//mac-address').text
-                ip_address = arp.find('.//ip-address').text
-                if_name = arp.find('.//interface-name').text
+                fields = junos_xml_fields(arp, ARP_FIELDS)
+                mac_address = fields['mac-address']
+                ip_address = fields['ip-address']
+                if_name = fields['interface-name']
                 dprint(f"  {mac_address} = {ip_address}, on {if_name}")
                 # if found on routed interface, if_name could be formed as "irb.nnn [if_name]"
                 if_name = junos_get_real_ifname(if_name)
@@ -566,16 +612,13 @@ class PyEZConnector(Connector):
             # This RPC is cli equivalent of "show ipv6 neighbors"
             #
             nd_data = self.device.rpc.get_ipv6_nd_information()
-            nd_entries = nd_data.findall('.//ipv6-nd-entry')
+            nd_entries = XPATH_ND_ENTRIES(nd_data)
             for nd in nd_entries:
-                mac_address = nd.find('.//ipv6-nd-neighbor-l2-address').text
-                ipv6_address = nd.find('.//ipv6-nd-neighbor-address').text
-                state = nd.find('.//ipv6-nd-state').text
-                expire = nd.find('.//ipv6-nd-expire').text
-                isrouter = nd.find('.//ipv6-nd-isrouter').text
-                issecure = nd.find('.//ipv6-nd-issecure').text
-                if_name = nd.find('.//ipv6-nd-interface-name').text
-                dprint(f"  {mac_address} = {ip_address}, on {if_name}")
+                fields = junos_xml_fields(nd, ND_FIELDS)
+                mac_address = fields['ipv6-nd-neighbor-l2-address']
+                ipv6_address = fields['ipv6-nd-neighbor-address']
+                if_name = fields['ipv6-nd-interface-name']
+                dprint(f"  {mac_address} = {ipv6_address}, on {if_name}")
                 # if found on routed interface, if_name could be formed as "irb.nnn [if_name]"
                 if_name = junos_get_real_ifname(if_name=if_name)
                 dprint(f"   Final real interface: {if_name}")
@@ -939,6 +982,8 @@ class PyEZConnector(Connector):
     def pyez_execute_commands(self, commands: list, format: str = 'set') -> bool:
         '''
         Execute a list of command string(s) on the device. Defaults to 'set' format.
+        During a bulk edit, the commands are only loaded into the candidate configuration,
+        and committed in bulk_edit_commit().
 
         Args:
             commands(list): the command list of strings to execute.
@@ -948,70 +993,166 @@ class PyEZConnector(Connector):
             (boolean) True on success, False on error and set self.error variables
         '''
         dprint(f"PyEZ.pyez_execute_commands(): format={format}, '{commands}'")
+        if self.bulk_config:
+            try:
+                for command in commands:
+                    self.bulk_config.load(command, format=format)
+            except Exception as err:
+                self._set_config_error(err=err, commands=commands)
+                # remove the part of this change that did load, keep the earlier changes:
+                try:
+                    self.bulk_config.rollback()
+                    for command in self.bulk_commands:
+                        self.bulk_config.load(command, format=format)
+                except Exception as err:
+                    dprint(f"  Error reloading candidate configuration: {err}")
+                return False
+            self.bulk_commands.extend(commands)
+            return True
         try:
             conf = Config(self.device)  # we assume this is open!
+            # until we release the lock, an error leaves the session with a locked configuration:
+            self.device_reusable = False
             conf.lock()
             for command in commands:
                 conf.load(command, format=format)
-            dprint(f"Config Diff: {conf.diff()}")
-            if conf.commit_check():
-                dprint("commit_check() OK")
-                conf.commit()
-                dprint("conf.commit() succeeded")
-                ret_val = True
-            else:
-                dprint("commit_check() FAILED!")
-                conf.rollback()
-                dprint("conf.rollback() succeeded")
-                self.error.status = True
-                self.error.description = "Commit-Check failed! Not executing command."
-                self.error.details = ''
-                ret_val = False
+            ret_val = self._commit_config(conf=conf)
             dprint("calling conf.unlock()")
             conf.unlock()
+            self.device_reusable = True
             dprint(f"conf.unlock() OK, returning ret_val={ret_val}")
             return ret_val
-        except ConfigLoadError as err:
-            dprint("Error: ConfigLoadError")
-            self.error.status = True
-            self.error.description = "Error loading config, change was NOT applied!"
-            self.error.details = f"Error: '{err}', commands '{commands}'"
+        except Exception as err:
+            self._set_config_error(err=err, commands=commands)
             return False
-        except CommitError as err:
-            dprint("Error: CommitError")
-            self.error.status = True
-            self.error.description = "Commit-Check failed, change was NOT applied!"
-            self.error.details = f"Error: '{err}', commands '{commands}'"
+
+    def bulk_edit_start(self) -> bool:
+        '''
+        Lock the configuration, and load all following changes into a single candidate configuration.
+        See bulk_edit_commit().
+
+        Args:
+            none
+
+        Returns:
+            True if changes are now batched, False if each change is applied immediately.
+        '''
+        dprint("PyEZ.bulk_edit_start()")
+        if not self._open_device():
+            dprint("_open_device() failed!")
             return False
-        except LockError as err:
-            dprint("Error: LockError")
-            self.error.status = True
-            self.error.description = "Cannot get lock, change was NOT applied!"
-            self.error.details = f"Error: '{err}', commands '{commands}'"
+        try:
+            conf = Config(self.device)
+            self.device_reusable = False
+            conf.lock()
+        except Exception as err:
+            # LockError: somebody else is editing, we will find that out again for each change.
+            dprint(f"  Cannot lock configuration, not batching: {err}")
+            self._close_device()
             return False
-        except UnlockError as err:
-            dprint("Error: UnlockError")
+        self.bulk_config = conf
+        self.bulk_commands = []
+        return True
+
+    def bulk_edit_commit(self) -> bool:
+        '''
+        Commit all changes loaded since bulk_edit_start() in a single commit, and unlock the configuration.
+        If settings.JUNOS_PYEZ_COMMIT_CONFIRMED is set, this uses "commit confirmed", and confirms it
+        when the device is still reachable after the commit.
+
+        Args:
+            none
+
+        Returns:
+            True on success, False on error and set self.error variables.
+        '''
+        dprint(f"PyEZ.bulk_edit_commit(): {len(self.bulk_commands)} commands")
+        conf = self.bulk_config
+        commands = self.bulk_commands
+        # stop batching, so _close_device() releases the session:
+        self.bulk_config = False
+        self.bulk_commands = []
+        ret_val = True
+        try:
+            if commands:
+                ret_val = self._commit_config(conf=conf, confirm=settings.JUNOS_PYEZ_COMMIT_CONFIRMED)
+            else:
+                conf.rollback()
+            dprint("calling conf.unlock()")
+            conf.unlock()
+            self.device_reusable = True
+        except Exception as err:
+            self._set_config_error(err=err, commands=commands)
+            ret_val = False
+            if not isinstance(err, UnlockError):
+                # do not leave the failed changes in the candidate configuration:
+                try:
+                    conf.rollback()
+                    conf.unlock()
+                    self.device_reusable = True
+                except Exception as err:
+                    dprint(f"  Error cleaning up candidate configuration: {err}")
+        self._close_device()
+        return ret_val
+
+    def _commit_config(self, conf: Config, confirm: int = 0) -> bool:
+        '''
+        Check and commit the candidate configuration. On a failed check, the candidate is rolled back.
+        Exceptions are passed on to the caller.
+
+        Args:
+            conf (Config): the locked and loaded configuration object.
+            confirm (int): if set, commit confirmed with a rollback after this many minutes,
+                           then confirm the commit.
+
+        Returns:
+            (boolean) True on success, False on error and set self.error variables
+        '''
+        dprint(f"Config Diff: {conf.diff()}")
+        if not conf.commit_check():
+            dprint("commit_check() FAILED!")
+            conf.rollback()
+            dprint("conf.rollback() succeeded")
             self.error.status = True
-            self.error.description = "Cannot release lock, but change was applied!"
-            self.error.details = f"Error: '{err}', commands '{commands}'"
+            self.error.description = "Commit-Check failed! Not executing command."
+            self.error.details = ''
             return False
-        except RpcError as err:
-            dprint("Error: RcpError")
-            self.error.status = True
+        dprint("commit_check() OK")
+        if confirm:
+            conf.commit(confirm=confirm)
+            dprint(f"conf.commit(confirm={confirm}) succeeded, confirming")
+            # if we lost the device due to this change, it will roll back by itself:
+            conf.commit()
+        else:
+            conf.commit()
+        dprint("conf.commit() succeeded")
+        return True
+
+    def _set_config_error(self, err: Exception, commands: list):
+        '''
+        Set the self.error variables for an exception from a configuration change.
+
+        Args:
+            err (Exception): the exception raised by PyEZ.
+            commands (list): the commands that were being applied.
+        '''
+        dprint(f"Error: {type(err).__name__}")
+        self.error.status = True
+        self.error.details = f"Error: '{err}', commands '{commands}'"
+        if isinstance(err, ConfigLoadError):
+            self.error.description = "Error loading config, change was NOT applied!"
+        elif isinstance(err, CommitError):
+            self.error.description = "Commit-Check failed, change was NOT applied!"
+        elif isinstance(err, LockError):
+            self.error.description = "Cannot get lock, change was NOT applied!"
+        elif isinstance(err, UnlockError):
+            self.error.description = "Cannot release lock, but change was applied!"
+        elif isinstance(err, RpcError):
             self.error.description = "Network Communications Error, change was NOT applied!"
-            self.error.details = f"Error: '{err}', commands '{commands}'"
-            return False
-        except ValueError as err:
-            self.error.status = True
+        elif isinstance(err, ValueError):
             self.error.description = "Invalid Rollback ID, change was NOT applied!"
-            self.error.details = f"Error: '{err}', commands '{commands}'"
-            return False
-        except Exception as err:
-            dprint(f"Error generic: {type(err).__name__}")
-            self.error.status = True
+        else:
             self.error.description = "Unknown error occured, change was NOT applied!"
-            self.error.details = f"Error: '{err}', command was '{commands}'"
-            return False
 
     def _validate_vlan_name(self, vlan_name: str) -> bool:
         '''Validate the characters in the new vlan name
@@ -1024,9 +1165,34 @@ class PyEZConnector(Connector):
         '''
         return True
 
+    def _get_facts(self) -> dict:
+        '''
+        Get the device facts we use, from the cache if we can.
+
+        Args:
+            none
+
+        Returns:
+            (dict): the facts in PYEZ_CACHED_FACTS.
+        '''
+        cache_key = get_switch_cache_key(self.switch.id, "pyez-facts")
+        facts = cache.get(cache_key)
+        if facts is None:
+            dprint("  reading facts from device")
+            facts = {}
+            for name in PYEZ_CACHED_FACTS:
+                # the device was opened without gathering facts, this reads them as needed:
+                try:
+                    facts[name] = self.device.facts[name]
+                except KeyError:
+                    facts[name] = None
+            cache.set(cache_key, facts, settings.JUNOS_PYEZ_FACTS_CACHE_TIME)
+        return facts
+
     def _open_device(self) -> bool:
         '''
-        get a pyJunosPyEZ "driver" and open a "connection" to the device
+        get a pyJunosPyEZ "driver" and open a "connection" to the device.
+        If enabled, this reuses an open Netconf session from the worker session pool.
         return True on success, False on failure, and will set self.error
         '''
         dprint("Junos PyEZ _open_device()")
@@ -1040,29 +1206,97 @@ class PyEZConnector(Connector):
             dprint("  _open_device: No Credentials!")
             return False
 
-        self.device = Device(
-            host=self.switch.primary_ip4,
-            user=self.switch.netmiko_profile.username,
-            password=self.switch.netmiko_profile.password,
-            normalize=True,
-            conn_open_timeout=settings.JUNOS_PYEZ_CONN_TIMEOUT,
-        )  # normalize removed trailing/ending \n and spaces.
         try:
-            self.device.open()
+            if settings.JUNOS_PYEZ_SESSION_POOL_SIZE:
+                self.device = pyez_session_pool.get(
+                    device=self.switch.id, credentials=self._pool_credentials(), open_session=self._new_device
+                )
+            else:
+                self.device = self._new_device()
         except Exception as error:
             self.error.status = True
             self.error.description = "Error establishing connection!"
             self.error.details = f"Cannot open Junos PyEZ NetConf session: {format(error)}"
             dprint("  _open_device: Device.open() failed!")
             return False
-
+        self.device_reusable = True
         return True
 
+    def _new_device(self) -> Device:
+        '''
+        Open a new Netconf session to the device.
+        Facts are not gathered here, see _get_facts().
+
+        Returns:
+            (Device): the open PyEZ Device(). Any error is raised.
+        '''
+        device = Device(
+            host=self.switch.primary_ip4,
+            user=self.switch.netmiko_profile.username,
+            password=self.switch.netmiko_profile.password,
+            normalize=True,
+            gather_facts=False,
+            conn_open_timeout=settings.JUNOS_PYEZ_CONN_TIMEOUT,
+        )  # normalize removed trailing/ending \n and spaces.
+        device.open()
+        try:
+            # keep the ssh connection alive while the session is idle in the pool:
+            device._conn._session._transport.set_keepalive(PYEZ_KEEPALIVE_INTERVAL)
+        except Exception as err:
+            dprint(f"  Cannot set keepalive: {err}")
+        return device
+
+    def _pool_credentials(self) -> tuple:
+        '''
+        The credentials part of the session pool key. If the profile changes, we need a new session.
+        '''
+        profile = self.switch.netmiko_profile
+        return (profile.id, profile.username, profile.password, self.switch.primary_ip4)
+
     def _close_device(self) -> bool:
         '''
-        make sure we properly close the Junos PyEZ Session
+        make sure we properly close the Junos PyEZ Session.
+        If pooled, the session is returned to the pool instead.
         '''
         dprint("Junos PyEZ _close_device()")
-        self.device.close()
+        if not self.device:
+            return True
+        if self.bulk_config:
+            # keep the session during a bulk edit, the changes are committed at the end:
+            dprint("  bulk edit in progress, keeping session")
+            return True
+        if settings.JUNOS_PYEZ_SESSION_POOL_SIZE:
+            pyez_session_pool.release(
+                device=self.switch.id,
+                credentials=self._pool_credentials(),
+                session=self.device,
+                reuse=self.device_reusable,
+            )
+        else:
+            self.device.close()
         self.device = False
         return True
+
+
+def _device_is_connected(device: Device) -> bool:
+    '''
+    Check if a pooled Netconf session is still connected.
+    '''
+    return device.connected and device._conn.connected
+
+
+def _close_pooled_device(device: Device):
+    '''
+    Close a Netconf session that is removed from the pool.
+    '''
+    device.close()
+
+
+# the open Netconf sessions of this worker process:
+pyez_session_pool = SessionPool(
+    name="Junos PyEZ",
+    max_sessions=settings.JUNOS_PYEZ_SESSION_POOL_SIZE,
+    idle_timeout=settings.JUNOS_PYEZ_SESSION_IDLE_TIMEOUT,
+    close_session=_close_pooled_device,
+    check_session=_device_is_connected,
+)
@@ -26,6 +26,9 @@ from switches.connect.constants import (
 )
 from switches.utils import dprint
 
+# the IRB interface name as found in ARP and ND entries, e.g. "irb.100 [ge-0/0/1.0]"
+IRB_REGEX = re.compile(r"^irb\.\d+\s+\[([\w\-\.\/]+)\]$")
+
 
 def junos_speed_to_mbps(speed: str) -> int:
     '''
@@ -118,10 +121,8 @@ def junos_remove_unit(if_name: str) -> str:
 
 def junos_get_real_ifname(if_name: str) -> str:
     '''Return real interface name from string that could be an IRB or regular interface with unit number.'''
-    # compile the IRB matching reg-ex:
-    irb_regex = re.compile(r"^irb\.\d+\s+\[([\w\-\.\/]+)\]$")
     # see if interface name matches this expanded formation
-    m = re.match(irb_regex, if_name)
+    m = IRB_REGEX.match(if_name)
     if m:
         dprint(f"junos_get_real_ifname() found IRB in '{if_name}'")
         return junos_remove_unit(m.group(1))
@@ -129,6 +130,27 @@ def junos_get_real_ifname(if_name: str) -> str:
     return junos_remove_unit(if_name)
 
 
+def junos_xml_fields(element, fields: tuple) -> dict:
+    '''
+    Read the text of several fields from an XML entry in an RPC reply, in a single pass over the entry.
+    This returns the same as calling element.find('.//<field>').text for each field, ie. the first
+    occurance of each field, at any depth, without searching the entry again for every field.
+
+    Args:
+        element: the lxml XML element of a single entry, e.g. a mac address entry.
+        fields (tuple): the names of the fields (ie. XML tags) to read.
+
+    Returns:
+        (dict): field name -> text. Fields that are not found are not in the dictionary.
+    '''
+    values = {}
+    # iter() with tags filters in the lxml C code:
+    for child in element.iter(*fields):
+        if child.tag not in values:
+            values[child.tag] = child.text
+    return values
+
+
 def junos_parse_if_type(if_type: str) -> int:
     '''
     Parse the XML "if-type" field, and return an IF_TYPE_XXX flag.
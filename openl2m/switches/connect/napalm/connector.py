@@ -17,14 +17,21 @@
 # the Napalm Library, at least in read-only mode.
 #
 
+from concurrent.futures import ThreadPoolExecutor
+import os
+import time
 import traceback
 
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection as db_connection
 from django.http.request import HttpRequest
 
+from jinja2 import Environment, FileSystemLoader, StrictUndefined
 from napalm import get_network_driver
 
 from switches.models import Switch, SwitchGroup
-from switches.utils import dprint, uptime_to_string
+from switches.utils import dprint, uptime_to_string, get_switch_cache_key
 from switches.constants import (
     LOG_TYPE_ERROR,
     LOG_NAPALM_ERROR_FACTS,
@@ -39,9 +46,11 @@ from switches.constants import (
 )
 from switches.connect.classes import Interface, NeighborDevice
 from switches.connect.connector import Connector
+from switches.connect.health import device_session_start, device_session_end
 from switches.connect.utils import interface_name_to_long
 from switches.connect.constants import (
     IF_TYPE_ETHERNET,
+    POE_PORT_ADMIN_ENABLED,
     LLDP_CAPABILITIES_REPEATER,
     LLDP_CAPABILITIES_BRIDGE,
     LLDP_CAPABILITIES_ROUTER,
@@ -53,6 +62,16 @@ from switches.connect.constants import (
 )
 from switches.connect.junos_pyez.utils import junos_get_real_ifname
 
+# the change templates, in a sub-directory per Napalm device type, e.g. 'ios':
+NAPALM_TEMPLATES_DIR = os.path.join(os.path.dirname(__file__), 'templates')
+# the change capabilities, and the templates each one needs:
+NAPALM_CHANGE_TEMPLATES = {
+    'can_change_admin_status': ['enable_port.j2', 'disable_port.j2'],
+    'can_change_poe_status': ['enable_poe.j2', 'disable_poe.j2'],
+    'can_change_vlan': ['set_vlan.j2'],
+    'can_change_description': ['set_description.j2'],
+}
+
 
 class NapalmConnector(Connector):
     """
@@ -65,26 +84,56 @@ class NapalmConnector(Connector):
         """
         dprint("NapalmConnector() __init__")
         super().__init__(request, group, switch)
-        self.description = 'Napalm library (R/O) driver'
         self.vendor_name = "Napalm Library"
-        # force READ-ONLY for now! We have not implemented changing settings.
-        self.read_only = True
+        # changes are made with the templates for the device type, if enabled:
+        can_change = False
+        if settings.NAPALM_CHANGES_ENABLED:
+            for capability, templates in NAPALM_CHANGE_TEMPLATES.items():
+                if all(os.path.isfile(os.path.join(self._templates_dir(), template)) for template in templates):
+                    setattr(self, capability, True)
+                    can_change = True
+        if can_change:
+            self.description = 'Napalm library driver'
+        else:
+            self.description = 'Napalm library (R/O) driver'
+            self.read_only = True
 
         self.add_more_info('Connection', 'Type', f"Napalm Connector for '{self.switch.napalm_device_type}'")
         self.napalm_device = False  # this will be the Napalm driver connection
         # and we dont want to cache this:
         self.set_do_not_cache_attribute('napalm_device')
+        # the rendered changes and changed interfaces during a bulk edit, see bulk_edit_start():
+        self.bulk_config = False
+        self.set_do_not_cache_attribute('bulk_config')
+        self.bulk_interfaces = []
+        self.set_do_not_cache_attribute('bulk_interfaces')
 
     def get_my_basic_info(self) -> bool:
         '''
         load 'basic' list of interfaces with status.
+        The device facts are cached for settings.NAPALM_FACTS_CACHE_TIME,
+        and the getters are run concurrently if possible, see _run_getters().
         return True on success, False on error and set self.error variables
         '''
         if not self._open_device():
             return False
+        getters = {
+            'get_interfaces': {},
+            'get_vlans': {},
+            'get_interfaces_ip': {},
+        }
+        facts_cache_key = get_switch_cache_key(self.switch.id, "napalm-facts")
+        facts = cache.get(facts_cache_key)
+        if facts is None:
+            getters['get_facts'] = {}
+        results = self._run_getters(getters=getters)
         # get facts of device first, ie OS, model, etc.!
         try:
-            facts = self.napalm_device.get_facts()
+            if facts is None:
+                facts = self._getter_result(results=results, getter='get_facts')
+                # remember when read, so we can show the current uptime from the cached facts:
+                facts['read_time'] = time.time()
+                cache.set(facts_cache_key, facts, settings.NAPALM_FACTS_CACHE_TIME)
         except Exception as e:
             self.error.status = True
             self.error.description = "Cannot get device facts"
@@ -100,11 +149,12 @@ class NapalmConnector(Connector):
         self.add_more_info('System', 'Vendor', facts['vendor'])
         self.add_more_info('System', 'OS', facts['os_version'])
         self.add_more_info('System', 'Model', facts['model'])
-        self.add_more_info('System', 'Uptime', uptime_to_string(int(facts['uptime'])))
+        uptime = int(facts['uptime'] + time.time() - facts['read_time'])
+        self.add_more_info('System', 'Uptime', uptime_to_string(uptime))
 
         # now load the interfaces:
         try:
-            interface_list = self.napalm_device.get_interfaces()
+            interface_list = self._getter_result(results=results, getter='get_interfaces')
         except Exception as e:
             self.error.status = True
             self.error.description = "Cannot get interface list"
@@ -134,7 +184,7 @@ class NapalmConnector(Connector):
 
         # now load the vlan data:
         try:
-            vlan_list = self.napalm_device.get_vlans()
+            vlan_list = self._getter_result(results=results, getter='get_vlans')
         except Exception as e:
             self.error.status = True
             self.error.description = "Cannot get vlan list"
@@ -181,7 +231,7 @@ class NapalmConnector(Connector):
 
         # now load the interface ipv4 data:
         try:
-            ip_list = self.napalm_device.get_interfaces_ip()
+            ip_list = self._getter_result(results=results, getter='get_interfaces_ip')
         except Exception as e:
             self.error.status = True
             self.error.description = "Cannot get interfaces ip list"
@@ -218,6 +268,9 @@ class NapalmConnector(Connector):
         Returns:
             (bool): True on success, False on failure
         '''
+        # this can be called on demand, after the basic info was read in an earlier request:
+        if not self.napalm_device and not self._open_device():
+            return False
         try:
             vrf_table = self.napalm_device.get_network_instances()
             dprint(f"VRF table:\n{vrf_table}")
@@ -264,9 +317,17 @@ class NapalmConnector(Connector):
         '''
         if not self._open_device():
             return False
+        results = self._run_getters(
+            getters={
+                'get_mac_address_table': {},
+                'get_arp_table': {'vrf': ''},
+                'get_ipv6_neighbors_table': {},
+                'get_lldp_neighbors_detail': {},
+            }
+        )
         # get mac address table
         try:
-            mac_table = self.napalm_device.get_mac_address_table()
+            mac_table = self._getter_result(results=results, getter='get_mac_address_table')
             dprint(f"mac_table = \n{mac_table}\n")
             for info in mac_table:
                 if_name = info['interface']
@@ -289,7 +350,7 @@ class NapalmConnector(Connector):
 
         # get arp table
         try:
-            arp_table = self.napalm_device.get_arp_table(vrf='')
+            arp_table = self._getter_result(results=results, getter='get_arp_table')
             dprint(f"arp_table = \n{arp_table}\n")
             for info in arp_table:
                 if_name = info['interface']
@@ -310,7 +371,7 @@ class NapalmConnector(Connector):
 
         # get IPv6 neighbors
         try:
-            nd_table = self.napalm_device.get_ipv6_neighbors_table()
+            nd_table = self._getter_result(results=results, getter='get_ipv6_neighbors_table')
             dprint(f"nd_table = \n{nd_table}\n")
             for neighbor in nd_table:
                 if_name = neighbor['interface']
@@ -335,7 +396,7 @@ class NapalmConnector(Connector):
 
         # get lldp details
         try:
-            lldp_details = self.napalm_device.get_lldp_neighbors_detail()
+            lldp_details = self._getter_result(results=results, getter='get_lldp_neighbors_detail')
             dprint(f"lldp_details = \n{lldp_details}\n")
             # parse
             for if_name, lldp_data in lldp_details.items():
@@ -379,6 +440,339 @@ class NapalmConnector(Connector):
 
         return True
 
+    def set_interface_admin_status(self, interface: Interface, new_state: bool) -> bool:
+        '''
+        Set the interface to the requested state (up or down)
+
+        Args:
+            interface: the Interface() object for the requested port
+            new_state (boolean): new state, True = enabled, False = disabled
+
+        Returns:
+            (boolean) True on success, False on error and set self.error variables
+        '''
+        dprint(f"NapalmConnector.set_interface_admin_status() for {interface.name} to {bool(new_state)}")
+        template = 'enable_port.j2' if new_state else 'disable_port.j2'
+        if self._change_interface(interface=interface, template=template):
+            # now do the bookkeeping:
+            return super().set_interface_admin_status(interface=interface, new_state=new_state)
+        return False
+
+    def set_interface_poe_status(self, interface: Interface, new_state: int) -> bool:
+        '''
+        Set the interface Power-over-Ethernet status to the requested state
+
+        Args:
+            interface: the Interface() object for the requested port
+            new_state (int): POE_PORT_ADMIN_ENABLED or POE_PORT_ADMIN_DISABLED
+
+        Returns:
+            (boolean) True on success, False on error and set self.error variables
+        '''
+        dprint(f"NapalmConnector.set_interface_poe_status() for {interface.name} to {new_state}")
+        template = 'enable_poe.j2' if new_state == POE_PORT_ADMIN_ENABLED else 'disable_poe.j2'
+        if self._change_interface(interface=interface, template=template):
+            return super().set_interface_poe_status(interface=interface, new_state=new_state)
+        return False
+
+    def set_interface_untagged_vlan(self, interface: Interface, new_vlan_id: int) -> bool:
+        '''
+        Set the interface untagged vlan to the given vlan
+
+        Args:
+            interface: the Interface() object for the requested port
+            new_vlan_id (int): the requested untagged vlan
+
+        Returns:
+            (boolean) True on success, False on error and set self.error variables
+        '''
+        dprint(f"NapalmConnector.set_interface_untagged_vlan() for {interface.name} to vlan {new_vlan_id}")
+        if self._change_interface(interface=interface, template='set_vlan.j2', vlan_id=int(new_vlan_id)):
+            return super().set_interface_untagged_vlan(interface=interface, new_vlan_id=new_vlan_id)
+        return False
+
+    def set_interface_description(self, interface: Interface, description: str) -> bool:
+        '''
+        Set the interface description (aka. description) to the string
+
+        Args:
+            interface: the Interface() object for the requested port
+            description (str): the requested text
+
+        Returns:
+            (boolean) True on success, False on error and set self.error variables
+        '''
+        dprint(f"NapalmConnector.set_interface_description() for {interface.name} to '{description}'")
+        if self._change_interface(interface=interface, template='set_description.j2', description=description):
+            return super().set_interface_description(interface=interface, description=description)
+        return False
+
+    def bulk_edit_start(self) -> bool:
+        '''
+        Render all following interface changes into a single merge candidate. See bulk_edit_commit().
+
+        Args:
+            none
+
+        Returns:
+            True if changes are now batched, False if each change is applied immediately.
+        '''
+        dprint("NapalmConnector.bulk_edit_start()")
+        if not self.napalm_device and not self._open_device():
+            return False
+        self.bulk_config = []
+        self.bulk_interfaces = []
+        return True
+
+    def bulk_edit_commit(self) -> bool:
+        '''
+        Load all changes rendered since bulk_edit_start() as a single merge candidate, commit it once,
+        and then read the new state of the changed interfaces.
+
+        Args:
+            none
+
+        Returns:
+            True on success, False on error and set self.error variables.
+        '''
+        config = "\n".join(self.bulk_config)
+        if_names = self.bulk_interfaces
+        # stop batching:
+        self.bulk_config = False
+        self.bulk_interfaces = []
+        dprint(f"NapalmConnector.bulk_edit_commit(): {len(if_names)} changes")
+        if not config:
+            return True
+        if not self._push_config(config=config):
+            return False
+        self._reread_interfaces(if_names=if_names)
+        return True
+
+    def _change_interface(self, interface: Interface, template: str, **values) -> bool:
+        '''
+        Render a change template for an interface, and apply it, or add it to the bulk edit in progress.
+
+        Args:
+            interface: the Interface() object for the requested port
+            template (str): the name of the template file, e.g. 'enable_port.j2'
+            values: the other template variables, e.g. vlan_id=10
+
+        Returns:
+            (boolean) True on success, False on error and set self.error variables
+        '''
+        for name, value in values.items():
+            # each value has to stay on its line in the configuration:
+            if isinstance(value, str) and ('\n' in value or '\r' in value):
+                self.error.status = True
+                self.error.description = f"Invalid characters in {name}, change was NOT applied!"
+                self.error.details = ''
+                return False
+        try:
+            config = self._render_template(template=template, interface=interface.name, **values)
+        except Exception as e:
+            self.error.status = True
+            self.error.description = f"Change template '{template}' not found or invalid!"
+            self.error.details = f"Template Error: {repr(e)} ({str(type(e))})"
+            dprint(f"   _render_template() Exception: {e.__class__.__name__}\n{self.error.details}\n")
+            return False
+        if self.bulk_config is not False:
+            self.bulk_config.append(config)
+            if interface.name not in self.bulk_interfaces:
+                self.bulk_interfaces.append(interface.name)
+            return True
+        if not self.napalm_device and not self._open_device():
+            return False
+        return self._push_config(config=config)
+
+    def _render_template(self, template: str, **values) -> str:
+        '''
+        Render one of the change templates for this device type, in templates/<napalm device type>/
+
+        Args:
+            template (str): the name of the template file, e.g. 'enable_port.j2'
+            values: the template variables.
+
+        Returns:
+            (str): the configuration lines. Any error is raised.
+        '''
+        env = Environment(loader=FileSystemLoader(self._templates_dir()), undefined=StrictUndefined)
+        return env.get_template(template).render(**values).strip()
+
+    def _templates_dir(self) -> str:
+        '''
+        The directory with the change templates for this device type.
+        '''
+        return os.path.join(NAPALM_TEMPLATES_DIR, self.switch.napalm_device_type)
+
+    def _push_config(self, config: str) -> bool:
+        '''
+        Load configuration lines as a merge candidate, and commit it.
+        On error, the candidate is discarded.
+
+        Args:
+            config (str): the configuration lines.
+
+        Returns:
+            (boolean) True on success, False on error and set self.error variables
+        '''
+        dprint(f"NapalmConnector._push_config():\n{config}")
+        try:
+            self.napalm_device.load_merge_candidate(config=config)
+            dprint(f"Config Diff: {self.napalm_device.compare_config()}")
+            self.napalm_device.commit_config()
+        except Exception as e:
+            self.error.status = True
+            self.error.description = "Error applying configuration, change was NOT applied!"
+            self.error.details = f"Napalm Error: {repr(e)} ({str(type(e))})\n{traceback.format_exc()}"
+            dprint(f"   napalm.device.commit_config() Exception: {e.__class__.__name__}\n{self.error.details}\n")
+            try:
+                self.napalm_device.discard_config()
+            except Exception as e:
+                dprint(f"   napalm.device.discard_config() Exception: {e}")
+            return False
+        return True
+
+    def _reread_interfaces(self, if_names: list):
+        '''
+        Update the state of some interfaces from the device, e.g. after a bulk edit.
+        Napalm can only read all interfaces, so only the requested ones are updated.
+
+        Args:
+            if_names (list): the names of the interfaces to update.
+        '''
+        try:
+            interface_list = self.napalm_device.get_interfaces()
+        except Exception as e:
+            # the changes were applied, so we only log this:
+            dprint(f"   napalm.device.get_interfaces() Exception: {e.__class__.__name__}")
+            return
+        for if_name in if_names:
+            iface = self.get_interface_by_key(if_name)
+            if_data = interface_list.get(if_name)
+            if iface and if_data:
+                dprint(f"  Updating {if_name}")
+                iface.admin_status = if_data['is_enabled']
+                iface.oper_status = if_data['is_up']
+                iface.description = if_data['description']
+                iface.speed = if_data['speed']
+
+    def _run_getters(self, getters: dict) -> dict:
+        '''
+        Run a set of Napalm getters, and record the time each one takes with add_timing().
+        Most Napalm drivers use a single SSH channel that cannot be shared between threads, so if
+        settings.NAPALM_GETTER_SESSIONS > 1, the getters are spread over that many connections to the device,
+        and run concurrently. The first of these is our existing connection. The additional connections
+        count against settings.DEVICE_MAX_SESSIONS, and are not opened if that limit is reached.
+
+        Args:
+            getters (dict): getter name -> dict of arguments, e.g. {'get_arp_table': {'vrf': ''}}
+
+        Returns:
+            (dict): getter name -> tuple (result or the Exception raised, duration), see _getter_result().
+        '''
+        names = list(getters.keys())
+        sessions = max(1, min(settings.NAPALM_GETTER_SESSIONS, len(names)))
+        dprint(f"_run_getters() {names} over {sessions} connection(s)")
+
+        def run_batch(batch: list, device) -> dict:
+            batch_results = {}
+            for name in batch:
+                start_time = time.time()
+                try:
+                    result = getattr(device, name)(**getters[name])
+                except Exception as err:
+                    result = err
+                batch_results[name] = (result, time.time() - start_time)
+            return batch_results
+
+        def run_batch_new_device(batch: list):
+            # the additional connection counts against the device session limit:
+            if not device_session_start(self.switch.id):
+                dprint("  Too many sessions, not opening additional connection")
+                return None
+            try:
+                try:
+                    device = self._new_device()
+                except Exception as err:
+                    dprint(f"  Cannot open additional connection: {err}")
+                    return None
+                try:
+                    return run_batch(batch=batch, device=device)
+                finally:
+                    device.close()
+            finally:
+                device_session_end(self.switch.id)
+                # this thread has its own database connection, close it:
+                db_connection.close()
+
+        # each connection runs every n-th getter:
+        batches = [names[i::sessions] for i in range(sessions)]
+        if sessions == 1:
+            batch_results = [run_batch(batch=names, device=self.napalm_device)]
+        else:
+            with ThreadPoolExecutor(max_workers=sessions) as executor:
+                futures = [executor.submit(run_batch, batches[0], self.napalm_device)]
+                futures += [executor.submit(run_batch_new_device, batch) for batch in batches[1:]]
+                batch_results = [future.result() for future in futures]
+        results = {}
+        for batch, batch_result in zip(batches, batch_results):
+            if batch_result is None:
+                # the additional connection failed, use ours:
+                batch_result = run_batch(batch=batch, device=self.napalm_device)
+            results.update(batch_result)
+        for name, (result, duration) in results.items():
+            if isinstance(result, Exception):
+                count = 0
+            elif isinstance(result, (dict, list)):
+                count = len(result)
+            else:
+                count = 1
+            self.add_timing(f"Napalm {name}", count, duration)
+        return results
+
+    def _getter_result(self, results: dict, getter: str):
+        '''
+        Get the result of a getter run by _run_getters().
+        If the getter failed, this raises the exception it raised.
+
+        Args:
+            results (dict): as returned by _run_getters().
+            getter (str): the name of the getter.
+
+        Returns:
+            the data returned by the getter.
+        '''
+        result = results[getter][0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def _device_args(self) -> dict:
+        '''
+        The arguments for the Napalm driver to connect to the device.
+        '''
+        return {
+            'hostname': self.switch.primary_ip4,
+            'username': self.switch.netmiko_profile.username,
+            'password': self.switch.netmiko_profile.password,
+            'optional_args': {
+                "port": self.switch.netmiko_profile.tcp_port,
+            },
+        }
+
+    def _new_device(self):
+        '''
+        Open an additional Napalm connection to the device, see _run_getters().
+        Any error is raised.
+
+        Returns:
+            the open Napalm driver connection.
+        '''
+        driver = get_network_driver(self.switch.napalm_device_type)
+        device = driver(**self._device_args())
+        device.open()
+        return device
+
     def _open_device(self) -> bool:
         '''
         get a Napalm 'driver' and open connection to the device
@@ -400,14 +794,7 @@ class NapalmConnector(Connector):
             return False
 
         # next open connection
-        self.napalm_device = driver(
-            hostname=self.switch.primary_ip4,
-            username=self.switch.netmiko_profile.username,
-            password=self.switch.netmiko_profile.password,
-            optional_args={
-                "port": self.switch.netmiko_profile.tcp_port,
-            },
-        )
+        self.napalm_device = driver(**self._device_args())
         try:
             self.napalm_device.open()
         except Exception as e:
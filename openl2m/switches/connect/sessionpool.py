@@ -0,0 +1,243 @@
+#
+# This file is part of Open Layer 2 Management (OpenL2M).
+#
+# OpenL2M is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License version 3 as published by
+# the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.  You should have received a copy of the GNU General Public
+# License along with OpenL2M. If not, see <http://www.gnu.org/licenses/>.
+#
+"""
+A per-process pool of open sessions to devices, so that drivers can reuse a logged-in session
+across requests, instead of setting up a new connection (and login) on every page view.
+
+Sessions are pooled per device and credentials. When a request is done with a session, it is returned
+to the pool. Sessions that are idle for too long are closed (ie. logged out). The number of sessions
+per device is limited, so we stay below the session limits of the device.
+"""
+import atexit
+import threading
+import time
+
+from switches.utils import dprint
+
+# max seconds to wait for a session, when all sessions to the device are in use:
+POOL_WAIT_TIME = 10
+
+# all pools in this process, see close_abandoned_sessions():
+_pools = []
+
+
+class SessionPoolFull(Exception):
+    """
+    Raised when the maximum number of sessions to a device are in use, and none was returned in time.
+    """
+
+    pass
+
+
+class SessionPool:
+    """
+    A thread-safe pool of sessions, keyed by device and credentials.
+    The pool does not know about the type of session; the driver gives functions to open,
+    close, and optionally check, a session.
+    """
+
+    def __init__(self, name: str, max_sessions: int, idle_timeout: int, close_session, check_session=None):
+        """
+        Args:
+            name (str): the name of this pool, for debugging.
+            max_sessions (int): max number of sessions to a single device, idle or in use.
+            idle_timeout (int): seconds after which an idle session is closed.
+            close_session (callable): called with a session to close it, e.g. logout.
+            check_session (callable): optional, called with an idle session before reuse,
+                                      returns True if the session can still be used.
+        """
+        self.name = name
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.close_session = close_session
+        self.check_session = check_session
+        self._idle = {}  # (device, credentials) -> list of (session, time returned)
+        self._count = {}  # device -> number of open sessions, idle or in use
+        self._in_use = {}  # id(session) -> (device, credentials, session, thread id)
+        self._lock = threading.Condition()
+        _pools.append(self)
+        # log out of all idle sessions when the worker exits:
+        atexit.register(self.close_all)
+
+    def get(self, device, credentials, open_session):
+        """
+        Get an idle session from the pool, or open a new one if the device limit allows.
+
+        Args:
+            device: the key of the device, e.g. the Switch().id
+            credentials: the key of the credentials used, e.g. profile id and username.
+            open_session (callable): called without arguments to open a new session.
+                                     Any exception raised is passed on to the caller.
+
+        Returns:
+            the session.
+
+        Raises:
+            SessionPoolFull if no session became available in time.
+        """
+        key = (device, credentials)
+        deadline = time.monotonic() + POOL_WAIT_TIME
+        while True:
+            session = None
+            can_open = False
+            with self._lock:
+                expired = self._expire()
+                idle = self._idle.get(key)
+                if idle:
+                    # the most recently used is at the end:
+                    session = idle.pop()[0]
+                elif self._count.get(device, 0) < self.max_sessions:
+                    self._count[device] = self._count.get(device, 0) + 1
+                    can_open = True
+                else:
+                    # make room by closing an idle session to this device with other credentials:
+                    for other_key, other_idle in self._idle.items():
+                        if other_key[0] == device and other_idle:
+                            expired.append((device, other_idle.pop(0)[0]))
+                            break
+                if session is None and not can_open and not expired:
+                    # all in use, wait for one to be returned or closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise SessionPoolFull(f"All {self.max_sessions} {self.name} sessions to the device are in use!")
+                    self._lock.wait(remaining)
+                    continue
+            # closing expired sessions may free up room for this device, so try again after:
+            self._close(expired)
+            if session is not None:
+                if self.check_session is None or self._check(session):
+                    dprint(f"SessionPool({self.name}): reusing session for {device}")
+                    return self._checkout(device, credentials, session)
+                dprint(f"SessionPool({self.name}): idle session for {device} is no longer valid")
+                self._close([(device, session)])
+            elif can_open:
+                dprint(f"SessionPool({self.name}): opening new session for {device}")
+                try:
+                    return self._checkout(device, credentials, open_session())
+                except Exception:
+                    self._forget(device)
+                    raise
+
+    def release(self, device, credentials, session, reuse: bool = True):
+        """
+        Return a session to the pool when a request is done with it.
+
+        Args:
+            device: the key of the device, as given to get()
+            credentials: the key of the credentials, as given to get()
+            session: the session to return.
+            reuse (bool): if False, the session is closed instead of kept, e.g. after errors.
+
+        Returns:
+            none
+        """
+        with self._lock:
+            if self._in_use.pop(id(session), None) is None:
+                # already returned, or closed as abandoned:
+                dprint(f"SessionPool({self.name}): session to {device} is not in use, ignoring release!")
+                return
+        if not reuse:
+            self._close([(device, session)])
+            return
+        with self._lock:
+            self._idle.setdefault((device, credentials), []).append((session, time.monotonic()))
+            self._lock.notify_all()
+
+    def close_all(self):
+        """
+        Close all idle sessions in the pool.
+        """
+        with self._lock:
+            sessions = [(key[0], s) for key, idle in self._idle.items() for s, returned in idle]
+            self._idle.clear()
+        self._close(sessions)
+
+    def close_abandoned(self):
+        """
+        Close the sessions taken by the current thread that were never returned with release().
+        We do not know what state these are in, so they are not reused.
+        """
+        thread_id = threading.get_ident()
+        with self._lock:
+            abandoned = [entry for entry in self._in_use.values() if entry[3] == thread_id]
+            for device, credentials, session, thread in abandoned:
+                del self._in_use[id(session)]
+        if abandoned:
+            dprint(f"SessionPool({self.name}): closing {len(abandoned)} abandoned sessions")
+        self._close([(device, session) for device, credentials, session, thread in abandoned])
+
+    def _checkout(self, device, credentials, session):
+        """
+        Remember which thread is using a session, so it can be closed if it is never returned.
+        """
+        with self._lock:
+            self._in_use[id(session)] = (device, credentials, session, threading.get_ident())
+        return session
+
+    def _expire(self) -> list:
+        """
+        Remove the sessions that have been idle for too long. Called with the lock held.
+
+        Returns:
+            (list): of (device, session) tuples to be closed (outside the lock).
+        """
+        expired = []
+        cutoff = time.monotonic() - self.idle_timeout
+        for key, idle in self._idle.items():
+            while idle and idle[0][1] < cutoff:
+                # the oldest are at the front of the list:
+                expired.append((key[0], idle.pop(0)[0]))
+        return expired
+
+    def _check(self, session) -> bool:
+        """
+        Call the check_session() function, any error means the session is not valid.
+        """
+        try:
+            return self.check_session(session)
+        except Exception as err:
+            dprint(f"SessionPool({self.name}): session check failed: {err}")
+            return False
+
+    def _close(self, sessions: list):
+        """
+        Close sessions, and update the session count of their devices.
+
+        Args:
+            sessions (list): of (device, session) tuples.
+        """
+        for device, session in sessions:
+            try:
+                self.close_session(session)
+            except Exception as err:
+                dprint(f"SessionPool({self.name}): error closing session to {device}: {err}")
+            self._forget(device)
+
+    def _forget(self, device):
+        """
+        One less session to a device is open, and allow a waiting request to open one.
+        """
+        with self._lock:
+            self._count[device] = max(self._count.get(device, 0) - 1, 0)
+            self._lock.notify_all()
+
+
+def close_abandoned_sessions(sender=None, **kwargs):
+    """
+    Close the sessions in all pools that the current thread did not return.
+    This is the receiver for the 'request_finished' signal, see apps.py,
+    so a driver error can never leave a device session counted as "in use" forever.
+    """
+    for pool in _pools:
+        pool.close_abandoned()
@@ -26,7 +26,7 @@ from django.http.request import HttpRequest
 
 from switches.models import Switch, SwitchGroup
 from switches.constants import LOG_TYPE_ERROR, LOG_SAVE_SWITCH, LOG_PORT_POE_FAULT, SNMP_VERSION_2C
-from switches.connect.classes import Interface, Transceiver, SyslogMsg
+from switches.connect.classes import Interface, Transceiver, SyslogMsg, bitmap_to_positions
 from switches.connect.constants import poe_status_name, POE_PORT_DETECT_FAULT, VLAN_TYPE_NORMAL
 from switches.connect.snmp.connector import dot1qPvid
 from switches.connect.snmp.connector import SnmpConnector, oid_in_branch
@@ -946,37 +946,10 @@ class SnmpConnectorCisco(SnmpConnector):
         iface -  the interface these vlans belong to.
         return -1 on error, 0 otherwize
         """
-        offset = 0  # bit-offset in the byte
-        for byte in val:
-            byte = ord(byte)
-            # which bits are set? A hack but it works!
-            # note that the bits are actually in system order,
-            # ie. bit 1 is first bit in stream, i.e. HIGH order bit!
-            if byte & 128:
-                vlan_id = (offset * 8) + vlan_base
-                self.add_vlan_to_interface(iface, vlan_id)
-            if byte & 64:
-                vlan_id = (offset * 8) + 1 + vlan_base
-                self.add_vlan_to_interface(iface, vlan_id)
-            if byte & 32:
-                vlan_id = (offset * 8) + 2 + vlan_base
-                self.add_vlan_to_interface(iface, vlan_id)
-            if byte & 16:
-                vlan_id = (offset * 8) + 3 + vlan_base
-                self.add_vlan_to_interface(iface, vlan_id)
-            if byte & 8:
-                vlan_id = (offset * 8) + 4 + vlan_base
-                self.add_vlan_to_interface(iface, vlan_id)
-            if byte & 4:
-                vlan_id = (offset * 8) + 5 + vlan_base
-                self.add_vlan_to_interface(iface, vlan_id)
-            if byte & 2:
-                vlan_id = (offset * 8) + 6 + vlan_base
-                self.add_vlan_to_interface(iface, vlan_id)
-            if byte & 1:
-                vlan_id = (offset * 8) + 7 + vlan_base
-                self.add_vlan_to_interface(iface, vlan_id)
-            offset += 1
+        # note that the bits are actually in system order,
+        # ie. bit 1 is first bit in stream, i.e. HIGH order bit!
+        for vlan_id in bitmap_to_positions(val, first=vlan_base):
+            self.add_vlan_to_interface(iface, vlan_id)
         return True
 
     def _parse_mibs_cisco_config(self, oid: str, val: str) -> bool:
@@ -62,6 +62,7 @@ from switches.connect.classes import (
     StackMember,
     Transceiver,
     Vlan,
+    bitmap_to_positions,
 )
 
 # from switches.connect.connect import *
@@ -1041,7 +1042,6 @@ class SnmpConnector(Connector):
             self._get_lldp_data()
             # and the arp tables (after we found ethernet address, so we can update with IP)
             self._get_arp_data()
-            self.switch.save()  # update counters
             return True
         return False
 
@@ -1072,37 +1072,10 @@ class SnmpConnector(Connector):
         Returns:
             n/a
         """
-        offset = 0
-        for byte in byte_string:
-            byte = ord(byte)
-            # which bits are set? A hack but it works!
-            # note that the bits are actually in system order,
-            # ie. bit 1 is first bit in stream, i.e. HIGH order bit!
-            if byte & 128:
-                port_id = (offset * 8) + 1
-                self._add_vlan_to_interface_by_port_id(port_id, vlan_id)
-            if byte & 64:
-                port_id = (offset * 8) + 2
-                self._add_vlan_to_interface_by_port_id(port_id, vlan_id)
-            if byte & 32:
-                port_id = (offset * 8) + 3
-                self._add_vlan_to_interface_by_port_id(port_id, vlan_id)
-            if byte & 16:
-                port_id = (offset * 8) + 4
-                self._add_vlan_to_interface_by_port_id(port_id, vlan_id)
-            if byte & 8:
-                port_id = (offset * 8) + 5
-                self._add_vlan_to_interface_by_port_id(port_id, vlan_id)
-            if byte & 4:
-                port_id = (offset * 8) + 6
-                self._add_vlan_to_interface_by_port_id(port_id, vlan_id)
-            if byte & 2:
-                port_id = (offset * 8) + 7
-                self._add_vlan_to_interface_by_port_id(port_id, vlan_id)
-            if byte & 1:
-                port_id = (offset * 8) + 8
-                self._add_vlan_to_interface_by_port_id(port_id, vlan_id)
-            offset += 1
+        # note that the bits are actually in system order,
+        # ie. bit 1 is first bit in stream, i.e. HIGH order bit!
+        for port_id in bitmap_to_positions(byte_string):
+            self._add_vlan_to_interface_by_port_id(port_id, vlan_id)
 
     def _get_untagged_ports_from_vlan_bitmap(self, vlan_id: int, byte_string: bytes):
         """Parse the list of current untagged ports of a VLAN as a hex byte string
@@ -1116,37 +1089,10 @@ class SnmpConnector(Connector):
             none
         """
         dprint(f"_get_untagged_ports_from_vlan_bitmap() for vlan {vlan_id}")
-        offset = 0
-        for byte in byte_string:
-            byte = ord(byte)
-            # which bits are set? A hack but it works!
-            # note that the bits are actually in system order,
-            # ie. bit 1 is first bit in stream, i.e. HIGH order bit!
-            if byte & 128:
-                port_id = (offset * 8) + 1
-                self._add_untagged_vlan_to_interface_by_port_id(port_id, vlan_id)
-            if byte & 64:
-                port_id = (offset * 8) + 2
-                self._add_untagged_vlan_to_interface_by_port_id(port_id, vlan_id)
-            if byte & 32:
-                port_id = (offset * 8) + 3
-                self._add_untagged_vlan_to_interface_by_port_id(port_id, vlan_id)
-            if byte & 16:
-                port_id = (offset * 8) + 4
-                self._add_untagged_vlan_to_interface_by_port_id(port_id, vlan_id)
-            if byte & 8:
-                port_id = (offset * 8) + 5
-                self._add_untagged_vlan_to_interface_by_port_id(port_id, vlan_id)
-            if byte & 4:
-                port_id = (offset * 8) + 6
-                self._add_untagged_vlan_to_interface_by_port_id(port_id, vlan_id)
-            if byte & 2:
-                port_id = (offset * 8) + 7
-                self._add_untagged_vlan_to_interface_by_port_id(port_id, vlan_id)
-            if byte & 1:
-                port_id = (offset * 8) + 8
-                self._add_untagged_vlan_to_interface_by_port_id(port_id, vlan_id)
-            offset += 1
+        # note that the bits are actually in system order,
+        # ie. bit 1 is first bit in stream, i.e. HIGH order bit!
+        for port_id in bitmap_to_positions(byte_string):
+            self._add_untagged_vlan_to_interface_by_port_id(port_id, vlan_id)
 
         #
         # 802.1Q / VLAN related MIB parsers
@@ -1387,7 +1333,6 @@ class SnmpConnector(Connector):
                 self.add_warning(warning)
                 # log this as well
                 log = Log(
-                    user=self.request.user,
                     group=self.group,
                     switch=self.switch,
                     ip_address=get_remote_ip(self.request),
@@ -1465,37 +1410,7 @@ class SnmpConnector(Connector):
             # store the egress port list, as some switches need this when setting untagged vlans
             self.vlans[vlan_id].current_egress_portlist.from_unicode(val)
             # now look at all the bits in this multi-byte value to find ports on this vlan:
-            offset = 0
-            for byte in val:
-                byte = ord(byte)
-                # which bits are set? A hack but it works!
-                # note that the bits are actually in system order,
-                # ie. bit 1 is first bit in stream, i.e. HIGH order bit!
-                if byte & 128:
-                    port_id = (offset * 8) + 1
-                    self._add_vlan_to_interface_by_port_id(port_id, vlan_id)
-                if byte & 64:
-                    port_id = (offset * 8) + 2
-                    self._add_vlan_to_interface_by_port_id(port_id, vlan_id)
-                if byte & 32:
-                    port_id = (offset * 8) + 3
-                    self._add_vlan_to_interface_by_port_id(port_id, vlan_id)
-                if byte & 16:
-                    port_id = (offset * 8) + 4
-                    self._add_vlan_to_interface_by_port_id(port_id, vlan_id)
-                if byte & 8:
-                    port_id = (offset * 8) + 5
-                    self._add_vlan_to_interface_by_port_id(port_id, vlan_id)
-                if byte & 4:
-                    port_id = (offset * 8) + 6
-                    self._add_vlan_to_interface_by_port_id(port_id, vlan_id)
-                if byte & 2:
-                    port_id = (offset * 8) + 7
-                    self._add_vlan_to_interface_by_port_id(port_id, vlan_id)
-                if byte & 1:
-                    port_id = (offset * 8) + 8
-                    self._add_vlan_to_interface_by_port_id(port_id, vlan_id)
-                offset += 1
+            self._get_ports_from_vlan_bitmap(vlan_id=vlan_id, byte_string=val)
             return True
 
         # we did not parse the OID.
@@ -1686,7 +1601,6 @@ class SnmpConnector(Connector):
                 self.add_warning(warning)
                 # log this as well
                 log = Log(
-                    user=self.request.user,
                     group=self.group,
                     switch=self.switch,
                     ip_address=get_remote_ip(self.request),
@@ -2811,9 +2725,9 @@ class SnmpConnector(Connector):
 
             dprint("   Add as tagged?")
             # only add vlan once, and only if defined!
-            if vlan_id in self.vlans and vlan_id not in self.interfaces[if_index].vlans:
+            if vlan_id in self.vlans:
                 dprint("      yes!")
-                self.interfaces[if_index].vlans.append(vlan_id)
+                self.interfaces[if_index].vlans.add(vlan_id)
                 self.interfaces[if_index].is_tagged = True
             return True
         return False
@@ -3022,7 +2936,7 @@ class SnmpConnector(Connector):
         if self.hostname:
             if self.switch.hostname != self.hostname:
                 self.switch.hostname = self.hostname
-                self.switch.save()
+                self.switch.save(update_fields=['hostname', 'modified'])
                 self.add_log(
                     type=LOG_TYPE_WARNING, action=LOG_NEW_HOSTNAME_FOUND, description="New System Hostname found"
                 )
@@ -115,6 +115,16 @@ SWITCH_STATUS_CHOICES = [
     [SWITCH_STATUS_DECOMMISSIONING, 'Decommissioning'],
 ]
 
+# Device health, ie. the "circuit breaker" state of device connections, see switches/connect/health.py
+DEVICE_HEALTH_OK = 0  # circuit closed, device is reachable.
+DEVICE_HEALTH_FAILING = 1  # circuit open, requests fail fast without connecting to the device.
+DEVICE_HEALTH_PROBING = 2  # circuit half-open, a single request checks if the device is reachable again.
+DEVICE_HEALTH_CHOICES = [
+    [DEVICE_HEALTH_OK, 'OK'],
+    [DEVICE_HEALTH_FAILING, 'Unreachable'],
+    [DEVICE_HEALTH_PROBING, 'Checking'],
+]
+
 
 CMD_TYPE_GLOBAL = 0
 CMD_TYPE_INTERFACE = 1
@@ -0,0 +1,184 @@
+#
+# This file is part of Open Layer 2 Management (OpenL2M).
+#
+# OpenL2M is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License version 3 as published by
+# the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.  You should have received a copy of the GNU General Public
+# License along with OpenL2M. If not, see <http://www.gnu.org/licenses/>.
+#
+"""
+Buffered writing of activity Log() entries, and the syslog copy of those entries.
+
+Log entries that are not audit-critical (views, warnings and errors) are kept in memory,
+and written to the database in a single bulk insert when LOG_BUFFER_SIZE entries are waiting,
+every LOG_BUFFER_INTERVAL seconds, at the end of each request, and when the process exits.
+All other entries (changes, commands, logins) are written immediately, see Log.save().
+
+The syslog copy of all entries is sent from a background thread.
+"""
+import atexit
+import logging
+import logging.handlers
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection as db_connection
+
+from switches.constants import LOG_TYPE_VIEW, LOG_TYPE_WARNING, LOG_TYPE_ERROR
+from switches.utils import dprint
+
+# the types of log entries that can be buffered. Everything else is written immediately.
+LOG_BUFFERED_TYPES = [LOG_TYPE_VIEW, LOG_TYPE_WARNING, LOG_TYPE_ERROR]
+
+_buffer = []  # the Log() objects waiting to be written
+_buffer_lock = threading.Lock()
+_flush_lock = threading.Lock()  # held while flush_logs() writes the entries it took from the buffer
+_flush_thread = None  # the thread that writes the buffer every LOG_BUFFER_INTERVAL seconds
+_syslog_lock = threading.Lock()
+
+logger = logging.getLogger(__name__)
+
+
+def buffer_log(log) -> bool:
+    """
+    Add a new Log() entry to the buffer, if it can be buffered.
+
+    Args:
+        log (Log): the entry to write.
+
+    Returns:
+        (bool): True if buffered, False if the caller needs to write it now.
+    """
+    global _flush_thread
+    if not settings.LOG_BUFFER_ENABLED or log.pk is not None or log.type not in LOG_BUFFERED_TYPES:
+        return False
+    with _buffer_lock:
+        # if saved again while waiting, the latest values will be written:
+        if not getattr(log, '_buffered', False):
+            log._buffered = True
+            _buffer.append(log)
+        buffer_full = len(_buffer) >= settings.LOG_BUFFER_SIZE
+        if _flush_thread is None:
+            _flush_thread = threading.Thread(target=_flush_periodically, name="log-buffer-flush", daemon=True)
+            _flush_thread.start()
+    if buffer_full:
+        flush_logs()
+    return True
+
+
+def unbuffer_log(log):
+    """
+    Remove a Log() entry from the buffer, if it is waiting there. This is called before an entry
+    is written directly, e.g. when saved again as a type that is not buffered, so it is not written twice.
+
+    Args:
+        log (Log): the entry that will be written.
+
+    Returns:
+        none
+    """
+    if not getattr(log, '_buffered', False):
+        return
+    with _buffer_lock:
+        if any(entry is log for entry in _buffer):
+            _buffer[:] = [entry for entry in _buffer if entry is not log]
+            log._buffered = False
+            return
+    # flush_logs() is writing it now, wait for that to finish, so the direct save updates the new row:
+    with _flush_lock:
+        pass
+
+
+def flush_logs():
+    """
+    Write all buffered Log() entries to the database, in a single bulk insert.
+
+    Args:
+        none
+
+    Returns:
+        none
+    """
+    with _flush_lock:
+        with _buffer_lock:
+            entries = _buffer[:]
+            _buffer.clear()
+        if not entries:
+            return
+        dprint(f"flush_logs(): writing {len(entries)} entries")
+        # avoid circular import:
+        from switches.models import Log
+
+        try:
+            Log.objects.bulk_create(entries)
+        except Exception as err:
+            # one bad entry should not lose all others, so try them one by one:
+            logger.error(f"Error writing {len(entries)} buffered log entries, retrying one by one: {err}")
+            for entry in entries:
+                try:
+                    Log.objects.bulk_create([entry])
+                except Exception as err:
+                    logger.error(f"Error writing buffered log entry '{entry.description}': {err}")
+        for entry in entries:
+            entry._buffered = False
+
+
+def _flush_periodically():
+    """
+    Background thread that writes the buffered Log() entries every LOG_BUFFER_INTERVAL seconds.
+    """
+    while True:
+        time.sleep(settings.LOG_BUFFER_INTERVAL)
+        try:
+            flush_logs()
+        except Exception as err:
+            logger.error(f"Error in log buffer thread: {err}")
+        finally:
+            # this thread has its own database connection, do not keep it open:
+            db_connection.close()
+
+
+def flush_logs_at_request_end(sender, **kwargs):
+    """
+    Receiver for the 'request_finished' signal, see apps.py. This runs after the response was sent.
+    """
+    flush_logs()
+
+
+def get_syslogger() -> logging.Logger:
+    """
+    Get the logger that sends Log() entries to settings.SYSLOG_HOST.
+    The messages are queued, and sent to the syslog host from a background thread.
+
+    Args:
+        none
+
+    Returns:
+        (Logger): the 'log_to_syslog' logger.
+    """
+    # each time you create a named logger, python will add handler to existing,
+    # even if you delete the object. So this is a 'globally' defined logger:
+    syslogger = logging.getLogger('log_to_syslog')
+    if not syslogger.handlers:
+        with _syslog_lock:
+            if not syslogger.handlers:
+                syslog_queue = queue.SimpleQueue()
+                handler = logging.handlers.SysLogHandler(address=(settings.SYSLOG_HOST, settings.SYSLOG_PORT))
+                listener = logging.handlers.QueueListener(syslog_queue, handler)
+                listener.start()
+                # send whatever is still queued at exit:
+                atexit.register(listener.stop)
+                syslogger.addHandler(logging.handlers.QueueHandler(syslog_queue))
+                syslogger.setLevel(logging.DEBUG)
+    return syslogger
+
+
+# do not lose buffered entries when the worker process exits:
+atexit.register(flush_logs)
@@ -0,0 +1,135 @@
+#
+# This file is part of Open Layer 2 Management (OpenL2M).
+#
+# OpenL2M is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License version 3 as published by
+# the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.  You should have received a copy of the GNU General Public
+# License along with OpenL2M. If not, see <http://www.gnu.org/licenses/>.
+#
+
+# Custom command line commands, see also:
+#    https://docs.djangoproject.com/en/2.2/howto/custom-management-commands/
+
+#
+# add the command 'benchmarktop' to compare the time it takes to find the "Top N" devices and users
+# by counting in the database (as done in stats.py), versus counting each Log() entry in Python.
+# With --seed, test log entries are added first. These are removed again when done,
+# as everything runs in a single database transaction that is rolled back.
+#
+
+import datetime
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from switches.constants import LOG_TYPE_VIEW, LOG_TYPE_CHANGE, LOG_VIEW_SWITCH, LOG_CHANGE_INTERFACE_ALIAS
+from switches.models import Log, Switch
+from switches.stats import get_top_changed_devices, get_top_viewed_devices, get_top_active_users
+
+# the "Top N" queries to compare: name (see get_top_activity()), function, log types and the field to count by:
+BENCHMARKS = [
+    ("changed-devices", get_top_changed_devices, [LOG_TYPE_CHANGE], 'switch'),
+    ("viewed-devices", get_top_viewed_devices, [LOG_TYPE_VIEW], 'switch'),
+    ("active-users", get_top_active_users, [LOG_TYPE_VIEW, LOG_TYPE_CHANGE], 'user'),
+]
+
+
+class Command(BaseCommand):
+    help = "Compare the time to find the most active devices and users, counting in the database or in Python."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="the number of test log entries to add before the benchmark. These are removed when done.",
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if options['seed']:
+                self.seed_logs(options['seed'])
+            since = timezone.now().date() - datetime.timedelta(days=settings.TOP_ACTIVITY_DAYS)
+            self.stdout.write(
+                f"Counting {Log.objects.filter(timestamp__gte=since).count()} log entries "
+                f"of the last {settings.TOP_ACTIVITY_DAYS} days:"
+            )
+            for name, function, log_types, field in BENCHMARKS:
+                # make sure we count, and do not get the cached result:
+                cache.delete(f"openl2m-top-{name}")
+                start_time = time.time()
+                top_data = function()
+                db_time = time.time() - start_time
+                cache.delete(f"openl2m-top-{name}")
+
+                start_time = time.time()
+                python_counts = self.count_in_python(since, log_types, field)
+                python_time = time.time() - start_time
+
+                same = all(python_counts.get(key) == value['count'] for key, value in top_data.items())
+                self.stdout.write(
+                    f"\t{name}: database {db_time:.3f} seconds, Python {python_time:.3f} seconds"
+                    f"{'' if same else ' - ERROR: the counts are different!'}"
+                )
+            # remove the test entries:
+            transaction.set_rollback(True)
+        self.stdout.write("Finished.", self.style.SUCCESS)
+
+    def count_in_python(self, since: datetime.datetime, log_types: list, field: str) -> dict:
+        """Count the log entries per device or user, reading each Log() entry, as was done before.
+
+        Args:
+            since (datetime): the start time to count from.
+            log_types (list): the LOG_TYPE_xxx values to count.
+            field (str): 'switch' or 'user', the object to count by.
+
+        Returns:
+            (dict): key is the pk of the device or user, value is the count.
+        """
+        counts = {}
+        for log in Log.objects.filter(type__in=log_types, timestamp__gte=since):
+            # this reads the related object, ie. a query per entry:
+            related = getattr(log, field)
+            if related is not None:
+                counts[related.id] = counts.get(related.id, 0) + 1
+        return counts
+
+    def seed_logs(self, count: int):
+        """Add test log entries, spread over the last TOP_ACTIVITY_DAYS days, for a set of test devices.
+
+        Args:
+            count (int): the number of log entries to add.
+
+        Returns:
+            none
+        """
+        self.stdout.write(f"Adding {count} test log entries...")
+        switches = [Switch.objects.create(name=f"benchmarktop-{i}") for i in range(100)]
+        now = timezone.now()
+        step = settings.TOP_ACTIVITY_DAYS * 86400 / count
+        logs = []
+        for i in range(count):
+            # about one change for every nine views:
+            log_type, action = (
+                (LOG_TYPE_CHANGE, LOG_CHANGE_INTERFACE_ALIAS) if i % 10 == 0 else (LOG_TYPE_VIEW, LOG_VIEW_SWITCH)
+            )
+            logs.append(
+                Log(
+                    timestamp=now - datetime.timedelta(seconds=i * step),
+                    switch=switches[i % len(switches)],
+                    type=log_type,
+                    action=action,
+                    description="benchmarktop test entry",
+                )
+            )
+        # bulk_create() does not use the log buffer, see Log.save()
+        Log.objects.bulk_create(logs, batch_size=10000)
@@ -41,6 +41,9 @@ COLUMN_USER = 4
 COLUMN_IP = 5
 COLUMN_DESCRIPTION = 6
 
+# the number of log entries read from the database at a time:
+LOG_CHUNK_SIZE = 2000
+
 
 class Command(BaseCommand):
     help = "E-mail OpenL2M logs"
@@ -312,8 +315,9 @@ class Command(BaseCommand):
             logs = Log.objects.all().filter(**filter_values).order_by("timestamp")
 
         # go output them!
-        if logs:
-            self.stdout.write(f"Emailing {logs.count()} log records... ", self.style.WARNING)
+        log_count = logs.count()
+        if log_count:
+            self.stdout.write(f"Emailing {log_count} log records... ", self.style.WARNING)
             self.stdout.flush()
             # need for-loop here!
             lines = []
@@ -324,7 +328,9 @@ class Command(BaseCommand):
                     tmp_file = f"{tempfile.gettempdir()}/{options['filename']}"
                     if options["verbosity"] > 1:
                         self.stdout.write(f"Attachment filename: {tmp_file}")
-                    workbook = xlsxwriter.Workbook(tmp_file)
+                    # constant_memory writes each row to disk as we go, so memory use does not grow with the rows.
+                    # Note that this requires rows to be written in order!
+                    workbook = xlsxwriter.Workbook(tmp_file, {'constant_memory': True})
                     format_bold = workbook.add_format({'bold': True, 'font_name': 'Calibri', 'font_size': 14})
                     format_regular = workbook.add_format({'font_name': 'Calibri', 'font_size': 12})
 
@@ -359,7 +365,8 @@ class Command(BaseCommand):
                     )
                     return
 
-            for log in logs:
+            # stream the entries, instead of loading them all in memory:
+            for log in logs.select_related('user', 'switch').iterator(chunk_size=LOG_CHUNK_SIZE):
                 row += 1
                 entry = f"#{row}, {log.timestamp.strftime(MY_TIMEFORMAT)}, type '{log_types[log.type]}', action '{log_actions[log.action]}', client ip '{log.ip_address}', device '{log.switch}', description '{log.description}'"
                 timestamp = log.timestamp.astimezone(tz=None)
@@ -23,6 +23,7 @@
 #
 
 from datetime import timedelta
+import time
 
 from django.conf import settings
 from django.core.management.base import BaseCommand
@@ -31,10 +32,30 @@ from django.db import DEFAULT_DB_ALIAS
 
 from switches.models import Log
 
+# the number of primary key values covered by each delete statement:
+DEFAULT_CHUNK_SIZE = 10000
+# seconds to wait between chunks, to give the database (and replication) time to catch up:
+DEFAULT_PAUSE = 0.5
+
 
 class Command(BaseCommand):
     help = "Remove log entries older then configured number of days."
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help=f"the range of log entry id's to delete at once. Default is {DEFAULT_CHUNK_SIZE}.",
+        )
+
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=DEFAULT_PAUSE,
+            help=f"the number of seconds to wait between deletes. Default is {DEFAULT_PAUSE}.",
+        )
+
     def handle(self, *args, **options):
         # Remove log entries older then configured value...
         self.stdout.write("Checking for old log entries to remove:")
@@ -43,20 +64,56 @@ class Command(BaseCommand):
             if options['verbosity'] > 1:
                 self.stdout.write(f"\tRetention period: {settings.LOG_MAX_AGE} days")
                 self.stdout.write(f"\tCut-off time: {cutoff}")
-            expired_records = Log.objects.filter(timestamp__lt=cutoff).count()
-            if expired_records:
-                self.stdout.write(
-                    f"\tDeleting {expired_records} expired log records... ", self.style.WARNING, ending=""
-                )
-                self.stdout.flush()
-                try:
-                    Log.objects.filter(timestamp__lt=cutoff)._raw_delete(using=DEFAULT_DB_ALIAS)
-                except Exception:
-                    self.stderr.write("Error deleting log entries!")
-                self.stdout.write("Done!", self.style.WARNING)
+            # the id range to check. Both lookups use an index, so this does not scan the table.
+            # Entries are added in time order, so the newest expired entry has (about) the highest expired id.
+            # Any stragglers with a higher id will be removed on the next run.
+            first_id = Log.objects.order_by('id').values_list('id', flat=True).first()
+            last_id = (
+                Log.objects.filter(timestamp__lt=cutoff).order_by('-timestamp').values_list('id', flat=True).first()
+            )
+            if first_id is not None and last_id is not None:
+                self.delete_range(first_id, last_id, cutoff, max(options['chunk_size'], 1), options['pause'])
             else:
                 self.stdout.write("\tNo expired log records found.")
         else:
             self.stdout.write(f"\tNo-Op: No log maximum age set! (LOG_MAX_AGE = {settings.LOG_MAX_AGE})")
 
         self.stdout.write("Finished.", self.style.SUCCESS)
+
+    def delete_range(self, first_id: int, last_id: int, cutoff, chunk_size: int, pause: float):
+        """
+        Delete the expired log entries with id from first_id to last_id, in chunks of chunk_size id's.
+        Each chunk is a separate, short, delete statement, so the table is never locked for long,
+        and the database write log is spread out over time.
+
+        Args:
+            first_id (int): the lowest log id to check.
+            last_id (int): the highest log id to check.
+            cutoff (datetime): entries before this time are deleted.
+            chunk_size (int): the number of id's to check in each delete.
+            pause (float): the seconds to wait between deletes.
+
+        Returns:
+            none
+        """
+        self.stdout.write(f"\tDeleting expired log records with id {first_id} to {last_id}:", self.style.WARNING)
+        deleted = 0
+        start = first_id
+        while start <= last_id:
+            end = min(start + chunk_size, last_id + 1)
+            try:
+                count = Log.objects.filter(id__gte=start, id__lt=end, timestamp__lt=cutoff)._raw_delete(
+                    using=DEFAULT_DB_ALIAS
+                )
+            except Exception as err:
+                self.stderr.write(f"Error deleting log entries with id {start} to {end - 1}: {err}")
+                return
+            deleted += count
+            self.stdout.write(
+                f"\t\t{deleted} deleted, {100 * (end - first_id) // (last_id + 1 - first_id)}% done (id {end - 1})"
+            )
+            self.stdout.flush()
+            start = end
+            if pause and start <= last_id:
+                time.sleep(pause)
+        self.stdout.write(f"\tDone! Deleted {deleted} expired log records.", self.style.WARNING)
@@ -0,0 +1,37 @@
+#
+# This file is part of Open Layer 2 Management (OpenL2M).
+#
+# OpenL2M is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License version 3 as published by
+# the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.  You should have received a copy of the GNU General Public
+# License along with OpenL2M. If not, see <http://www.gnu.org/licenses/>.
+#
+
+# Custom command line commands, see also:
+#    https://docs.djangoproject.com/en/2.2/howto/custom-management-commands/
+
+#
+# add the command 'rolluplogs' to add the hourly counts of Log() entries to the LogRollup table,
+# used by the usage statistics. Run this periodically (e.g. hourly from cron),
+# so the statistics page does not need to do this.
+#
+
+from django.core.management.base import BaseCommand
+
+from switches.stats import update_log_rollup
+
+
+class Command(BaseCommand):
+    help = "Add the hourly counts of log entries to the usage statistics table."
+
+    def handle(self, *args, **options):
+        self.stdout.write("Updating hourly log counts:")
+        until = update_log_rollup()
+        if options['verbosity'] > 1:
+            self.stdout.write(f"\tLog entries counted until: {until}")
+        self.stdout.write("Finished.", self.style.SUCCESS)
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.5 on 2026-10-19 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('switches', '0058_alter_log_action'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='log',
+            index=models.Index(fields=['switch', 'type', 'timestamp'], name='log_switch_type_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='log',
+            index=models.Index(fields=['type', 'timestamp'], name='log_type_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='log',
+            index=models.Index(fields=['user', 'timestamp'], name='log_user_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='log',
+            index=models.Index(fields=['timestamp'], name='log_time_idx'),
+        ),
+    ]
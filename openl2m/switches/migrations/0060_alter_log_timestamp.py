@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-19 11:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('switches', '0059_log_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='log',
+            name='timestamp',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,177 @@
+# Generated by Django 5.2.5 on 2026-10-19 12:20
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.db.models.functions.comparison
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('switches', '0060_alter_log_timestamp'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LogRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField(verbose_name='Start of the hour')),
+                (
+                    'type',
+                    models.PositiveSmallIntegerField(
+                        choices=[
+                            (0, 'View'),
+                            (1, 'Change'),
+                            (2, 'Warning'),
+                            (3, 'Error'),
+                            (4, 'Command'),
+                            (5, 'Login/out'),
+                        ],
+                        default=0,
+                    ),
+                ),
+                (
+                    'action',
+                    models.PositiveSmallIntegerField(
+                        choices=[
+                            (0, 'View Switch Groups'),
+                            (1, 'View Switch'),
+                            (2, 'View Interface'),
+                            (3, 'View PoE'),
+                            (4, 'View Vlans'),
+                            (5, 'View LLDP'),
+                            (6, 'Viewing All Logs'),
+                            (7, 'Viewing Site Statistics'),
+                            (8, 'Viewing Tasks'),
+                            (9, 'Viewing Task Details'),
+                            (10, 'Searching for Switch Name'),
+                            (11, 'Download Eth/Arp/LLDP'),
+                            (12, 'Download Interfaces'),
+                            (13, 'View Top Activity'),
+                            (90, 'Login'),
+                            (91, 'Logout'),
+                            (92, 'Inactivity Logout'),
+                            (93, 'Login Failed'),
+                            (94, 'LDAP Login'),
+                            (95, 'API Login'),
+                            (100, 'Reloading Switch Data'),
+                            (101, 'New System ObjectID Found'),
+                            (102, 'New System Name Found'),
+                            (103, 'Interface Disable'),
+                            (104, 'Interface Enable'),
+                            (105, 'Interface Toggle'),
+                            (106, 'Interface PoE Disable'),
+                            (107, 'Interface PoE Enable'),
+                            (108, 'Interface PoE Toggle'),
+                            (109, 'Interface PVID Vlan Change'),
+                            (110, 'Interface Description Change'),
+                            (111, 'Saving Configuration'),
+                            (112, 'Execute Command'),
+                            (113, 'Port PoE Fault'),
+                            (114, 'LDAP New SwitchGroup'),
+                            (115, 'Bulk Edit'),
+                            (116, 'Bulk Edit Task Submit'),
+                            (117, 'Bulk Edit Task Started'),
+                            (118, 'Bulk Edit Task Ended OK'),
+                            (119, 'Bulk Edit Task Ended With Errors'),
+                            (120, 'Task Deleted'),
+                            (121, 'Task Terminated'),
+                            (122, 'Email Sent'),
+                            (123, 'VLAN Add'),
+                            (124, 'VLAN Edit'),
+                            (125, 'VLAN Delete'),
+                            (256, 'Undefined Vlan'),
+                            (257, 'Vlan Name Mismatch'),
+                            (258, 'SNMP Error'),
+                            (126, 'LDAP User->SwitchGroup'),
+                            (259, 'LDAP User->SwitchGroup Error'),
+                            (260, 'LDAP Create SwitchGroup Error'),
+                            (264, 'LDAP Backend Error'),
+                            (261, 'Bulk Edit Job Start Error'),
+                            (262, 'Email Error'),
+                            (263, 'Connection Error'),
+                            (301, 'Napalm Driver'),
+                            (302, 'Napalm Open'),
+                            (303, 'Napalm Facts'),
+                            (304, 'Napalm Interfaces'),
+                            (305, 'Napalm Vlans'),
+                            (306, 'Napalm Interface IP'),
+                            (307, 'Napalm MAC'),
+                            (308, 'Napalm ARP'),
+                            (309, 'Napalm LLDP'),
+                            (321, 'AOS-Cx Error'),
+                            (400, 'Device Health'),
+                            (201, 'API Token Created'),
+                            (202, 'API Token Deleted'),
+                            (203, 'API Token Edited'),
+                            (509, 'Interface Not Found'),
+                            (510, 'Interface Access Denied'),
+                            (511, 'Generic Error'),
+                            (512, 'Access Denied'),
+                            (601, 'API Get Users'),
+                            (602, 'API New User'),
+                            (603, 'API Get User'),
+                            (604, 'API Edit User'),
+                            (606, 'API Get Switches'),
+                            (607, 'API New Switch'),
+                            (608, 'API Get Switch'),
+                            (609, 'API Edit Switch'),
+                            (611, 'API Get SwitchGroups'),
+                            (612, 'API New SwitchGroup'),
+                            (613, 'API Get SwitchGroup'),
+                            (614, 'API Edit SwitchGroup'),
+                            (616, 'API Get SnmpProfiles'),
+                            (617, 'API New SnmpProfile'),
+                            (618, 'API Get SnmpProfile'),
+                            (619, 'API Edit SnmpProfile'),
+                            (621, 'API Get NetmikoProfiles'),
+                            (622, 'API New NetmikoProfile'),
+                            (623, 'API Get NetmikoProfile'),
+                            (624, 'API Edit NetmikoProfile'),
+                        ],
+                        default=1,
+                    ),
+                ),
+                ('count', models.PositiveIntegerField(default=0)),
+                (
+                    'switch',
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='+',
+                        to='switches.switch',
+                    ),
+                ),
+                (
+                    'user',
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='+',
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                'verbose_name': 'Activity Log Rollup',
+                'verbose_name_plural': 'Activity Log Rollups',
+                'ordering': ['hour'],
+                'indexes': [models.Index(fields=['hour', 'type'], name='logrollup_hour_type_idx')],
+                'constraints': [
+                    models.UniqueConstraint(
+                        models.F('hour'),
+                        models.F('type'),
+                        models.F('action'),
+                        django.db.models.functions.comparison.Coalesce('switch', 0, output_field=models.IntegerField()),
+                        django.db.models.functions.comparison.Coalesce('user', 0, output_field=models.IntegerField()),
+                        name='logrollup_unique',
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.5 on 2026-10-19 14:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('switches', '0061_logrollup'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='log',
+            name='log_time_idx',
+        ),
+        migrations.AddIndex(
+            model_name='log',
+            index=models.Index(fields=['timestamp', 'id'], name='log_time_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='log',
+            index=models.Index(fields=['switch', 'timestamp', 'id'], name='log_switch_time_id_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.5 on 2026-10-19 16:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('switches', '0062_log_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='command',
+            name='cache_time',
+            field=models.PositiveIntegerField(
+                default=0,
+                help_text='Seconds the output of this command is cached per device, 0 = not cached. Only use this for read-only (show/display) commands!',
+                verbose_name='Cache time',
+            ),
+        ),
+    ]
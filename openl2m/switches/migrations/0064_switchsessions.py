@@ -0,0 +1,36 @@
+# Generated by Django 5.2.5 on 2026-10-19 18:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('switches', '0063_command_cache_time'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SwitchSessions',
+            fields=[
+                (
+                    'switch',
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name='+',
+                        serialize=False,
+                        to='switches.switch',
+                    ),
+                ),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('updated', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Device Sessions',
+                'verbose_name_plural': 'Device Sessions',
+            },
+        ),
+    ]
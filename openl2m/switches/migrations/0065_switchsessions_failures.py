@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-19 21:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('switches', '0064_switchsessions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='switchsessions',
+            name='failures',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
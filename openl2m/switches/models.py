@@ -12,14 +12,16 @@
 # License along with OpenL2M. If not, see <http://www.gnu.org/licenses/>.
 #
 import datetime
-import logging.handlers
 import json
+import time
 
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.conf import settings
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.core.exceptions import ValidationError
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.utils import timezone
 
 # local copy of django-ordered-model, with some fixes:
@@ -28,7 +30,10 @@ from ordered_model.models import OrderedModelManager, OrderedModel
 
 import switches.constants as constants
 from switches.connect.constants import NETMIKO_DEVICE_TYPES, NAPALM_DEVICE_TYPES
-from switches.utils import is_valid_hostname_or_ip, is_valid_hostname_or_ip6
+from switches.connect.health import device_health_as_string
+from switches.logbuffer import buffer_log, unbuffer_log, get_syslogger
+from switches.switchcounters import queue_switch_update
+from switches.utils import is_valid_hostname_or_ip, is_valid_hostname_or_ip6, get_switch_cache_key
 
 
 #
@@ -294,6 +299,12 @@ class Command(models.Model):
         verbose_name='Command',
         help_text='The command. Use %s for interface name',
     )
+    cache_time = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Cache time',
+        help_text='Seconds the output of this command is cached per device, 0 = not cached. '
+        'Only use this for read-only (show/display) commands!',
+    )
 
     class Meta:
         ordering = ['type', 'name', 'os']
@@ -984,28 +995,29 @@ class Switch(models.Model):
 
     def update_access(self):
         '''
-        Update the last accessed timestamp, and increment access counter
+        Update the last accessed timestamp, and increment access counter.
+        Only these two columns are written, at the end of the request, see switchcounters.py
+        Note the fields of this instance are not changed, so a later save() cannot overwrite the counters.
         '''
-        self.last_accessed = timezone.now()
-        self.access_count += 1
-        # call super.save(), instead of calling our own save (which sets modified as well!)
-        super(Switch, self).save()
+        queue_switch_update(self.id, "access_count", "last_accessed", timezone.now())
 
     def update_change(self):
         '''
-        Increment the change counter and update last_changed timestamp
+        Increment the change counter and update last_changed timestamp.
+        Only these two columns are written, at the end of the request, see switchcounters.py
         '''
-        self.change_count += 1
-        self.last_changed = timezone.now()
-        self.save()
+        queue_switch_update(self.id, "change_count", "last_changed", timezone.now())
+        # the device data shared between requests is now outdated, and so is any read in progress.
+        # Note the timeout only needs to be longer than the slowest device read:
+        cache.set(get_switch_cache_key(self.id, "changed"), time.time(), 3600)
+        cache.delete(get_switch_cache_key(self.id, "data"))
 
     def update_command(self):
         '''
-        Increment the command counter and update last_command_time timestamp
+        Increment the command counter and update last_command_time timestamp.
+        Only these two columns are written, at the end of the request, see switchcounters.py
         '''
-        self.command_count += 1
-        self.last_command_time = timezone.now()
-        self.save()
+        queue_switch_update(self.id, "command_count", "last_command_time", timezone.now())
 
     def display_name(self):
         """
@@ -1020,6 +1032,12 @@ class Switch(models.Model):
     def get_switchgroups(self):
         return ",".join([str(g) for g in self.switchgroups.all()])
 
+    # called from SwitchAdmin 'list_display' and 'readonly_fields':
+    def get_device_health(self):
+        return device_health_as_string(self.id)
+
+    get_device_health.short_description = "Device health"
+
     def is_valid_command_id(self, command_id, is_staff=False):
         """
         Verify that a command_id is actually valid(ie assigned) to this device.
@@ -1245,7 +1263,7 @@ class Log(models.Model):
         super().__init__(*args, **kwargs)
 
     timestamp = models.DateTimeField(
-        auto_now_add=True,  # set on save, do not allow changes in code.
+        editable=False,  # set on the first save(), do not allow changes in code.
         blank=True,
         null=True,
     )
@@ -1312,20 +1330,20 @@ class Log(models.Model):
                 # not found (should not happen!)
                 self.description = "Unknown action!"
 
-        # here is the actual work of saving:
+        # set the time when first saved. Note that auto_now_add would set it when written by bulk_create()!
+        if self.pk is None:
+            self.timestamp = timezone.now()
+
+        # here is the actual work of saving, unless this entry is buffered, see logbuffer.py.
         # see https://docs.djangoproject.com/en/2.2/topics/db/models/#overriding-predefined-model-methods
-        super().save(*args, **kwargs)
+        if args or kwargs or not buffer_log(self):
+            # if saved before as a buffered entry, it is now written here, and not again from the buffer:
+            unbuffer_log(self)
+            super().save(*args, **kwargs)
 
-        # if requested, also sent to Syslog host
+        # if requested, also sent to Syslog host, from a background thread:
         if settings.SYSLOG_HOST:
-            # we are defining a logger, and then check if it has a handler.
-            # each time you create a named logger, python will add handler to existing,
-            # even if you delete the object. this is a 'globally' defined logger in apps.py :
-            syslogger = logging.getLogger('log_to_syslog')
-            if not syslogger.hasHandlers():
-                handler = logging.handlers.SysLogHandler(address=(settings.SYSLOG_HOST, settings.SYSLOG_PORT))
-                syslogger.addHandler(handler)
-            syslogger.setLevel(logging.DEBUG)
+            syslogger = get_syslogger()
             if settings.SYSLOG_JSON:
                 syslogger.info(self.as_json())
             else:
@@ -1379,3 +1397,103 @@ class Log(models.Model):
     class Meta:
         ordering = ['timestamp']
         verbose_name_plural = 'Activity Logs'
+        # indexes for the device activity, usage statistics and top-activity queries,
+        # and the (timestamp, id) keyset pagination of the activity pages, see paginator.py:
+        indexes = [
+            models.Index(fields=['switch', 'type', 'timestamp'], name='log_switch_type_time_idx'),
+            models.Index(fields=['type', 'timestamp'], name='log_type_time_idx'),
+            models.Index(fields=['user', 'timestamp'], name='log_user_time_idx'),
+            models.Index(fields=['timestamp', 'id'], name='log_time_id_idx'),
+            models.Index(fields=['switch', 'timestamp', 'id'], name='log_switch_time_id_idx'),
+        ]
+
+
+class LogRollup(models.Model):
+    """
+    The hourly count of Log() entries, per type, action, device and user.
+    This is used for the usage statistics, so they do not depend on the size of the Log table.
+    See update_log_rollup() in stats.py, and the 'rolluplogs' command.
+    An hour without any Log() entries has a single entry with a count of 0, to mark it as done.
+    """
+
+    hour = models.DateTimeField(
+        verbose_name='Start of the hour',
+    )
+    type = models.PositiveSmallIntegerField(
+        choices=constants.LOG_TYPE_CHOICES,
+        default=constants.LOG_TYPE_VIEW,
+    )
+    action = models.PositiveSmallIntegerField(
+        choices=constants.LOG_ACTION_CHOICES,
+        default=constants.LOG_VIEW_SWITCH,
+    )
+    switch = models.ForeignKey(
+        to='Switch',
+        on_delete=models.CASCADE,
+        related_name='+',
+        blank=True,
+        null=True,
+    )
+    user = models.ForeignKey(
+        to=settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='+',
+        blank=True,
+        null=True,
+    )
+    count = models.PositiveIntegerField(
+        default=0,
+    )
+
+    def __str__(self):
+        return f"{self.hour}-{self.get_type_display()}-{self.get_action_display()}: {self.count}"
+
+    class Meta:
+        ordering = ['hour']
+        verbose_name = 'Activity Log Rollup'
+        verbose_name_plural = 'Activity Log Rollups'
+        indexes = [
+            models.Index(fields=['hour', 'type'], name='logrollup_hour_type_idx'),
+        ]
+        constraints = [
+            # each hour is counted only once. NULL values are never equal in an index, so use 0 for those:
+            models.UniqueConstraint(
+                'hour',
+                'type',
+                'action',
+                Coalesce('switch', 0, output_field=models.IntegerField()),
+                Coalesce('user', 0, output_field=models.IntegerField()),
+                name='logrollup_unique',
+            ),
+        ]
+
+
+class SwitchSessions(models.Model):
+    """
+    The number of active sessions to a device, and of consecutive failed connections, across all worker processes.
+    These are only changed with single UPDATE statements, which are atomic in the database,
+    see device_session_start(), device_session_end() and device_connect_failed() in connect/health.py
+    """
+
+    switch = models.OneToOneField(
+        to='Switch',
+        on_delete=models.CASCADE,
+        related_name='+',
+        primary_key=True,
+    )
+    count = models.PositiveIntegerField(
+        default=0,
+    )
+    updated = models.DateTimeField(
+        default=timezone.now,
+    )
+    failures = models.PositiveIntegerField(
+        default=0,
+    )
+
+    def __str__(self):
+        return f"{self.switch_id}: {self.count}"
+
+    class Meta:
+        verbose_name = 'Device Sessions'
+        verbose_name_plural = 'Device Sessions'
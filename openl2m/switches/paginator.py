@@ -0,0 +1,157 @@
+#
+# This file is part of Open Layer 2 Management (OpenL2M).
+#
+# OpenL2M is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License version 3 as published by
+# the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.  You should have received a copy of the GNU General Public
+# License along with OpenL2M. If not, see <http://www.gnu.org/licenses/>.
+#
+"""
+Keyset (a.k.a. cursor) pagination of Log() entries, newest first.
+
+Instead of an offset ("skip the first 25000 entries"), each page link contains the (timestamp, id)
+of the last entry shown, and the next page starts right after it. This uses the (timestamp, id)
+indexes on the Log table, so every page is equally fast, no matter how deep you page.
+"""
+import datetime
+
+from django.db.models import Q, QuerySet
+from django.http.request import HttpRequest
+
+# the url query parameters for the cursors:
+CURSOR_BEFORE = "before"  # show the entries older then this cursor
+CURSOR_AFTER = "after"  # show the entries newer then this cursor
+
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def make_cursor(log) -> str:
+    """
+    Create the page cursor for a Log() entry.
+
+    Args:
+        log (Log): the log entry.
+
+    Returns:
+        (str): the cursor, "<microseconds since epoch>_<id>"
+    """
+    delta = log.timestamp - EPOCH
+    microseconds = (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+    return f"{microseconds}_{log.id}"
+
+
+def parse_cursor(cursor: str) -> tuple:
+    """
+    Parse a page cursor, see make_cursor().
+
+    Args:
+        cursor (str): the cursor from the url.
+
+    Returns:
+        (tuple): (timestamp, id), or (None, None) if not a valid cursor.
+    """
+    try:
+        microseconds, log_id = cursor.split("_")
+        return EPOCH + datetime.timedelta(microseconds=int(microseconds)), int(log_id)
+    except (ValueError, OverflowError):
+        return None, None
+
+
+class KeysetPage:
+    """
+    One page of Log() entries. This has the page attributes used by the _paginator.html template.
+    """
+
+    def __init__(self, object_list: list, number: int, has_previous: bool, has_next: bool, per_page: int):
+        self.object_list = object_list
+        self.number = number
+        self._has_previous = has_previous
+        self._has_next = has_next
+        self.per_page = per_page
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_previous(self) -> bool:
+        return self._has_previous
+
+    def has_next(self) -> bool:
+        return self._has_next
+
+    def previous_page_number(self) -> int:
+        return self.number - 1
+
+    def next_page_number(self) -> int:
+        return self.number + 1
+
+    def previous_cursor(self) -> str:
+        """the cursor for the page with newer entries"""
+        return make_cursor(self.object_list[0]) if self.object_list else ""
+
+    def next_cursor(self) -> str:
+        """the cursor for the page with older entries"""
+        return make_cursor(self.object_list[-1]) if self.object_list else ""
+
+    def start_index(self) -> int:
+        return (self.number - 1) * self.per_page + 1 if self.object_list else 0
+
+    def end_index(self) -> int:
+        return (self.number - 1) * self.per_page + len(self.object_list)
+
+
+class KeysetPaginator:
+    """
+    Paginate a queryset of Log() entries on (timestamp, id), newest first.
+    """
+
+    def __init__(self, queryset: QuerySet, per_page: int):
+        self.queryset = queryset
+        self.per_page = per_page
+
+    def get_page(self, request: HttpRequest) -> KeysetPage:
+        """
+        Get the page requested by the cursor in the url. Without (valid) cursor, this returns the newest entries.
+
+        Args:
+            request (HttpRequest): the request with the 'page' number, and 'before' or 'after' cursor.
+
+        Returns:
+            (KeysetPage): the page of log entries.
+        """
+        try:
+            number = max(int(request.GET.get("page", 1)), 1)
+        except ValueError:
+            number = 1
+
+        timestamp, log_id = parse_cursor(request.GET.get(CURSOR_AFTER, ""))
+        if timestamp is not None:
+            # going back to newer entries: read in ascending order, and reverse.
+            entries = list(
+                self.queryset.filter(Q(timestamp__gt=timestamp) | Q(timestamp=timestamp, id__gt=log_id)).order_by(
+                    "timestamp", "id"
+                )[: self.per_page + 1]
+            )
+            has_previous = len(entries) > self.per_page
+            entries = entries[: self.per_page]
+            entries.reverse()
+            if not has_previous:
+                number = 1
+            return KeysetPage(entries, number, has_previous, True, self.per_page)
+
+        queryset = self.queryset
+        timestamp, log_id = parse_cursor(request.GET.get(CURSOR_BEFORE, ""))
+        if timestamp is not None:
+            queryset = queryset.filter(Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, id__lt=log_id))
+        else:
+            number = 1
+        entries = list(queryset.order_by("-timestamp", "-id")[: self.per_page + 1])
+        has_next = len(entries) > self.per_page
+        return KeysetPage(entries[: self.per_page], number, number > 1, has_next, self.per_page)
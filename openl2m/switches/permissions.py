@@ -15,6 +15,10 @@
 #
 # Functions that perform actions on interfaces, called by both the WEB UI and REST API
 #
+import time
+
+from django.conf import settings
+from django.core.cache import cache
 from django.http.request import HttpRequest
 
 from rest_framework import status as http_status
@@ -42,6 +46,23 @@ from switches.connect.connect import get_connection_object
 from switches.models import Log, Switch, SwitchGroup
 from switches.utils import dprint, get_remote_ip, get_from_http_session
 
+# the cache key of the version of the cached get_my_device_groups() results:
+PERMISSIONS_VERSION_KEY = "openl2m-permissions-version"
+# the Switch() fields used by get_my_device_groups(). Saving only other fields does not clear the cache:
+PERMISSIONS_SWITCH_FIELDS = {
+    "name",
+    "hostname",
+    "description",
+    "default_view",
+    "connector_type",
+    "read_only",
+    "primary_ip4",
+    "comments",
+    "nms_id",
+    "status",
+}
+
+
 # ###################################################
 # Permission functions, used by Web UI and REST API #
 #####################################################
@@ -51,6 +72,8 @@ def get_my_device_groups(request: HttpRequest) -> dict:
     """
     Find the SwitchGroup()s, and Switch()s in those groups, that this user has rights to.
     Returns a dictionary of groups and the devices in those groups.
+    The result is cached per user for settings.PERMISSIONS_CACHE_TIME seconds,
+    and cleared when groups, devices or group members change, see clear_permissions_cache().
 
     Args:
         request:  current HttpRequest() object
@@ -63,20 +86,34 @@ def get_my_device_groups(request: HttpRequest) -> dict:
         using the JSON Session Serializer (ie JSONSerializer)
     """
     dprint("get_my_device_groups()")
-    if request.user.is_superuser or request.user.is_staff:
+    is_admin = request.user.is_superuser or request.user.is_staff
+    # the device urls include the host name, so cache per host as well:
+    cache_key = (
+        f"openl2m-permissions-{cache.get(PERMISSIONS_VERSION_KEY, 0)}-{request.user.id}-{int(is_admin)}"
+        f"-{request.scheme}-{request.get_host()}"
+    )
+    if settings.PERMISSIONS_CACHE_TIME:
+        permissions = cache.get(cache_key)
+        if permissions is not None:
+            dprint("  Found in cache!")
+            return permissions
+
+    # get the groups, and all their devices, in two queries:
+    if is_admin:
         dprint("  Superuser or Staff!")
-        # optimize data queries, get all related field at once!
-        groups = SwitchGroup.objects.all().order_by("name")
+        groups = SwitchGroup.objects.all()
     else:
         # figure out what this user has access to.
         # Note we use the ManyToMany 'related_name' attribute for readability!
         dprint("  Regular user.")
-        groups = request.user.switchgroups.all().order_by("name")
+        groups = request.user.switchgroups.all()
+    groups = groups.order_by("name").prefetch_related("switches")
 
     # now find active devices in these groups
     permissions = {}
     for group in groups:
-        if group.switches.count():
+        switches = group.switches.all()  # from the prefetch, no query!
+        if switches:
             # set this group, and the switches, in web session to track permissions
             group_info = {
                 'name': group.name,
@@ -86,7 +123,7 @@ def get_my_device_groups(request: HttpRequest) -> dict:
                 'comments': group.comments,
             }
             members = {}
-            for switch in group.switches.all():
+            for switch in switches:
                 if switch.status == SWITCH_STATUS_ACTIVE:
                     # we save the names as well, so we can search them!
                     members[str(switch.id)] = {
@@ -112,9 +149,29 @@ def get_my_device_groups(request: HttpRequest) -> dict:
                         members[str(switch.id)]["nms_id"] = ""
             group_info['members'] = members
             permissions[str(group.id)] = group_info
+    if settings.PERMISSIONS_CACHE_TIME:
+        cache.set(cache_key, permissions, settings.PERMISSIONS_CACHE_TIME)
     return permissions
 
 
+def clear_permissions_cache(sender, **kwargs):
+    """
+    Receiver for the Switch(), SwitchGroup() and group membership change signals, see apps.py.
+    This makes the cached results of get_my_device_groups() of all users outdated,
+    by changing the version that is part of the cache key.
+    """
+    update_fields = kwargs.get('update_fields', None)
+    if sender is Switch and update_fields and not PERMISSIONS_SWITCH_FIELDS.intersection(update_fields):
+        # e.g. the access counters, nothing to clear
+        return
+    dprint(f"clear_permissions_cache() from {sender}")
+    try:
+        cache.incr(PERMISSIONS_VERSION_KEY)
+    except ValueError:
+        # not set yet (or expired):
+        cache.set(PERMISSIONS_VERSION_KEY, int(time.time()), None)
+
+
 def get_group_and_switch(request: HttpRequest, group_id: int, switch_id: int) -> tuple[SwitchGroup, Switch]:
     """
     Get the Group() and Switch() if the current user has rights.
@@ -24,7 +24,9 @@ import time
 import distro
 import django
 from django.conf import settings
-from django.db import connection as db_connection, ProgrammingError
+from django.core.cache import cache
+from django.db import connection as db_connection, ProgrammingError, transaction
+from django.db.models import Count, Max, Sum
 from django.utils import timezone
 import git
 
@@ -48,6 +50,7 @@ from switches.models import (
     Switch,
     SwitchGroup,
     Log,
+    LogRollup,
 )
 
 from users.models import Token
@@ -223,86 +226,154 @@ def get_database_info() -> dict:
     return db_items
 
 
+# the number of days of hourly Log() counts to keep in the LogRollup table:
+LOG_ROLLUP_DAYS = 32
+# the maximum number of hours the stats page adds to the LogRollup table. Any older hours not yet added
+# are counted from the Log table, until the 'rolluplogs' command has added them:
+LOG_ROLLUP_PAGE_HOURS = 24
+
+
+def update_log_rollup(max_hours: int = 0) -> datetime.datetime:
+    """Add the hourly counts of the Log() entries to the LogRollup table, for all complete hours not yet added,
+    and remove the counts older than LOG_ROLLUP_DAYS. This is called from the stats page,
+    and from the 'rolluplogs' command, which can be run periodically to keep the stats page fast.
+
+    Args:
+        max_hours (int): if set, add at most this many hours, and leave the rest for the next call.
+
+    Returns:
+        (datetime): the end of the newest hour in the LogRollup table.
+            Newer Log() entries need to be counted from the Log table.
+    """
+    now = timezone.now()
+    # allow time for buffered log entries to be written, see logbuffer.py:
+    until = (now - datetime.timedelta(seconds=settings.LOG_BUFFER_INTERVAL + 60)).replace(
+        minute=0, second=0, microsecond=0
+    )
+    oldest = (now - datetime.timedelta(days=LOG_ROLLUP_DAYS)).replace(minute=0, second=0, microsecond=0)
+
+    # only one process updates the rollup at a time:
+    lock_key = "openl2m-log-rollup-lock"
+    if not cache.add(lock_key, True, timeout=3600):
+        latest = LogRollup.objects.aggregate(Max('hour'))['hour__max']
+        return latest + datetime.timedelta(hours=1) if latest else oldest
+    try:
+        latest = LogRollup.objects.aggregate(Max('hour'))['hour__max']
+        # if not updated for a long time, skip the hours that would be removed below:
+        hour = max(latest + datetime.timedelta(hours=1), oldest) if latest else oldest
+        if max_hours:
+            until = min(until, hour + datetime.timedelta(hours=max_hours))
+        while hour < until:
+            next_hour = hour + datetime.timedelta(hours=1)
+            records = (
+                Log.objects.filter(timestamp__gte=hour, timestamp__lt=next_hour)
+                .values('type', 'action', 'switch_id', 'user_id')
+                .annotate(count=Count('id'))
+                .order_by()
+            )
+            rollups = [
+                LogRollup(
+                    hour=hour,
+                    type=record['type'],
+                    action=record['action'],
+                    switch_id=record['switch_id'],
+                    user_id=record['user_id'],
+                    count=record['count'],
+                )
+                for record in records
+            ]
+            if not rollups:
+                # mark this hour as done:
+                rollups.append(LogRollup(hour=hour, count=0))
+            # the unique constraint makes sure an hour is only added once, even without the lock above:
+            with transaction.atomic():
+                LogRollup.objects.bulk_create(rollups, ignore_conflicts=True)
+            hour = next_hour
+        LogRollup.objects.filter(hour__lt=oldest).delete()
+    finally:
+        cache.delete(lock_key)
+    return hour
+
+
+def count_activity(since: datetime.datetime, rollup_until: datetime.datetime, distinct: str = "", **filters) -> int:
+    """Count the Log() entries since a point in time, that match the filters.
+    If 'since' is at the start of an hour, the hours until 'rollup_until' are counted from the LogRollup table,
+    and only the newer entries are counted from the Log table.
+
+    Args:
+        since (datetime): the start time to count from.
+        rollup_until (datetime): the end of the LogRollup data, see update_log_rollup().
+        distinct (str): if set, count the distinct values of this field, e.g. 'user_id'
+        filters: the filter values, using fields that exist in both Log and LogRollup.
+
+    Returns:
+        (int): the count.
+    """
+    # the rollup hours are in UTC, so this also works for timezones with a partial-hour offset:
+    utc_since = since.astimezone(datetime.timezone.utc)
+    if utc_since.minute or utc_since.second or utc_since.microsecond or since >= rollup_until:
+        logs = Log.objects.filter(timestamp__gte=since, **filters)
+        if distinct:
+            return logs.values_list(distinct, flat=True).distinct().count()
+        return logs.count()
+
+    rollups = LogRollup.objects.filter(hour__gte=since, hour__lt=rollup_until, count__gt=0, **filters)
+    logs = Log.objects.filter(timestamp__gte=rollup_until, **filters)
+    if distinct:
+        values = set(rollups.values_list(distinct, flat=True).distinct())
+        values.update(logs.values_list(distinct, flat=True).distinct())
+        return len(values)
+    return (rollups.aggregate(Sum('count'))['count__sum'] or 0) + logs.count()
+
+
 def get_usage_info() -> dict:
     '''Get OpenL2M application usage, and return as a dict().'''
     usage = {}  # usage statistics
 
+    rollup_until = update_log_rollup(max_hours=LOG_ROLLUP_PAGE_HOURS)
     one_hour_ago = timezone.now() - datetime.timedelta(hours=1)
+    today = timezone.make_aware(datetime.datetime.combine(timezone.localdate(), datetime.time()))
+    seven_days_ago = today - datetime.timedelta(days=7)
+    thirtyone_days_ago = today - datetime.timedelta(days=31)
 
     # Devices accessed:
-    filter_values = {
+    device_filter = {
         "type__in": [LOG_TYPE_VIEW, LOG_TYPE_CHANGE],
         "switch_id__isnull": False,
-        "timestamp__gte": one_hour_ago,
     }
     usage["devices_last_hour"] = {
         "label": "Devices in last hour",
-        "value": Log.objects.filter(**filter_values).values_list('switch_id', flat=True).distinct().count(),
-    }
-
-    filter_values = {
-        "type__in": [LOG_TYPE_VIEW, LOG_TYPE_CHANGE],
-        "switch_id__isnull": False,
-        "timestamp__date": datetime.date.today(),
+        "value": count_activity(one_hour_ago, rollup_until, distinct='switch_id', **device_filter),
     }
     usage["devices_today"] = {
         "label": "Devices today",
-        "value": Log.objects.filter(**filter_values).values_list('switch_id', flat=True).distinct().count(),
-    }
-
-    filter_values = {
-        "timestamp__gte": timezone.now().date() - datetime.timedelta(days=7),
-        "switch_id__isnull": False,
+        "value": count_activity(today, rollup_until, distinct='switch_id', **device_filter),
     }
     usage["devices_last_7_days"] = {
         "label": "Devices last 7 days",
-        "value": Log.objects.filter(**filter_values).values_list('switch_id', flat=True).distinct().count(),
-    }
-
-    filter_values = {
-        "timestamp__gte": timezone.now().date() - datetime.timedelta(days=31),
-        "switch_id__isnull": False,
+        "value": count_activity(seven_days_ago, rollup_until, distinct='switch_id', switch_id__isnull=False),
     }
     usage["devices_last_31_days"] = {
         "label": "Devices Last 31 Days",
-        "value": Log.objects.filter(**filter_values).values_list('switch_id', flat=True).distinct().count(),
+        "value": count_activity(thirtyone_days_ago, rollup_until, distinct='switch_id', switch_id__isnull=False),
     }
 
     # Changes made
-    filter_values = {
-        'type': int(LOG_TYPE_CHANGE),
-        'timestamp__gte': one_hour_ago,
-    }
     usage["changes_last_hour"] = {
         "label": "Changes in last hour",
-        "value": Log.objects.filter(**filter_values).count(),
-    }
-
-    filter_values = {
-        'type': int(LOG_TYPE_CHANGE),
-        'timestamp__date': datetime.date.today(),
+        "value": count_activity(one_hour_ago, rollup_until, type=LOG_TYPE_CHANGE),
     }
     usage["changes_today"] = {
         "label": "Changes today",
-        "value": Log.objects.filter(**filter_values).count(),
-    }
-
-    filter_values = {
-        "type": int(LOG_TYPE_CHANGE),
-        "timestamp__gte": timezone.now().date() - datetime.timedelta(days=7),
+        "value": count_activity(today, rollup_until, type=LOG_TYPE_CHANGE),
     }
     usage["changes_last_7_days"] = {
         "label": "Changes last 7 days",
-        "value": Log.objects.filter(**filter_values).count(),
-    }
-
-    filter_values = {
-        "type": int(LOG_TYPE_CHANGE),
-        "timestamp__gte": timezone.now().date() - datetime.timedelta(days=31),
+        "value": count_activity(seven_days_ago, rollup_until, type=LOG_TYPE_CHANGE),
     }
     usage["changes_last_31_days"] = {
         "label": "Changes last 31 days",
-        "value": Log.objects.filter(**filter_values).count(),
+        "value": count_activity(thirtyone_days_ago, rollup_until, type=LOG_TYPE_CHANGE),
     }
 
     # the total change count since install from Counter()'changes') object:
@@ -312,96 +383,53 @@ def get_usage_info() -> dict:
     }
 
     # Unique Logins
-    filter_values = {
-        'type': int(LOG_TYPE_LOGIN_OUT),
-        'timestamp__gte': one_hour_ago,
-    }
     usage["users_last_hour"] = {
         "label": "Users in last hour",
-        "value": Log.objects.filter(**filter_values).values_list('user_id', flat=True).distinct().count(),
-    }
-
-    filter_values = {
-        'type': int(LOG_TYPE_LOGIN_OUT),
-        'timestamp__date': datetime.date.today(),
+        "value": count_activity(one_hour_ago, rollup_until, distinct='user_id', type=LOG_TYPE_LOGIN_OUT),
     }
     usage["users_today"] = {
         "label": "Users today",
-        "value": Log.objects.filter(**filter_values).values_list('user_id', flat=True).distinct().count(),
-    }
-
-    filter_values = {
-        'type': int(LOG_TYPE_LOGIN_OUT),
-        'timestamp__gte': timezone.now().date() - datetime.timedelta(days=7),
+        "value": count_activity(today, rollup_until, distinct='user_id', type=LOG_TYPE_LOGIN_OUT),
     }
     usage["users_last_7_days"] = {
         "label": "Users last 7 days",
-        "value": Log.objects.filter(**filter_values).values_list('user_id', flat=True).distinct().count(),
-    }
-
-    filter_values = {
-        'type': int(LOG_TYPE_LOGIN_OUT),
-        'timestamp__gte': timezone.now().date() - datetime.timedelta(days=31),
+        "value": count_activity(seven_days_ago, rollup_until, distinct='user_id', type=LOG_TYPE_LOGIN_OUT),
     }
     usage["users_last_31_days"] = {
         "label": "Users last 31 days",
-        "value": Log.objects.filter(**filter_values).values_list('user_id', flat=True).distinct().count(),
+        "value": count_activity(thirtyone_days_ago, rollup_until, distinct='user_id', type=LOG_TYPE_LOGIN_OUT),
     }
 
     # API requests:
-    filter_values = {
-        'type': int(LOG_TYPE_LOGIN_OUT),
-        'action': int(LOG_LOGIN_REST_API),
-        'timestamp__date': datetime.date.today(),
+    api_filter = {
+        "type": LOG_TYPE_LOGIN_OUT,
+        "action": LOG_LOGIN_REST_API,
     }
     usage["api_calls_today"] = {
         "label": "API calls today",
-        "value": Log.objects.filter(**filter_values).count(),
-    }
-
-    filter_values = {
-        "type": int(LOG_TYPE_LOGIN_OUT),
-        "action": int(LOG_LOGIN_REST_API),
-        "timestamp__gte": timezone.now().date() - datetime.timedelta(days=7),
+        "value": count_activity(today, rollup_until, **api_filter),
     }
     usage["api_calls_last_7_days"] = {
         "label": "API calls last 7 days",
-        "value": Log.objects.filter(**filter_values).count(),
-    }
-
-    filter_values = {
-        "type": int(LOG_TYPE_LOGIN_OUT),
-        "action": int(LOG_LOGIN_REST_API),
-        "timestamp__gte": timezone.now().date() - datetime.timedelta(days=31),
+        "value": count_activity(seven_days_ago, rollup_until, **api_filter),
     }
     usage["api_calls_last_31_days"] = {
         "label": "API calls last 31 days",
-        "value": Log.objects.filter(**filter_values).count(),
+        "value": count_activity(thirtyone_days_ago, rollup_until, **api_filter),
     }
 
     # Commands run:
-    filter_values = {"type": int(LOG_TYPE_COMMAND), "timestamp__date": datetime.date.today()}
     usage["commands_today"] = {
         "label": "Commands today",
-        "value": Log.objects.filter(**filter_values).count(),
-    }
-
-    filter_values = {
-        "type": int(LOG_TYPE_COMMAND),
-        "timestamp__gte": timezone.now().date() - datetime.timedelta(days=7),
+        "value": count_activity(today, rollup_until, type=LOG_TYPE_COMMAND),
     }
     usage["commands_last_7_days"] = {
         "label": "Commands last 7 days",
-        "value": Log.objects.filter(**filter_values).count(),
-    }
-
-    filter_values = {
-        "type": int(LOG_TYPE_COMMAND),
-        "timestamp__gte": timezone.now().date() - datetime.timedelta(days=31),
+        "value": count_activity(seven_days_ago, rollup_until, type=LOG_TYPE_COMMAND),
     }
     usage["commands_last_31_days"] = {
         "label": "Commands last 31 days",
-        "value": Log.objects.filter(**filter_values).count(),
+        "value": count_activity(thirtyone_days_ago, rollup_until, type=LOG_TYPE_COMMAND),
     }
 
     # total number of commands run:
@@ -413,92 +441,68 @@ def get_usage_info() -> dict:
     return usage
 
 
-def get_top_n_from_dict_on_count(data: dict) -> dict:
-    """Return the TOP_N from the dcitionary with value, based on the 'count' attribute.
+def get_top_activity(name: str, filter_values: dict, key_field: str, name_field: str) -> dict:
+    """Return the TOP_ACTIVITY entries of the Log() entries grouped by a field, with the highest counts.
+    The counting is done in the database, and the result is cached for TOP_ACTIVITY_CACHE_TIME seconds.
 
     Args:
-    data (dict): a dictionary of dictionaries containing at least the 'count' attrbute.
+        name (str): a name for this query, used in the cache key.
+        filter_values (dict): the filter to apply to the Log() entries.
+        key_field (str): the field to group and count by, e.g. 'switch_id'
+        name_field (str): the field with the name to show, e.g. 'switch__name'
 
     Returns:
-        (dict): the TOP-N (ie sorted) entries of the data (input) argument.
-
+        (dict): the TOP-N (ie sorted) entries, key is the key_field value, value is a dict with 'name' and 'count'.
     """
-    # sort by descending order:
-    data_sorted = dict(sorted(data.items(), key=lambda x: x[1]["count"], reverse=True))
-    # # and limit to TOP-N:
+    cache_key = f"openl2m-top-{name}"
+    top_data = cache.get(cache_key)
+    if top_data is not None:
+        return top_data
+    records = (
+        Log.objects.filter(**filter_values)
+        .exclude(**{f"{key_field}__isnull": True})
+        .values(key_field, name_field)
+        .annotate(count=Count('id'))
+        .order_by('-count')[: settings.TOP_ACTIVITY]
+    )
     top_data = {}
-    num = 0
-    for key, val in data_sorted.items():
-        top_data[key] = val
-        num += 1
-        if num == settings.TOP_ACTIVITY:
-            break
+    for record in records:
+        top_data[record[key_field]] = {
+            'name': record[name_field],
+            'count': record['count'],
+        }
+    cache.set(cache_key, top_data, timeout=settings.TOP_ACTIVITY_CACHE_TIME)
     return top_data
 
 
 def get_top_changed_devices() -> dict:
     """Return a dict with the most active (changed) devices over the last TOP_ACTIVITY_DAYS"""
-    devices = {}
     filter_values = {
         "type": int(LOG_TYPE_CHANGE),
         "timestamp__gte": timezone.now().date() - datetime.timedelta(days=settings.TOP_ACTIVITY_DAYS),
     }
-    # records = Log.objects.filter(**filter_values).values_list('switch_id', flat=True)
-    logs = Log.objects.filter(**filter_values)
-    # there is probably a better way to do this with a filter above, but this works also:
-    for log in logs:
-        if log.switch is not None:
-            if log.switch.id not in devices:
-                devices[log.switch.id] = {
-                    'name': log.switch.name,
-                    'count': 1,
-                }
-            else:
-                devices[log.switch.id]["count"] += 1
-
-    return get_top_n_from_dict_on_count(devices)
+    return get_top_activity(
+        name="changed-devices", filter_values=filter_values, key_field='switch_id', name_field='switch__name'
+    )
 
 
 def get_top_viewed_devices() -> dict:
     """Return a dict with the most viewed devices over the last TOP_ACTIVITY_DAYS"""
-    devices = {}
     filter_values = {
         "type": int(LOG_TYPE_VIEW),
         "timestamp__gte": timezone.now().date() - datetime.timedelta(days=settings.TOP_ACTIVITY_DAYS),
     }
-    # records = Log.objects.filter(**filter_values).values_list('switch_id', flat=True)
-    logs = Log.objects.filter(**filter_values)
-    # there is probably a better way to do this with a filter above, but this works also:
-    for log in logs:
-        if log.switch is not None:
-            if log.switch.id not in devices:
-                devices[log.switch.id] = {
-                    'name': log.switch.name,
-                    'count': 1,
-                }
-            else:
-                devices[log.switch.id]["count"] += 1
-
-    return get_top_n_from_dict_on_count(devices)
+    return get_top_activity(
+        name="viewed-devices", filter_values=filter_values, key_field='switch_id', name_field='switch__name'
+    )
 
 
 def get_top_active_users() -> dict:
     """Return a dict with the most active users, based on views or changes, over the last TOP_ACTIVITY_DAYS"""
-    users = {}
     filter_values = {
         "type__in": [LOG_TYPE_VIEW, LOG_TYPE_CHANGE],
         "timestamp__gte": timezone.now().date() - datetime.timedelta(days=settings.TOP_ACTIVITY_DAYS),
     }
-    logs = Log.objects.filter(**filter_values)
-    # there is probably a better way to do this with a filter above, but this works also:
-    for log in logs:
-        if log.user is not None:
-            if log.user.id not in users:
-                users[log.user.id] = {
-                    'name': log.user.username,
-                    'count': 1,
-                }
-            else:
-                users[log.user.id]["count"] += 1
-
-    return get_top_n_from_dict_on_count(users)
+    return get_top_activity(
+        name="active-users", filter_values=filter_values, key_field='user_id', name_field='user__username'
+    )
@@ -0,0 +1,92 @@
+#
+# This file is part of Open Layer 2 Management (OpenL2M).
+#
+# OpenL2M is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License version 3 as published by
+# the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.  You should have received a copy of the GNU General Public
+# License along with OpenL2M. If not, see <http://www.gnu.org/licenses/>.
+#
+"""
+Coalesced updates of the Switch() access, change and command counters and timestamps.
+
+Switch.update_access(), update_change() and update_command() only record the increment here.
+At the end of the request, all increments for a device are written in a single
+"UPDATE ... SET change_count = change_count + n, last_changed = ..." statement,
+so a bulk edit of many interfaces results in one database write.
+Only the counter and timestamp columns are written, not the full row.
+"""
+import atexit
+import logging
+import threading
+
+from django.db.models import F
+
+from switches.utils import dprint
+
+_pending = {}  # switch id -> {"counts": {field: increment}, "times": {field: timestamp}}
+_pending_lock = threading.Lock()
+
+logger = logging.getLogger(__name__)
+
+
+def queue_switch_update(switch_id: int, count_field: str, time_field: str, timestamp):
+    """
+    Record a counter increment, and the new timestamp, for a device.
+
+    Args:
+        switch_id (int): the Switch().id of the device.
+        count_field (str): the name of the counter field to increment.
+        time_field (str): the name of the timestamp field to set.
+        timestamp (datetime): the new value of the timestamp field.
+
+    Returns:
+        none
+    """
+    with _pending_lock:
+        pending = _pending.setdefault(switch_id, {"counts": {}, "times": {}})
+        pending["counts"][count_field] = pending["counts"].get(count_field, 0) + 1
+        pending["times"][time_field] = timestamp
+
+
+def flush_switch_updates():
+    """
+    Write all pending counter increments and timestamps to the database, one UPDATE per device.
+
+    Args:
+        none
+
+    Returns:
+        none
+    """
+    with _pending_lock:
+        updates = dict(_pending)
+        _pending.clear()
+    if not updates:
+        return
+    # avoid circular import:
+    from switches.models import Switch
+
+    for switch_id, pending in updates.items():
+        values = {field: F(field) + count for field, count in pending["counts"].items()}
+        values.update(pending["times"])
+        dprint(f"flush_switch_updates(): switch {switch_id}: {values}")
+        try:
+            Switch.objects.filter(pk=switch_id).update(**values)
+        except Exception as err:
+            logger.error(f"Error updating counters for switch {switch_id}: {err}")
+
+
+def flush_switch_updates_at_request_end(sender, **kwargs):
+    """
+    Receiver for the 'request_finished' signal, see apps.py. This runs after the response was sent.
+    """
+    flush_switch_updates()
+
+
+# do not lose pending updates when the worker process exits:
+atexit.register(flush_switch_updates)
@@ -11,7 +11,92 @@
 # more details.  You should have received a copy of the GNU General Public
 # License along with OpenL2M. If not, see <http://www.gnu.org/licenses/>.
 #
-# commented out to quiet down flake8
-# from django.test import TestCase
+import datetime
+import unittest
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+
+from switches.constants import (
+    LOG_TYPE_VIEW,
+    LOG_TYPE_CHANGE,
+    LOG_TYPE_COMMAND,
+    LOG_VIEW_SWITCH,
+    LOG_CHANGE_INTERFACE_ALIAS,
+    LOG_EXECUTE_COMMAND,
+)
+from switches.models import Log, Switch
+
+# the number of Log() entries to seed the table with:
+LOG_SEED_COUNT = 20000
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', "query plans are checked on PostgreSQL only")
+class LogIndexTests(TestCase):
+    """
+    Check that the activity and statistics queries on the Log table use the indexes
+    added in migrations 0059 and 0062, and do not scan the whole table.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username="log-index-test")
+        cls.switches = [Switch.objects.create(name=f"log-index-test-{i}") for i in range(20)]
+        now = timezone.now()
+        logs = []
+        for i in range(LOG_SEED_COUNT):
+            # mostly views, with some changes and commands, spread over 30 days:
+            if i % 10 == 0:
+                log_type, action = LOG_TYPE_CHANGE, LOG_CHANGE_INTERFACE_ALIAS
+            elif i % 25 == 0:
+                log_type, action = LOG_TYPE_COMMAND, LOG_EXECUTE_COMMAND
+            else:
+                log_type, action = LOG_TYPE_VIEW, LOG_VIEW_SWITCH
+            logs.append(
+                Log(
+                    timestamp=now - datetime.timedelta(minutes=i * 2),
+                    user=cls.user if i % 50 == 0 else None,
+                    switch=cls.switches[i % len(cls.switches)],
+                    type=log_type,
+                    action=action,
+                    description="test entry",
+                )
+            )
+        # bulk_create() does not use the log buffer, see Log.save()
+        Log.objects.bulk_create(logs, batch_size=5000)
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {Log._meta.db_table}")
+
+    def setUp(self):
+        # the test table is small, make sure the planner only falls back to a full scan if there is no index:
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+
+    def assertUsesIndex(self, queryset, index_regex: str):
+        plan = queryset.explain()
+        self.assertNotIn("Seq Scan", plan)
+        self.assertRegex(plan, index_regex)
+
+    def test_switch_activity(self):
+        # the recent device activity shown in switch_view():
+        logs = Log.objects.filter(switch=self.switches[0], type__gt=LOG_TYPE_VIEW).order_by('-timestamp')
+        self.assertUsesIndex(logs, r"log_switch_(type_time|time_id)_idx")
+
+    def test_type_counts(self):
+        # the change, command, etc. counts on the statistics page:
+        since = timezone.now() - datetime.timedelta(days=1)
+        logs = Log.objects.filter(type=LOG_TYPE_CHANGE, timestamp__gte=since)
+        self.assertUsesIndex(logs, r"log_type_time_idx")
+
+    def test_user_activity(self):
+        since = timezone.now() - datetime.timedelta(days=7)
+        logs = Log.objects.filter(user=self.user, timestamp__gte=since)
+        self.assertUsesIndex(logs, r"log_user_time_idx")
+
+    def test_recent_activity(self):
+        # the activity listings, ordered by time, and paged with the (timestamp, id) keyset:
+        since = timezone.now() - datetime.timedelta(hours=1)
+        logs = Log.objects.filter(timestamp__gte=since).order_by('-timestamp', '-id')
+        self.assertUsesIndex(logs, r"log_time_id_idx")
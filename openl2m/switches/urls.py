@@ -92,6 +92,11 @@ urlpatterns = [
         views.SwitchCmdOutput.as_view(),
         name='switch_cmd_output',
     ),
+    path(
+        '<int:group_id>/<int:switch_id>/command/stream/<str:token>/',
+        views.SwitchCmdStream.as_view(),
+        name='switch_cmd_stream',
+    ),
     path(
         '<int:group_id>/<int:switch_id>/command_template/',
         views.SwitchCmdTemplateOutput.as_view(),
@@ -102,6 +107,11 @@ urlpatterns = [
         views.SwitchDetails.as_view(),
         name='switch_arp_lldp',
     ),
+    path(
+        '<int:group_id>/<int:switch_id>/info/',
+        views.SwitchInfo.as_view(),
+        name='switch_info',
+    ),
     path(
         '<int:group_id>/<int:switch_id>/reload/<str:view>/',
         views.SwitchReload.as_view(),
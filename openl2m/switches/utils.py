@@ -194,6 +194,20 @@ def dvar(var, header: str = ""):
                     logger_console.debug(pprint.pformat(attrib))
 
 
+def get_switch_cache_key(switch_id: int, name: str) -> str:
+    """
+    Return the key used to store switch-related data in the shared (Django) cache.
+
+    Params:
+        switch_id (int): the pk of the Switch()
+        name (str): the name of the data item.
+
+    Returns:
+        (str): the cache key.
+    """
+    return f"openl2m-switch-{switch_id}-{name}"
+
+
 def time_duration(seconds: int) -> str:
     """
     show a nice string with the time duration from the seconds given
@@ -11,17 +11,18 @@
 # more details.  You should have received a copy of the GNU General Public
 # License along with OpenL2M. If not, see <http://www.gnu.org/licenses/>.
 #
+import secrets
 import time
 import traceback
 import re
 
 from django.conf import settings
+from django.core.cache import cache
 from django.shortcuts import get_object_or_404, render
 from django.contrib.auth.models import User
-from django.http import FileResponse
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
 from django.urls import reverse
 from django.utils.html import mark_safe
-from django.core.paginator import Paginator
 from django.shortcuts import redirect
 from django.template import Template, Context
 from django.contrib import messages
@@ -90,14 +91,16 @@ from switches.constants import (
     INTERFACE_STATUS_DOWN,
     INTERFACE_STATUS_UP,
 )
-from switches.connect.connector import clear_switch_cache
+from switches.connect.connector import clear_switch_cache, clear_shared_switch_cache
 from switches.connect.connect import get_connection_object
+from switches.connect.health import get_device_health_states
 from switches.connect.constants import (
     POE_PORT_ADMIN_ENABLED,
     POE_PORT_ADMIN_DISABLED,
 )
 from switches.download import create_eth_neighbor_xls_file, create_interfaces_xls_file
 from switches.myview import MyView
+from switches.paginator import KeysetPaginator
 from switches.permissions import get_group_and_switch, get_connection_if_permitted, get_my_device_groups
 
 from switches.stats import (
@@ -123,6 +126,7 @@ from switches.utils import (
     string_contains_regex,
     string_matches_regex,
     get_choice_name,
+    get_switch_cache_key,
 )
 
 from users.utils import user_can_bulkedit, user_can_edit_vlans, get_current_users
@@ -138,6 +142,9 @@ from counters.constants import (
 )
 from notices.models import Notice
 
+# seconds the browser has to start streaming the output of a command, see start_command_stream():
+COMMAND_STREAM_START_TIME = 60
+
 
 def close_device(request):
     """Close out any session left over from the previous device user was looking at
@@ -205,6 +212,12 @@ class Switches(LoginRequiredMixin, View):
         groups = get_my_device_groups(request=request)
         save_to_http_session(request, "permissions", groups)
 
+        # get the devices that are currently unreachable:
+        switch_ids = set()
+        for group in groups.values():
+            switch_ids.update(group['members'].keys())
+        device_health = get_device_health_states(switch_ids)
+
         # log my activity
         log = Log(
             user=request.user,
@@ -239,6 +252,7 @@ class Switches(LoginRequiredMixin, View):
                 "group_count": len(groups),
                 "col_width": col_width,
                 "max_columns": max_columns,
+                "device_health": device_health,
             },
         )
 
@@ -377,6 +391,55 @@ class SwitchDetails(LoginRequiredMixin, MyView):
         return switch_view(request=request, group_id=group_id, switch_id=switch_id, view="arp_lldp")
 
 
+class SwitchInfo(LoginRequiredMixin, View):
+    """
+    The contents of the device Information tab, i.e. with hardware details, device health and VRFs.
+    This is requested by the browser when the tab is opened, unless settings.DEVICE_INFO_EAGER is set.
+    """
+
+    def get(
+        self,
+        request,
+        group_id,
+        switch_id,
+    ):
+        dprint("SwitchInfo() - GET called")
+        group, switch = get_group_and_switch(request=request, group_id=group_id, switch_id=switch_id)
+        conn, error = get_connection_if_permitted(request=request, group=group, switch=switch)
+        if not conn:
+            return HttpResponse(error.description, status=error.code if error.code >= 400 else 500)
+
+        try:
+            # this is normally loaded from the session cache:
+            if not conn.get_basic_info():
+                return HttpResponse(conn.error.description, status=500)
+            warning_count = len(conn.warnings)
+            device_info_read = conn.get_device_info()
+        except Exception as e:
+            dprint(f"CAUGHT UNTRAPPED ERROR in get_device_info(): {repr(e)}\n{traceback.format_exc()}")
+            return HttpResponse(f"Error reading device information: {repr(e)}", status=500)
+        conn.save_cache()
+
+        if not device_info_read:
+            # the tab would show the loading message again, so return the reason as an error to the browser:
+            warnings = conn.warnings[warning_count:]
+            return HttpResponse(
+                "\n".join(warnings) if warnings else "the device could not be read!",
+                status=503,
+                content_type="text/plain",
+            )
+
+        return render(
+            request,
+            "_tab_info.html",
+            {
+                "group": group,
+                "switch": switch,
+                "connection": conn,
+            },
+        )
+
+
 def switch_view(
     request,
     group_id,
@@ -386,10 +449,12 @@ def switch_view(
     interface_name="",
     command_string="",
     command_template=False,
+    refresh_command=False,
 ):
     """
     This shows the various data about a switch, either from a new SNMP read,
     from cached OID data, or an SSH command.
+    If refresh_command is True, the command in command_id is executed even if its output is cached.
     This is includes enough to enable/disable interfaces and power,
     and change vlans. Depending on view, there may be more data needed,
     such as ethernet, arp & lldp tables.
@@ -471,6 +536,10 @@ def switch_view(
             log.save()
             return error_page(request=request, group=group, switch=switch, error=conn.error)
 
+    if not conn.show_interfaces:
+        # the Information tab is the only tab shown, so read the device info now:
+        conn.get_device_info()
+
     # done with reading switch data, so save cachable/session data
     conn.save_cache()
 
@@ -481,23 +550,41 @@ def switch_view(
         # Exexute a specific Command object by ID, note rights are checked in run_command()!
         dprint("CALLING RUN_COMMAND()")
         counter_increment(COUNTER_COMMANDS)
-        cmd = conn.run_command(command_id=command_id, interface_name=interface_name)
+        cmd = conn.run_command(
+            command_id=command_id,
+            interface_name=interface_name,
+            refresh=refresh_command,
+            stream=settings.SSH_STREAM_COMMAND_OUTPUT,
+        )
         if conn.error.status:
             # log it!
             log.type = LOG_TYPE_ERROR
             log.action = LOG_EXECUTE_COMMAND
             log.description = f"{cmd['error_descr']}: {cmd['error_details']}"
+        elif cmd["cached"]:
+            # the device was not accessed:
+            log.type = LOG_TYPE_COMMAND
+            log.action = LOG_EXECUTE_COMMAND
+            log.description = f"{cmd['command']} (cached output, {cmd['cache_age']} old)"
+        elif cmd["stream"]:
+            # the command is executed, and logged, by the SwitchCmdStream() view:
+            cmd["stream_url"] = start_command_stream(request=request, group=group, switch=switch, cmd=cmd)
         else:
             # success !
             switch.update_command()
             log.type = LOG_TYPE_COMMAND
             log.action = LOG_EXECUTE_COMMAND
             log.description = cmd["command"]
-        log.save()
+        if not cmd["stream"]:
+            log.save()
     elif command_string:
         dprint("CALLING RUN_COMMAND_STRING")
         counter_increment(COUNTER_COMMANDS)
-        cmd = conn.run_command_string(command_string=command_string)
+        # output that needs to be matched or filtered cannot be streamed:
+        stream = settings.SSH_STREAM_COMMAND_OUTPUT and not (
+            command_template and (command_template.output_match_regex or command_template.output_lines_keep_regex)
+        )
+        cmd = conn.run_command_string(command_string=command_string, stream=stream)
         dprint(f"OUTPUT = {cmd}")
         if conn.error.status:
             # log it!
@@ -505,6 +592,9 @@ def switch_view(
             log.action = LOG_EXECUTE_COMMAND
             log.description = f"{cmd['error_descr']}: {cmd['error_details']}"
             log.save()
+        elif cmd["stream"]:
+            # the command is executed, and logged, by the SwitchCmdStream() view:
+            cmd["stream_url"] = start_command_stream(request=request, group=group, switch=switch, cmd=cmd)
         else:
             # success !
             switch.update_command()
@@ -814,6 +904,19 @@ def bulkedit_processor(
     success_count = 0
     error_count = 0
     outputs = []  # description of any errors found
+    # some drivers can apply all changes at once at the end. PoE toggles need to be applied as we go.
+    batched = poe_choice != BULKEDIT_POE_DOWN_UP and conn.bulk_edit_start()
+    changed_interfaces = []  # the interfaces with successful changes, if batched
+    change_count = 0  # changes are counted once they are applied, see below
+    held_logs = []  # the logs of batched changes, saved once the commit result is known
+
+    def save_log(log: Log, change: bool):
+        # if batched, a change is not applied until the commit, so hold its log until then:
+        if batched and change:
+            held_logs.append(log)
+        else:
+            log.save()
+
     for if_key in interfaces:
         iface = conn.get_interface_by_key(if_key)
         if not iface:
@@ -821,6 +924,7 @@ def bulkedit_processor(
             outputs.append(f"ERROR: (BulkEdit) interface for index '{if_key}' not found!")
             continue
         iface_count += 1
+        interface_success_count = success_count
 
         # now check all the things we could be changing,
         # start with UP/DOWN state:
@@ -833,6 +937,7 @@ def bulkedit_processor(
                 group=group,
             )
             current_state = iface.admin_status
+            applied = False
             if interface_change == INTERFACE_STATUS_CHANGE:
                 if iface.admin_status:
                     new_state = False
@@ -861,8 +966,8 @@ def bulkedit_processor(
                     success_count += 1
                     log.type = LOG_TYPE_CHANGE
                     log.description = f"Interface {iface.name}: Admin set to {new_state_name}"
-                    counter_increment(COUNTER_CHANGES)
-                    conn.switch.update_change()
+                    change_count += 1
+                    applied = True
                 else:
                     error_count += 1
                     log.type = LOG_TYPE_ERROR
@@ -873,7 +978,7 @@ def bulkedit_processor(
                 log.type = LOG_TYPE_CHANGE
                 log.description = f"Interface {iface.name}: Ignored - already {new_state_name}"
             outputs.append(log.description)
-            log.save()
+            save_log(log, change=applied)
 
         # next work on PoE state:
         if poe_choice != BULKEDIT_POE_NONE:
@@ -903,8 +1008,7 @@ def bulkedit_processor(
                             counter_increment(COUNTER_ERRORS)
                         else:
                             # successful power down
-                            counter_increment(COUNTER_CHANGES)
-                            conn.switch.update_change()
+                            change_count += 1
                             # now delay
                             time.sleep(settings.POE_TOGGLE_DELAY)
                             # Now enable PoE again...
@@ -923,8 +1027,7 @@ def bulkedit_processor(
                                 log.description = f"Interface {iface.name}: PoE Toggle Down/Up OK"
                                 outputs.append(log.description)
                                 log.save()
-                                counter_increment(COUNTER_CHANGES)
-                                conn.switch.update_change()
+                                change_count += 1
                     else:
                         outputs.append(f"Interface {iface.name}: PoE Down/Up IGNORED, PoE NOT enabled")
 
@@ -968,9 +1071,8 @@ def bulkedit_processor(
                             log.type = LOG_TYPE_CHANGE
                             log.description = f"Interface {iface.name}: PoE {new_state_name}"
                             outputs.append(log.description)
-                            log.save()
-                            counter_increment(COUNTER_CHANGES)
-                            conn.switch.update_change()
+                            save_log(log, change=True)
+                            change_count += 1
                     else:
                         # already in wanted power state:
                         outputs.append(f"Interface {iface.name}: Ignored, PoE already {new_state_name}")
@@ -1014,9 +1116,8 @@ def bulkedit_processor(
                         log.type = LOG_TYPE_CHANGE
                         log.description = f"Interface {iface.name}: Vlan set to {new_pvid}"
                         outputs.append(log.description)
-                    log.save()
-                    counter_increment(COUNTER_CHANGES)
-                    conn.switch.update_change()
+                        change_count += 1
+                    save_log(log, change=log.type == LOG_TYPE_CHANGE)
                 else:
                     # already on desired vlan:
                     outputs.append(f"Interface {iface.name}: Ignored, vlan already {new_pvid}")
@@ -1066,17 +1167,42 @@ def bulkedit_processor(
                 log.description = (
                     f"Interface {iface.name}: Descr ERROR: {conn.error.description} - {conn.error.details}"
                 )
-                log.save()
                 counter_increment(COUNTER_ERRORS)
                 outputs.append(f"Interface {iface.name}: Descr ERROR: {conn.error.description}")
             else:
                 success_count += 1
                 log.type = LOG_TYPE_CHANGE
                 log.description = f"Interface {iface.name}: Descr set OK"
-                counter_increment(COUNTER_CHANGES)
-                conn.switch.update_change()
+                change_count += 1
                 outputs.append(log.description)
+            save_log(log, change=log.type == LOG_TYPE_CHANGE)
+
+        if success_count > interface_success_count:
+            changed_interfaces.append(iface.name)
+
+    # apply the batched changes:
+    if batched and not conn.bulk_edit_commit():
+        # none of the changes were applied, log that for each change:
+        for log in held_logs:
+            log.type = LOG_TYPE_ERROR
+            log.description = (
+                f"{log.description} - NOT applied, commit failed: {conn.error.description} - {conn.error.details}"
+            )
+            log.save()
+        for if_name in changed_interfaces:
+            outputs.append(f"Interface {if_name}: changes NOT applied, commit failed: {conn.error.description}")
+            counter_increment(COUNTER_ERRORS)
+        error_count += success_count
+        success_count = 0
+        # the cached interface data now has changes that were not applied:
+        clear_switch_cache(request)
+    elif change_count:
+        # the changes are on the device, now log and count them:
+        for log in held_logs:
             log.save()
+        counter_increment(COUNTER_CHANGES, change_count)
+        for _ in range(change_count):
+            conn.switch.update_change()
 
     # log final results
     log = Log(
@@ -1439,9 +1565,113 @@ class SwitchCmdOutput(LoginRequiredMixin, View):
             switch_id=switch_id,
             view="basic",
             command_id=command_id,
+            refresh_command=bool(request.POST.get("refresh", False)),
         )
 
 
+def start_command_stream(request, group, switch, cmd: dict) -> str:
+    """
+    Remember a validated command, so the browser can run it with SwitchCmdStream(),
+    and see the output while the command runs.
+
+    Args:
+        request: the current HttpRequest()
+        group: the SwitchGroup() the switch is accessed from.
+        switch: the Switch() to run the command on.
+        cmd (dict): the command dictionary as returned by run_command() or run_command_string().
+
+    Returns:
+        (str): the url that streams the command output.
+    """
+    token = secrets.token_urlsafe(16)
+    cache.set(
+        get_switch_cache_key(switch.id, f"cmd-stream-{token}"),
+        {
+            "user_id": request.user.id,
+            "command": cmd["command"],
+            "command_id": cmd["id"],
+            "cache_time": cmd.get("cache_time", 0),
+        },
+        COMMAND_STREAM_START_TIME,
+    )
+    return reverse("switches:switch_cmd_stream", kwargs={"group_id": group.id, "switch_id": switch.id, "token": token})
+
+
+class SwitchCmdStream(LoginRequiredMixin, View):
+    """
+    Execute a command started by start_command_stream(), and send the output to the browser as it is received.
+    """
+
+    def get(
+        self,
+        request,
+        group_id,
+        switch_id,
+        token,
+    ):
+        dprint("SwitchCmdStream() - GET called")
+
+        group, switch = get_group_and_switch(request=request, group_id=group_id, switch_id=switch_id)
+        if group is None or switch is None:
+            counter_increment(COUNTER_ACCESS_DENIED)
+            return HttpResponse("Access denied!", status=403, content_type="text/plain")
+
+        # each command can only be run once:
+        cache_key = get_switch_cache_key(switch.id, f"cmd-stream-{token}")
+        pending = cache.get(cache_key)
+        cache.delete(cache_key)
+        if not pending or pending["user_id"] != request.user.id:
+            return HttpResponse(
+                "Invalid or expired command, please run it again!", status=404, content_type="text/plain"
+            )
+
+        try:
+            conn = get_connection_object(request, group, switch)
+        except Exception:
+            return HttpResponse(
+                "We could not communicate with this device. Please contact your administrator!",
+                status=500,
+                content_type="text/plain",
+            )
+
+        def stream_output():
+            completed = False
+            try:
+                yield from conn.netmiko_stream_command(pending["command"])
+                completed = True
+            finally:
+                # now log the command, as if executed in switch_view(). This also runs if the browser went away:
+                log = Log(
+                    user=request.user,
+                    ip_address=get_remote_ip(request),
+                    switch=switch,
+                    group=group,
+                    action=LOG_EXECUTE_COMMAND,
+                )
+                if conn.error.status:
+                    log.type = LOG_TYPE_ERROR
+                    log.description = f"{conn.error.description}: {conn.error.details} (command '{pending['command']}')"
+                else:
+                    switch.update_command()
+                    log.type = LOG_TYPE_COMMAND
+                    log.description = pending["command"]
+                    if not completed:
+                        log.description += " (output not fully sent, the browser disconnected)"
+                    elif pending["cache_time"]:
+                        cache.set(
+                            conn.command_cache_key(command_id=pending["command_id"], command=pending["command"]),
+                            {"output": conn.netmiko_output, "time": time.time()},
+                            pending["cache_time"],
+                        )
+                log.save()
+
+        response = StreamingHttpResponse(stream_output(), content_type="text/plain; charset=utf-8")
+        # do not let proxies (e.g. Nginx) buffer the output:
+        response["X-Accel-Buffering"] = "no"
+        response["Cache-Control"] = "no-cache"
+        return response
+
+
 class SwitchCmdTemplateOutput(LoginRequiredMixin, View):
     """
     Go parse a switch command template that was submitted in the form
@@ -1690,6 +1920,7 @@ class InterfaceCmdOutput(LoginRequiredMixin, View):
             view="basic",
             command_id=command_id,
             interface_name=interface_name,
+            refresh_command=bool(request.POST.get("refresh", False)),
         )
 
 
@@ -1737,6 +1968,8 @@ class SwitchReload(LoginRequiredMixin, MyView):
         log.save()
 
         clear_switch_cache(request)
+        # the user wants fresh data, so do not use the device data shared by other requests:
+        clear_shared_switch_cache(switch.id)
         counter_increment(COUNTER_VIEWS)
 
         return switch_view(request=request, group_id=group_id, switch_id=switch_id, view=view)
@@ -1775,12 +2008,10 @@ class SwitchActivity(LoginRequiredMixin, View):
 
         # only show this switch. May add more filters later...
         filter_values = {"switch_id": switch_id}
-        logs = Log.objects.all().filter(**filter_values).order_by("-timestamp")
+        logs = Log.objects.all().filter(**filter_values).select_related("user", "switch", "group")
 
-        # setup pagination of the resulting activity logs
-        page_number = int(request.GET.get("page", default=1))
-        paginator = Paginator(logs, settings.PAGINATE_COUNT)  # Show set number of contacts per page.
-        logs_page = paginator.get_page(page_number)
+        # setup (keyset) pagination of the resulting activity logs
+        logs_page = KeysetPaginator(logs, settings.PAGINATE_COUNT).get_page(request)
 
         # log my activity
         log = Log(
@@ -1790,7 +2021,7 @@ class SwitchActivity(LoginRequiredMixin, View):
             group=group,
             type=LOG_TYPE_VIEW,
             action=LOG_VIEW_ALL_LOGS,
-            description=f"Viewing Switch Activity Logs (page {page_number})",
+            description=f"Viewing Switch Activity Logs (page {logs_page.number})",
         )
         log.save()
 
@@ -1806,7 +2037,6 @@ class SwitchActivity(LoginRequiredMixin, View):
             template_name,
             {
                 "logs": logs_page,
-                "paginator": paginator,
                 "group": group,
                 "switch": switch,
                 "log_title": title,
@@ -1937,8 +2167,6 @@ class SwitchAdminActivity(LoginRequiredMixin, View):
             action=LOG_VIEW_ALL_LOGS,
         )
 
-        page_number = int(request.GET.get("page", default=1))
-
         # look at query string, and filter as needed
         filter_values = {}
         if len(request.GET) > 0:
@@ -1958,27 +2186,25 @@ class SwitchAdminActivity(LoginRequiredMixin, View):
                 filter_values['description__iregex'] = request.GET.get("description", "")
 
         # now set the filter, if found
+        logs = Log.objects.all().filter(**filter_values).select_related("user", "switch", "group")
+
+        # setup (keyset) pagination of the resulting activity logs
+        logs_page = KeysetPaginator(logs, settings.PAGINATE_COUNT).get_page(request)
+
         if len(filter_values) > 0:
-            logs = Log.objects.all().filter(**filter_values).order_by("-timestamp")
-            log.description = f"Viewing filtered logs: {filter_values} (page {page_number})"
+            log.description = f"Viewing filtered logs: {filter_values} (page {logs_page.number})"
             title = "Filtered Logs"
         else:
-            logs = Log.objects.all().order_by("-timestamp")
-            log.description = f"Viewing all logs (page {page_number})"
+            log.description = f"Viewing all logs (page {logs_page.number})"
             title = "All Logs"
         log.save()
 
-        # setup pagination of the resulting activity logs
-        paginator = Paginator(logs, settings.PAGINATE_COUNT)  # Show set number of contacts per page.
-        logs_page = paginator.get_page(page_number)
-
         # render the template
         return render(
             request,
             template_name,
             {
                 "logs": logs_page,
-                "paginator": paginator,
                 "filter": filter,
                 "types": LOG_TYPE_CHOICES,
                 "actions": LOG_ACTION_CHOICES,
@@ -0,0 +1,147 @@
+#!/usr/bin/python3
+#
+# This file is part of Open Layer 2 Management (OpenL2M).
+#
+# OpenL2M is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License version 3 as published by
+# the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.  You should have received a copy of the GNU General Public
+# License along with OpenL2M. If not, see <http://www.gnu.org/licenses/>.
+#
+
+# Benchmark the parsing of the Junos ethernet-switching table RPC reply, as done in the PyEZ driver.
+# This compares a find('.//<field>') search per field of each entry, with the precompiled XPath
+# and single pass over each entry that the driver uses, see junos_xml_fields().
+#
+# By default, a reply with 30000 mac address entries is generated. You can also use a recorded reply
+# from your device, saved with PyEZ (ie. without XML namespaces), e.g.:
+#   reply = dev.rpc.get_ethernet_switching_table_information(extensive=True)
+#   open("macs.xml", "wb").write(etree.tostring(reply))
+#
+# Run this from the "scripts" directory, with the OpenL2M virtual environment activated.
+import sys
+import argparse
+import django
+import os
+import time
+
+PROJECT_DIR = "../openl2m/"
+
+# insert location in front of path, so it is first one found!
+sys.path.insert(0, PROJECT_DIR)
+
+# initialize Django framework
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'openl2m.settings')
+django.setup()
+
+from lxml import etree
+
+from switches.connect.junos_pyez.connector import XPATH_MAC_ENTRIES, MAC_FIELDS
+from switches.connect.junos_pyez.utils import junos_xml_fields
+
+
+def generate_reply(count: int):
+    """Generate an ethernet-switching table reply with 'count' mac address entries."""
+    root = etree.Element('l2ng-l2ald-rtb-macdb')
+    for i in range(count):
+        vlan_id = 100 + i % 50
+        entry = etree.SubElement(root, 'l2ng-l2ald-mac-entry-vlan')
+        etree.SubElement(entry, 'l2ng-l2-mac-routing-instance').text = 'default-switch'
+        etree.SubElement(entry, 'l2ng-l2-vlan-name').text = f"vlan{vlan_id}"
+        mac = etree.SubElement(entry, 'l2ng-l2-mac-entry')
+        etree.SubElement(mac, 'l2ng-l2-mac-vlan-name').text = f"vlan{vlan_id}"
+        mac_address = f"00:11:{i >> 16 & 255:02x}:{i >> 8 & 255:02x}:{i & 255:02x}:01"
+        etree.SubElement(mac, 'l2ng-l2-mac-address').text = mac_address
+        etree.SubElement(mac, 'l2ng-l2-mac-flags').text = 'D'
+        etree.SubElement(mac, 'l2ng-l2-mac-age').text = '-'
+        etree.SubElement(mac, 'l2ng-l2-mac-logical-interface').text = f"ge-0/0/{i % 48}.0"
+        etree.SubElement(mac, 'l2ng-l2-vlan-id').text = str(vlan_id)
+    return root
+
+
+def parse_find(reply) -> list:
+    """Parse the reply with a find() search for each field, as done before."""
+    entries = []
+    for mac in reply.findall('.//l2ng-l2ald-mac-entry-vlan'):
+        mac_address = mac.find('.//l2ng-l2-mac-address').text
+        vlan_id = int(mac.find('.//l2ng-l2-vlan-id').text)
+        if_name = mac.find('.//l2ng-l2-mac-logical-interface').text
+        entries.append((mac_address, vlan_id, if_name))
+    return entries
+
+
+def parse_single_pass(reply) -> list:
+    """Parse the reply as the PyEZ driver does now."""
+    entries = []
+    for mac in XPATH_MAC_ENTRIES(reply):
+        fields = junos_xml_fields(mac, MAC_FIELDS)
+        entries.append(
+            (fields['l2ng-l2-mac-address'], int(fields['l2ng-l2-vlan-id']), fields['l2ng-l2-mac-logical-interface'])
+        )
+    return entries
+
+
+def main():
+    # setup and parse arguments
+    parser = argparse.ArgumentParser(description='Benchmark the parsing of the Junos ethernet-switching table.')
+
+    parser.add_argument(
+        '-f',
+        '--file',
+        type=str,
+        dest='file',
+        action='store',
+        default='',
+        required=False,
+        help='a recorded RPC reply to parse, instead of a generated one',
+    )
+
+    parser.add_argument(
+        '-e',
+        '--entries',
+        type=int,
+        dest='entries',
+        action='store',
+        default=30000,
+        required=False,
+        help='the number of mac address entries to generate',
+    )
+
+    parser.add_argument(
+        '-r',
+        '--runs',
+        type=int,
+        dest='runs',
+        action='store',
+        default=5,
+        required=False,
+        help='the number of times to parse the reply, the best time is shown',
+    )
+
+    args = parser.parse_args()
+
+    if args.file:
+        reply = etree.parse(args.file).getroot()
+    else:
+        reply = generate_reply(args.entries)
+
+    results = {}
+    for name, function in (("find() per field", parse_find), ("single pass", parse_single_pass)):
+        best = None
+        for _ in range(max(args.runs, 1)):
+            start_time = time.perf_counter()
+            results[name] = function(reply)
+            duration = time.perf_counter() - start_time
+            best = duration if best is None else min(best, duration)
+        print(f"{name}: {len(results[name])} entries in {best:.3f} seconds")
+
+    if results["find() per field"] != results["single pass"]:
+        print("ERROR: the parsed entries are different!")
+
+
+if __name__ == '__main__':
+    main()
@@ -104,6 +104,16 @@ COMMAND="python3 openl2m/manage.py migrate"
 echo "Applying database migrations ($COMMAND)..."
 eval $COMMAND || exit 1
 
+# Create the cache table, if the database cache is configured (this does nothing otherwise)
+COMMAND="python3 openl2m/manage.py createcachetable"
+echo "Creating cache table ($COMMAND)..."
+eval $COMMAND || exit 1
+
+# Count the recent log entries for the usage statistics
+COMMAND="python3 openl2m/manage.py rolluplogs"
+echo "Updating usage statistics ($COMMAND)..."
+eval $COMMAND || exit 1
+
 cd docs
 
 # Recompile the documentation, these become django static files!